@@ -5,6 +5,7 @@ from communication.Asymmetric_Scheme import Asymmetric_Scheme
 from constants import DATA_DIRECTORY, CAs_FOLDER
 from communication.Encryption_Scheme import Encryption_Scheme
 from communication.User import User
+from persistence import atomic_write_json
 import datetime
 
 
@@ -16,8 +17,7 @@ class CA(User):
         super().__init__(code)
         json_path = os.path.join(DATA_DIRECTORY, CAs_FOLDER, f"ca_{self._code}.json")
         if not os.path.exists(json_path):
-            with open(json_path, "w") as f:
-                json.dump({}, f)
+            atomic_write_json(json_path, {}, indent=None)
                 
     def __str__(self):
         return f"CA: {self._code}"
@@ -43,8 +43,7 @@ class CA(User):
         }
         cert = Certificate(certificate, scheme)
         data[user.get_code()] = cert.save_on_json()
-        with open(file, "w") as f:
-            json.dump(data, f, indent=4)
+        atomic_write_json(file, data)
 
         return cert
 
@@ -0,0 +1,78 @@
+import json
+import os
+from typing import override
+from actors.Student_Storage import Student_Storage, StudentData
+from constants import DATA_DIRECTORY, UNIVERSITIES_FOLDER, ActivityResult, Credential, ExamResult
+from persistence import atomic_write_json
+
+
+class JSON_Student_Storage(Student_Storage):
+    """
+        Archivio degli studenti in un unico file JSON per università, uni_{nome}.json.
+        Ogni scrittura rilegge e riscrive l'intero file, per cui è adatto ai dati di esempio ed all'uso didattico.
+    """
+    def __init__(self, university_name: str, directory: str = os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER)):
+        """
+            Inizializza l'archivio, creando il file vuoto se non esiste.
+            Parametri:
+            - university_name: nome dell'università.
+            - directory: cartella del file JSON.
+        """
+        super().__init__()
+        self._path = os.path.join(directory, f"uni_{university_name}.json")
+        if not os.path.exists(self._path):
+            self._write({})
+
+    def _read(self) -> dict[str, StudentData]:
+        with open(self._path, "r") as f:
+            return json.load(f)
+
+    def _write(self, data: dict[str, StudentData]) -> None:
+        atomic_write_json(self._path, data)
+
+    @override
+    def load_all(self) -> dict[str, StudentData]:
+        return self._read()
+
+    @override
+    def is_empty(self) -> bool:
+        return not self._read()
+
+    @override
+    def save_student(self, serial_id: str, student_data: StudentData) -> None:
+        data = self._read()
+        data[serial_id] = student_data
+        self._write(data)
+
+    @override
+    def save_students(self, students: dict[str, StudentData]) -> None:
+        data = self._read()
+        data.update(students)
+        self._write(data)
+
+    @override
+    def save_exam(self, serial_id: str, result: ExamResult) -> None:
+        data = self._read()
+        data[serial_id].setdefault("passed_exams", {})[result["name"]] = result
+        self._write(data)
+
+    @override
+    def save_activity(self, serial_id: str, result: ActivityResult) -> None:
+        data = self._read()
+        data[serial_id].setdefault("passed_activities", {})[result["name"]] = result
+        self._write(data)
+
+    @override
+    def save_credential(self, serial_id: str, credential: Credential|None, credential_ID: str|None) -> None:
+        data = self._read()
+        data[serial_id]["credential"] = credential
+        data[serial_id]["credential_ID"] = credential_ID
+        self._write(data)
+
+    @override
+    def get_version(self) -> tuple|None:
+        try:
+            stat = os.stat(self._path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
@@ -0,0 +1,185 @@
+import json
+import os
+import sqlite3
+from typing import override
+from actors.Student_Storage import Student_Storage, StudentData
+from constants import DATA_DIRECTORY, UNIVERSITIES_FOLDER, ActivityResult, Credential, ExamResult
+
+
+class SQLite_Student_Storage(Student_Storage):
+    """
+        Archivio degli studenti in un database SQLite per università, uni_{nome}.db, in modalità WAL.
+        Studenti, esami, attività, credenziali e chiavi (salt e hash della password) sono in tabelle separate indicizzate per matricola,
+        per cui ogni modifica è la scrittura di una sola riga indicizzata.
+        L'ordine di inserimento di esami e attività è mantenuto, siccome determina l'ordine delle foglie della credenziale.
+        Alla prima apertura importa gli studenti dell'eventuale uni_{nome}.json del vecchio formato, che viene poi rinominato.
+    """
+    _SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS students (serial_id TEXT PRIMARY KEY, name TEXT, surname TEXT, study_plan TEXT, exchange_plan TEXT, exchange_plan_data TEXT, data TEXT)",
+        "CREATE TABLE IF NOT EXISTS exams (serial_id TEXT, name TEXT, result TEXT, PRIMARY KEY (serial_id, name))",
+        "CREATE TABLE IF NOT EXISTS activities (serial_id TEXT, name TEXT, result TEXT, PRIMARY KEY (serial_id, name))",
+        "CREATE TABLE IF NOT EXISTS credentials (serial_id TEXT PRIMARY KEY, credential_ID TEXT, credential TEXT)",
+        "DROP INDEX IF EXISTS credentials_by_ID", # Indice per ID delle versioni precedenti, che nessuna ricerca usa
+        "CREATE TABLE IF NOT EXISTS keys (serial_id TEXT PRIMARY KEY, salt TEXT, password TEXT)",
+    ]
+    # Campi di StudentData salvati in colonne o tabelle dedicate, gli altri sono salvati in students.data
+    _FIELDS = {"name", "surname", "study_plan", "exchange_plan", "exchange_plan_data", "passed_exams", "passed_activities", "salt", "password", "credential", "credential_ID"}
+
+    def __init__(self, university_name: str, directory: str = os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER)):
+        """
+            Inizializza l'archivio, creando il database e le sue tabelle se non esistono.
+            Parametri:
+            - university_name: nome dell'università.
+            - directory: cartella del database.
+        """
+        super().__init__()
+        self._path = os.path.join(directory, f"uni_{university_name}.db")
+        self._connection: sqlite3.Connection|None = None
+        with self._connect() as connection:
+            for statement in SQLite_Student_Storage._SCHEMA:
+                connection.execute(statement)
+        if self.is_empty():
+            self._import_legacy_file(os.path.join(directory, f"uni_{university_name}.json"))
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+            Restituisce la connessione al database, aprendola se l'archivio è stato chiuso.
+        """
+        if self._connection is None:
+            self._connection = sqlite3.connect(self._path)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL") # In modalità WAL il database resta consistente anche senza sincronizzare ad ogni commit
+        return self._connection
+
+    def _import_legacy_file(self, legacy_file: str) -> None:
+        """
+            Importa in un'unica transazione gli studenti dell'eventuale uni_{nome}.json del vecchio formato, che viene poi rinominato.
+        """
+        if not os.path.exists(legacy_file):
+            return
+        with open(legacy_file, "r") as f:
+            students: dict[str, StudentData] = json.load(f)
+        if students:
+            self.save_students(students)
+            os.replace(legacy_file, legacy_file + ".old")
+
+    @override
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    @staticmethod
+    def _dumps(value) -> str|None:
+        return None if value is None else json.dumps(value)
+
+    @staticmethod
+    def _loads(value: str|None):
+        return None if value is None else json.loads(value)
+
+    @override
+    def load_all(self) -> dict[str, StudentData]:
+        students: dict[str, StudentData] = {}
+        rows = self._connect().execute(
+            "SELECT s.serial_id, s.name, s.surname, s.study_plan, s.exchange_plan, s.exchange_plan_data, s.data, k.salt, k.password, c.credential, c.credential_ID "
+            "FROM students s LEFT JOIN keys k ON k.serial_id = s.serial_id LEFT JOIN credentials c ON c.serial_id = s.serial_id ORDER BY s.rowid"
+        )
+        for serial_id, name, surname, study_plan, exchange_plan, exchange_plan_data, data, salt, password, credential, credential_ID in rows:
+            student_data: StudentData = {
+                "name": name,
+                "surname": surname,
+                "study_plan": study_plan,
+                "passed_exams": {},
+                "passed_activities": {},
+                "salt": salt or "",
+                "password": password or "",
+                "exchange_plan": SQLite_Student_Storage._loads(exchange_plan),
+                "exchange_plan_data": SQLite_Student_Storage._loads(exchange_plan_data),
+                "credential": SQLite_Student_Storage._loads(credential),
+                "credential_ID": credential_ID,
+            }
+            student_data.update(SQLite_Student_Storage._loads(data) or {}) # type: ignore
+            students[serial_id] = student_data
+        for serial_id, name, result in self._connect().execute("SELECT serial_id, name, result FROM exams ORDER BY rowid"):
+            students[serial_id]["passed_exams"][name] = json.loads(result)
+        for serial_id, name, result in self._connect().execute("SELECT serial_id, name, result FROM activities ORDER BY rowid"):
+            students[serial_id]["passed_activities"][name] = json.loads(result)
+        return students
+
+    @override
+    def is_empty(self) -> bool:
+        return self._connect().execute("SELECT 1 FROM students LIMIT 1").fetchone() is None
+
+    @override
+    def save_student(self, serial_id: str, student_data: StudentData) -> None:
+        with self._connect():
+            self._write_student(serial_id, student_data)
+
+    @override
+    def save_students(self, students: dict[str, StudentData]) -> None:
+        # Tutti i record sono scritti in un'unica transazione
+        with self._connect():
+            for serial_id, student_data in students.items():
+                self._write_student(serial_id, student_data)
+
+    def _write_student(self, serial_id: str, student_data: StudentData) -> None:
+        others = {key: value for key, value in student_data.items() if key not in SQLite_Student_Storage._FIELDS}
+        self._connect().execute(
+            "INSERT INTO students (serial_id, name, surname, study_plan, exchange_plan, exchange_plan_data, data) VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (serial_id) DO UPDATE SET name = excluded.name, surname = excluded.surname, study_plan = excluded.study_plan, "
+            "exchange_plan = excluded.exchange_plan, exchange_plan_data = excluded.exchange_plan_data, data = excluded.data",
+            (serial_id, student_data.get("name"), student_data.get("surname"), student_data.get("study_plan"),
+             SQLite_Student_Storage._dumps(student_data.get("exchange_plan")), SQLite_Student_Storage._dumps(student_data.get("exchange_plan_data")),
+             SQLite_Student_Storage._dumps(others) if others else None)
+        )
+        self._connect().execute(
+            "INSERT OR REPLACE INTO keys (serial_id, salt, password) VALUES (?, ?, ?)",
+            (serial_id, student_data.get("salt"), student_data.get("password"))
+        )
+        self._write_credential(serial_id, student_data.get("credential"), student_data.get("credential_ID"))
+        # Esami e attività sono reinseriti nell'ordine del dizionario
+        self._connect().execute("DELETE FROM exams WHERE serial_id = ?", (serial_id,))
+        self._connect().executemany(
+            "INSERT INTO exams (serial_id, name, result) VALUES (?, ?, ?)",
+            [(serial_id, name, json.dumps(result)) for name, result in student_data.get("passed_exams", {}).items()]
+        )
+        self._connect().execute("DELETE FROM activities WHERE serial_id = ?", (serial_id,))
+        self._connect().executemany(
+            "INSERT INTO activities (serial_id, name, result) VALUES (?, ?, ?)",
+            [(serial_id, name, json.dumps(result)) for name, result in student_data.get("passed_activities", {}).items()]
+        )
+
+    @override
+    def save_exam(self, serial_id: str, result: ExamResult) -> None:
+        # L'upsert mantiene il rowid, e quindi la posizione, di un esame già registrato
+        with self._connect():
+            self._connect().execute(
+                "INSERT INTO exams (serial_id, name, result) VALUES (?, ?, ?) ON CONFLICT (serial_id, name) DO UPDATE SET result = excluded.result",
+                (serial_id, result["name"], json.dumps(result))
+            )
+
+    @override
+    def save_activity(self, serial_id: str, result: ActivityResult) -> None:
+        with self._connect():
+            self._connect().execute(
+                "INSERT INTO activities (serial_id, name, result) VALUES (?, ?, ?) ON CONFLICT (serial_id, name) DO UPDATE SET result = excluded.result",
+                (serial_id, result["name"], json.dumps(result))
+            )
+
+    def _write_credential(self, serial_id: str, credential: Credential|None, credential_ID: str|None) -> None:
+        self._connect().execute(
+            "INSERT OR REPLACE INTO credentials (serial_id, credential_ID, credential) VALUES (?, ?, ?)",
+            (serial_id, credential_ID, SQLite_Student_Storage._dumps(credential))
+        )
+
+    @override
+    def save_credential(self, serial_id: str, credential: Credential|None, credential_ID: str|None) -> None:
+        with self._connect():
+            self._write_credential(serial_id, credential, credential_ID)
+
+    @override
+    def get_version(self) -> tuple|None:
+        if not os.path.exists(self._path):
+            return None
+        # data_version cambia solo per le transazioni di altre connessioni, non per le scritture di questa istanza
+        return (self._connect().execute("PRAGMA data_version").fetchone()[0],)
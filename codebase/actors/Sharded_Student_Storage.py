@@ -0,0 +1,139 @@
+import json
+import os
+from typing import override
+from urllib.parse import quote
+from actors.Student_Storage import Student_Storage, StudentData
+from constants import DATA_DIRECTORY, UNIVERSITIES_FOLDER, ActivityResult, Credential, ExamResult
+from persistence import Write_Journal, atomic_write_json
+
+
+class Sharded_Student_Storage(Student_Storage):
+    """
+        Archivio degli studenti con un file JSON per ogni studente, nella cartella uni_{nome} dell'università.
+        Un manifesto elenca le matricole registrate, ed è riscritto solo quando si iscrive un nuovo studente,
+        per cui ogni modifica riscrive soltanto il record dello studente.
+        Ogni file è scritto su un file temporaneo e poi rinominato, per cui un lettore non vede mai un record scritto a metà,
+        e più record salvati insieme passano per un journal nella cartella dell'università.
+    """
+    MANIFEST_FILE = "manifest.json"
+
+    def __init__(self, university_name: str, directory: str = os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER)):
+        """
+            Inizializza l'archivio, creando la cartella ed il manifesto vuoto se non esistono.
+            Parametri:
+            - university_name: nome dell'università.
+            - directory: cartella in cui creare la cartella dell'università.
+        """
+        super().__init__()
+        self._directory = os.path.join(directory, f"uni_{university_name}")
+        os.makedirs(self._directory, exist_ok=True)
+        self._journal = Write_Journal(self._directory)
+        self._journal.recover()
+        self._serial_ids: list[str] = []
+        if not os.path.exists(self._path(Sharded_Student_Storage.MANIFEST_FILE)):
+            self._import_legacy_file(os.path.join(directory, f"uni_{university_name}.json"))
+        self._serial_ids = self._read(Sharded_Student_Storage.MANIFEST_FILE)["students"]
+        self._stat = self._stat_directory()
+        self._version = 0
+
+    def _import_legacy_file(self, legacy_file: str) -> None:
+        """
+            Crea il manifesto, importando gli studenti dell'eventuale uni_{nome}.json del vecchio formato, che viene poi rinominato.
+        """
+        students: dict[str, StudentData] = {}
+        if os.path.exists(legacy_file):
+            with open(legacy_file, "r") as f:
+                students = json.load(f)
+        for serial_id, student_data in students.items():
+            self._write(Sharded_Student_Storage._record_name(serial_id), dict(student_data))
+        self._write(Sharded_Student_Storage.MANIFEST_FILE, {"students": list(students)})
+        if students:
+            os.replace(legacy_file, legacy_file + ".old")
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self._directory, name)
+
+    @staticmethod
+    def _record_name(serial_id: str) -> str:
+        # Le matricole contengono '#', per cui il nome del file ne è la codifica percentuale
+        return quote(serial_id, safe="") + ".json"
+
+    def _read(self, name: str) -> dict:
+        with open(self._path(name), "r") as f:
+            return json.load(f)
+
+    def _write(self, name: str, data: dict) -> None:
+        atomic_write_json(self._path(name), data)
+
+    def _stat_directory(self) -> int|None:
+        try:
+            return os.stat(self._directory).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _write_record(self, serial_id: str, student_data: StudentData) -> None:
+        self._write(Sharded_Student_Storage._record_name(serial_id), dict(student_data))
+        # Le scritture di questa istanza non contano come modifiche esterne in get_version
+        self._stat = self._stat_directory()
+
+    def _read_record(self, serial_id: str) -> StudentData:
+        return self._read(Sharded_Student_Storage._record_name(serial_id)) # type: ignore
+
+    @override
+    def load_all(self) -> dict[str, StudentData]:
+        self._serial_ids = self._read(Sharded_Student_Storage.MANIFEST_FILE)["students"]
+        return {serial_id: self._read_record(serial_id) for serial_id in self._serial_ids}
+
+    @override
+    def is_empty(self) -> bool:
+        return not self._serial_ids
+
+    @override
+    def save_student(self, serial_id: str, student_data: StudentData) -> None:
+        self._write_record(serial_id, student_data)
+        if serial_id not in self._serial_ids:
+            # Il record è scritto prima del manifesto, che non elenca mai una matricola senza file
+            self._serial_ids.append(serial_id)
+            self._write(Sharded_Student_Storage.MANIFEST_FILE, {"students": self._serial_ids})
+            self._stat = self._stat_directory()
+
+    @override
+    def save_students(self, students: dict[str, StudentData]) -> None:
+        files: dict[str, object] = {self._path(Sharded_Student_Storage._record_name(serial_id)): dict(student_data) for serial_id, student_data in students.items()}
+        new_serial_ids = [serial_id for serial_id in students if serial_id not in self._serial_ids]
+        if new_serial_ids:
+            files[self._path(Sharded_Student_Storage.MANIFEST_FILE)] = {"students": self._serial_ids + new_serial_ids}
+        # I record ed il manifesto sono scritti insieme attraverso il journal
+        self._journal.commit(files)
+        self._serial_ids += new_serial_ids
+        self._stat = self._stat_directory()
+
+    @override
+    def save_exam(self, serial_id: str, result: ExamResult) -> None:
+        student_data = self._read_record(serial_id)
+        student_data.setdefault("passed_exams", {})[result["name"]] = result
+        self._write_record(serial_id, student_data)
+
+    @override
+    def save_activity(self, serial_id: str, result: ActivityResult) -> None:
+        student_data = self._read_record(serial_id)
+        student_data.setdefault("passed_activities", {})[result["name"]] = result
+        self._write_record(serial_id, student_data)
+
+    @override
+    def save_credential(self, serial_id: str, credential: Credential|None, credential_ID: str|None) -> None:
+        student_data = self._read_record(serial_id)
+        student_data["credential"] = credential
+        student_data["credential_ID"] = credential_ID
+        self._write_record(serial_id, student_data)
+
+    @override
+    def get_version(self) -> tuple|None:
+        stat = self._stat_directory()
+        if stat is None:
+            return None
+        # La rinomina di un record aggiorna la data di modifica della cartella
+        if stat != self._stat:
+            self._stat = stat
+            self._version += 1
+        return (self._version,)
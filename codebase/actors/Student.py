@@ -1,5 +1,5 @@
 import json
-from constants import Credential
+from constants import Credential, CredentialLeaves, credential_leaves_list
 from communication.Encryption_Scheme import Encryption_Scheme
 from communication.User import User
 class Student(User):
@@ -14,6 +14,7 @@ class Student(User):
         self._passwords = {}
         self._credential:Credential|None = None
         self._credential_ID: str | None = None
+        self._credential_leaves: CredentialLeaves|None = None
 
     def get_name(self):
         return self._name
@@ -31,6 +32,7 @@ class Student(User):
         dict["surname"] = self._surname
         dict["credential"] = self._credential
         dict["credential_ID"] = self._credential_ID
+        dict["credential_leaves"] = self._credential_leaves
         dict["passwords"] = self._passwords
         return dict
     
@@ -42,6 +44,7 @@ class Student(User):
         student = Student(name, surname, code)
         student._credential = data.get("credential", None)
         student._credential_ID = data.get("credential_ID", None)
+        student._credential_leaves = data.get("credential_leaves", None)
         student._keys = {key: Encryption_Scheme.load_from_json(value) for key, value in data.get("keys", {}).items()}
         student._passwords = data.get("passwords", {})
         return student
@@ -58,12 +61,28 @@ class Student(User):
         """
         return self._passwords.get(user.get_code(), "")
     
-    def save_credential(self, credential:Credential, credential_ID: str) -> None:
+    def save_credential(self, credential:Credential, credential_ID: str, credential_leaves: CredentialLeaves|None) -> None:
         """
-            Salva la credenziale dello studente.
+            Salva la credenziale dello studente, insieme agli hash delle sue foglie calcolati all'emissione.
+            Gli hash sostituiscono sempre quelli della credenziale precedente, per cui vanno indicati esplicitamente:
+            None se non sono noti, e in tal caso vengono ricalcolati da chi verifica la credenziale.
+            Parametri:
+            - credential: la credenziale ricevuta.
+            - credential_ID: l'ID della credenziale nella blockchain.
+            - credential_leaves: gli hash delle foglie della credenziale, o None.
         """
         self._credential = credential
         self._credential_ID = credential_ID
+        self._credential_leaves = credential_leaves
+
+    def get_credential_leaves(self, credential:Credential) -> list[str]|None:
+        """
+            Restituisce gli hash delle foglie della credenziale, anche divulgata selettivamente, senza ricalcolarli.
+            Restituisce None se gli hash non sono stati salvati, come per le credenziali emesse con la codifica precedente.
+        """
+        if self._credential_leaves is None:
+            return None
+        return credential_leaves_list(credential, self._credential_leaves)
 
     def get_credential_data(self) -> tuple[Credential, str]:
         """
@@ -0,0 +1,111 @@
+from abc import ABC, abstractmethod
+from typing import TypedDict
+from constants import UNIVERSITY_STORAGE_BACKEND, Activity, ActivityResult, Credential, Exam, ExamResult
+
+
+class StudentData(TypedDict):
+    name: str
+    surname: str
+    study_plan: str
+    passed_exams: dict[str, ExamResult]
+    passed_activities: dict[str, ActivityResult]
+    password: str
+    salt: str
+    exchange_plan: dict[str, Exam | Activity] | None
+    exchange_plan_data: dict | None
+    credential: Credential | None
+    credential_ID: str | None
+
+
+class Student_Storage(ABC):
+    """
+        Classe astratta che rappresenta l'archivio dei dati degli studenti di un'università.
+        Gli archivi devono implementare la lettura di tutti i dati e la scrittura di un singolo record,
+        per cui ogni modifica di uno studente non riscrive i dati degli altri studenti.
+    """
+    def __init__(self):
+        super().__init__()
+
+    @abstractmethod
+    def load_all(self) -> dict[str, StudentData]:
+        """
+            Metodo per leggere i dati di tutti gli studenti, indicizzati per matricola.
+        """
+        pass
+
+    @abstractmethod
+    def is_empty(self) -> bool:
+        """
+            Metodo per verificare se l'archivio non contiene studenti.
+        """
+        pass
+
+    @abstractmethod
+    def save_student(self, serial_id: str, student_data: StudentData) -> None:
+        """
+            Metodo per salvare tutti i dati di uno studente, sostituendo quelli già presenti.
+        """
+        pass
+
+    def save_students(self, students: dict[str, StudentData]) -> None:
+        """
+            Salva insieme i dati di più studenti, sostituendo quelli già presenti.
+            Gli archivi possono ridefinirlo per scrivere tutti i record in un'unica operazione.
+        """
+        for serial_id, student_data in students.items():
+            self.save_student(serial_id, student_data)
+
+    @abstractmethod
+    def save_exam(self, serial_id: str, result: ExamResult) -> None:
+        """
+            Metodo per salvare il risultato di un esame dello studente.
+        """
+        pass
+
+    @abstractmethod
+    def save_activity(self, serial_id: str, result: ActivityResult) -> None:
+        """
+            Metodo per salvare il risultato di un'attività dello studente.
+        """
+        pass
+
+    @abstractmethod
+    def save_credential(self, serial_id: str, credential: Credential|None, credential_ID: str|None) -> None:
+        """
+            Metodo per salvare la credenziale dello studente ed il suo ID.
+        """
+        pass
+
+    @abstractmethod
+    def get_version(self) -> tuple|None:
+        """
+            Metodo per ottenere un valore che cambia quando l'archivio viene modificato da un altro processo o da un'altra istanza.
+            Restituisce None se l'archivio non esiste su disco.
+        """
+        pass
+
+    def close(self) -> None:
+        """
+            Rilascia le risorse aperte dall'archivio, come la connessione al database.
+            L'archivio resta utilizzabile, e le riapre al primo accesso successivo.
+        """
+        pass
+
+    @staticmethod
+    def open(university_name: str, backend: str = UNIVERSITY_STORAGE_BACKEND) -> 'Student_Storage':
+        """
+            Apre l'archivio degli studenti dell'università, creandolo se non esiste.
+            Parametri:
+            - university_name: nome dell'università.
+            - backend: tipo di archivio, "json", "sharded" o "sqlite".
+        """
+        if backend == "json":
+            from actors.JSON_Student_Storage import JSON_Student_Storage
+            return JSON_Student_Storage(university_name)
+        if backend == "sharded":
+            from actors.Sharded_Student_Storage import Sharded_Student_Storage
+            return Sharded_Student_Storage(university_name)
+        if backend == "sqlite":
+            from actors.SQLite_Student_Storage import SQLite_Student_Storage
+            return SQLite_Student_Storage(university_name)
+        raise ValueError(f"Archivio degli studenti {backend} non supportato.")
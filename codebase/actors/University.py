@@ -1,29 +1,17 @@
 from datetime import date, timedelta
-from typing import TypedDict, override
+from typing import override
 from actors.Student import Student
+from actors.Student_Storage import Student_Storage, StudentData
 from communication.Hash_Algorithm import Hash_Algorithm
 from communication.Asymmetric_Scheme import Asymmetric_Scheme
 from constants import CREDENTIAL_PERIOD_DAYS, DATA_DIRECTORY, UNIVERSITIES_FOLDER, Activity, ActivityResult, Credential, Exam, ExamResult, StudyPlan, EXCHANGE_DEFAULT_PERIOD_DAYS
 from communication.Encryption_Scheme import Encryption_Scheme
 from communication.User import User
+from persistence import atomic_write_json
 import os
 import json
 
 
-class StudentData(TypedDict):
-    name: str
-    surname: str
-    study_plan: str
-    passed_exams: dict[str, ExamResult]
-    passed_activities: dict[str, ActivityResult]
-    password: str
-    salt: str
-    exchange_plan: dict[str, Exam | Activity] | None
-    exchange_plan_data: dict | None
-    credential: Credential | None
-    credential_ID: str | None
-
-
 class University(User):
     """
         Classe che rappresenta un'università nel sistema.
@@ -53,18 +41,68 @@ class University(User):
                 if plan not in self._study_plans:
                     raise ValueError(f"Il piano di studi {plan} non è presente nell'università {self._name}.")
                 
-        json_path = os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER, f"uni_{self._name}.json")
-        if not os.path.exists(json_path):
-            with open(json_path, "w") as f:
-                json.dump(students if students else {}, f, indent=4)
+        self._storage = Student_Storage.open(self._name)
+        self._pending_writes: set[str]|None = None # Matricole modificate durante un'unità di lavoro, None se le scritture sono immediate
+        self._confirmed_credentials: dict[str, float] = {} # ID della credenziale -> istante in cui lo smart contract l'ha confermata valida
+        if students and self._storage.is_empty():
+            for serial_id, student_data in students.items():
+                self._storage.save_student(serial_id, student_data)
         if not students:
-            with open(json_path, "r") as f:
-                data = json.load(f)
-            self._students = {code: stud for code, stud in data.items()}
+            self._students = self._storage.load_all()
 
     def __str__(self) -> str:
         return f"Università: {self._name}, Codice: {self._code}"
 
+    def get_students_version(self) -> tuple|None:
+        """
+            Restituisce lo stato dell'archivio degli studenti dell'università, che cambia quando viene modificato da un'altra istanza.
+        """
+        return self._storage.get_version()
+
+    def reload_students(self) -> None:
+        """
+            Rilegge i dati degli studenti dall'archivio dell'università, senza ricreare l'università né ricaricarne le chiavi.
+        """
+        self._students = self._storage.load_all()
+
+    def defer_writes(self) -> None:
+        """
+            Rimanda le scritture sull'archivio degli studenti fino a flush_writes, per salvarle tutte insieme.
+        """
+        if self._pending_writes is None:
+            self._pending_writes = set()
+
+    def flush_writes(self) -> None:
+        """
+            Salva in un'unica operazione i record degli studenti modificati da defer_writes in poi, e torna alle scritture immediate.
+        """
+        pending, self._pending_writes = self._pending_writes, None
+        if pending:
+            self._storage.save_students({serial_id: self._students[serial_id] for serial_id in pending})
+
+    def discard_writes(self) -> None:
+        """
+            Scarta le scritture rimandate e rilegge i dati degli studenti dall'archivio.
+        """
+        if self._pending_writes is not None:
+            self._pending_writes = None
+            self.reload_students()
+
+    def close_storage(self) -> None:
+        """
+            Chiude l'archivio degli studenti dell'università, quando l'università non viene più utilizzata.
+        """
+        self._storage.close()
+
+    def _defer_write(self, serial_id: str) -> bool:
+        """
+            Se le scritture sono rimandate registra lo studente come modificato e restituisce True.
+        """
+        if self._pending_writes is None:
+            return False
+        self._pending_writes.add(serial_id)
+        return True
+
     def get_name(self) -> str:
         return self._name
     
@@ -75,6 +113,7 @@ class University(User):
         dict["activities"] = self._activities
         dict["name"] = self._name
         dict["hash"] = self._hash.save_on_json()
+        dict["confirmed_credentials"] = self._confirmed_credentials
         return dict
 
     def get_study_plans(self) -> dict[str, StudyPlan]:
@@ -89,6 +128,7 @@ class University(User):
         activities: dict[str, Activity] = data.get("activities", {})
         university = University(name, code, hashing_algorithm, study_plans, activities)
         university._keys = {key: Encryption_Scheme.load_from_json(value) for key, value in data.get("keys", {}).items()}
+        university._confirmed_credentials = data.get("confirmed_credentials", {})
         return university
     
     def set_public_key(self, public_key: Asymmetric_Scheme):
@@ -115,10 +155,6 @@ class University(User):
             - password: La password da associare allo studente.
             - study_plan: Il nome piano di studi a cui lo studente si immatricola
         """
-        json_path = os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER, f"uni_{self._name}.json")
-        with open(json_path, "r") as f:
-            data = json.load(f)
-
         student_id = student.get_code()
         serial_id = f"{int(student_id):03d}#{int(self._code):03d}"
 
@@ -130,10 +166,8 @@ class University(User):
             if self._students[serial_id].get("exchange_plan_data") and not self._students[serial_id]["password"]: # Se lo studente è già iscritto ma senza password, aggiorna la password
                 
                 self._students[serial_id]["password"] = self._hash.hash(password + self._students[serial_id]["salt"])
-
-                data[serial_id] = self._students[serial_id]
-                with open(json_path, "w") as f:
-                    json.dump(data, f, indent=4)
+                if not self._defer_write(serial_id):
+                    self._storage.save_student(serial_id, self._students[serial_id])
 
                 return
             raise ValueError(f"Lo studente {student_id} è già iscritto all'università {self._name}.")
@@ -154,9 +188,8 @@ class University(User):
         }
 
         self._students[serial_id] = student_data
-        data[serial_id] = student_data
-        with open(json_path, "w") as f:
-            json.dump(data, f, indent=4)
+        if not self._defer_write(serial_id):
+            self._storage.save_student(serial_id, student_data)
 
     def check_password(self, student: Student, password: str) -> bool:
         """
@@ -188,8 +221,7 @@ class University(User):
             with open(json_path, "r") as f:
                 data = json.load(f)
             data[self._code]["study_plans"][plan_name] = study_plan
-            with open(json_path, "w") as f:
-                json.dump(data, f, indent=4)
+            atomic_write_json(json_path, data)
             self._study_plans[plan_name] = study_plan
             print(f"Piano di studi {plan_name} aggiunto all'università {self._name}.")
         else:
@@ -208,8 +240,7 @@ class University(User):
             with open(json_path, "r") as f:
                 data = json.load(f)
             data[self._code]["activities"][activity_name] = {"name": activity_name, "cfus": cfus}
-            with open(json_path, "w") as f:
-                json.dump(data, f, indent=4)
+            atomic_write_json(json_path, data)
             self._activities[activity_name] = {"name": activity_name, "cfus": cfus}
             print(f"Attività {activity_name} aggiunta all'università {self._name}.")
         else:
@@ -226,10 +257,7 @@ class University(User):
             - internal_referrer: Il referente interno dell'università.
         """
         serial_id = f"{int(student.get_code()):03d}#{int(self._code):03d}"
-        json_path = os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER, f"uni_{self._name}.json")
-        with open(json_path, "r") as f:
-            data = json.load(f)
-        if serial_id not in data:
+        if serial_id not in self._students:
             raise ValueError(f" [{self._name}] Lo studente {student.get_code()} non è iscritto all'università.")
 
         self._students[serial_id]["exchange_plan_data"] = {
@@ -238,10 +266,8 @@ class University(User):
             "activities": {activity["name"]: activity["cfus"] for activity in activities},
             "internal_referrer": internal_referrer
         }
-
-        data[serial_id] = self._students[serial_id]
-        with open(json_path, "w") as f:
-            json.dump(data, f, indent=4)
+        if not self._defer_write(serial_id):
+            self._storage.save_student(serial_id, self._students[serial_id])
 
     def accept_incoming_exchange(self, student: Student, incoming_university: 'University', incoming_serial_id: str, incoming_referrer: str, internal_referrer: str, exchange_period_days: int = EXCHANGE_DEFAULT_PERIOD_DAYS):
         """
@@ -254,11 +280,6 @@ class University(User):
             - internal_referrer: Il referente interno dell'università.
         """
         serial_id = f"{int(student.get_code()):03d}#{int(self._code):03d}"
-        json_path = os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER, f"uni_{self._name}.json")
-
-        with open(json_path, "r") as f:
-            data = json.load(f)
-
         student_data:StudentData = {
             "name": student.get_name(),
             "surname": student.get_surname(),
@@ -284,21 +305,14 @@ class University(User):
         }
 
         self._students[serial_id] = student_data
-
-        data[serial_id] = self._students[serial_id]
-        with open(json_path, "w") as f:
-            json.dump(data, f, indent=4)
-            
+        if not self._defer_write(serial_id):
+            self._storage.save_student(serial_id, student_data)
 
     def pass_exam(self, student: Student, results: ExamResult):
         """
             Registra il superamento di un esame da parte dello studente.
         """
         serial_id = f"{int(student.get_code()):03d}#{int(self._code):03d}"
-        json_path = os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER, f"uni_{self._name}.json")
-        with open(json_path, "r") as f:
-            data = json.load(f)
-        
         if serial_id not in self._students.keys():
             raise ValueError(f" [{self._name}] Lo studente {student.get_code()} non è iscritto all'università.")
         
@@ -306,20 +320,14 @@ class University(User):
             self._students[serial_id]["passed_exams"] = {}
 
         self._students[serial_id]["passed_exams"][results["name"]] = results
-
-        data[serial_id] = self._students[serial_id]
-        with open(json_path, "w") as f:
-            json.dump(data, f, indent=4)
+        if not self._defer_write(serial_id):
+            self._storage.save_exam(serial_id, results)
 
     def pass_activity(self, student: Student, results: ActivityResult):
         """
             Registra il superamento di un'attività da parte dello studente.
         """
         serial_id = f"{int(student.get_code()):03d}#{int(self._code):03d}"
-        json_path = os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER, f"uni_{self._name}.json")
-        with open(json_path, "r") as f:
-            data = json.load(f)
-        
         if serial_id not in self._students.keys():
             raise ValueError(f" [{self._name}] Lo studente {student.get_code()} non è iscritto all'università.")
         
@@ -327,10 +335,8 @@ class University(User):
             self._students[serial_id]["passed_activities"] = {}
 
         self._students[serial_id]["passed_activities"][results["name"]] = results
-
-        data[serial_id] = self._students[serial_id]
-        with open(json_path, "w") as f:
-            json.dump(data, f, indent=4)
+        if not self._defer_write(serial_id):
+            self._storage.save_activity(serial_id, results)
 
     def get_student_credential(self, student:Student) -> Credential:
         serial_id = f"{int(student.get_code()):03d}#{int(self._code):03d}"
@@ -394,14 +400,8 @@ class University(User):
         }
 
         self._students[serial_id]["credential"] = credential
-
-        # Salva i nuovi dati della credenziale su file JSON
-        json_path = os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER, f"uni_{self._name}.json")
-        with open(json_path, "r") as f:
-            data = json.load(f)
-            data[serial_id]["credential"] = credential
-        with open(json_path, "w") as f:
-            json.dump(data, f, indent=4)
+        if not self._defer_write(serial_id):
+            self._storage.save_credential(serial_id, credential, student_data["credential_ID"])
 
         return credential
 
@@ -417,14 +417,8 @@ class University(User):
             raise ValueError(f" [{self._name}] Lo studente {student.get_code()} non è iscritto all'università.")
         
         self._students[serial_id]["credential_ID"] = ID
-        # Salva i nuovi dati della credenziale su file JSON
-        json_path = os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER, f"uni_{self._name}.json")
-        with open(json_path, "r") as f:
-            data = json.load(f)
-
-        data[serial_id]["credential_ID"] = ID
-        with open(json_path, "w") as f:
-            json.dump(data, f, indent=4)
+        if not self._defer_write(serial_id):
+            self._storage.save_credential(serial_id, self._students[serial_id]["credential"], ID)
 
     def get_credential_id(self, student:Student) -> str|None:
         """
@@ -438,6 +432,25 @@ class University(User):
         
         return self._students[serial_id]["credential_ID"]
 
+    def confirm_credential(self, credential_ID: str, timestamp: float) -> None:
+        """
+            Registra che lo smart contract ha confermato valida la credenziale all'istante indicato.
+            Entro CREDENTIAL_CONFIRMATION_MAX_AGE le verifiche successive controllano solo le prove di revoca, senza interpellarlo.
+        """
+        self._confirmed_credentials[credential_ID] = timestamp
+
+    def get_credential_confirmation(self, credential_ID: str) -> float|None:
+        """
+            Restituisce l'istante dell'ultima conferma della credenziale da parte dello smart contract, o None se non è mai stata confermata.
+        """
+        return self._confirmed_credentials.get(credential_ID)
+
+    def forget_credential(self, credential_ID: str) -> None:
+        """
+            Scarta la conferma della credenziale, che alla verifica successiva viene chiesta di nuovo allo smart contract.
+        """
+        self._confirmed_credentials.pop(credential_ID, None)
+
     def check_matching(self, student: Student, credential: Credential) -> bool:
         """
             Verifica se la credenziale dello studente corrisponde a quella dell'università.
@@ -534,12 +547,5 @@ class University(User):
 
         self._students[serial_id]["credential"] = credential
         self._students[serial_id]["credential_ID"] = credentia_id
-
-        # Salva i nuovi dati della credenziale su file JSON
-        json_path = os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER, f"uni_{self._name}.json")
-        with open(json_path, "r") as f:
-            data = json.load(f)
-        data[serial_id]["credential"] = credential
-        data[serial_id]["credential_ID"] = credentia_id
-        with open(json_path, "w") as f:
-            json.dump(data, f, indent=4)
\ No newline at end of file
+        if not self._defer_write(serial_id):
+            self._storage.save_credential(serial_id, credential, credentia_id)
\ No newline at end of file
@@ -1,3 +1,7 @@
 from .CA import CA
 from .Student import Student
-from .University import University
\ No newline at end of file
+from .University import University
+from .Student_Storage import Student_Storage, StudentData
+from .JSON_Student_Storage import JSON_Student_Storage
+from .Sharded_Student_Storage import Sharded_Student_Storage
+from .SQLite_Student_Storage import SQLite_Student_Storage
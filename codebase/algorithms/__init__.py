@@ -9,7 +9,7 @@ from .divulga_credenziale import divulga_credenziale
 from .domanda_mobilita import domanda_mobilita
 from .emetti_credenziale import emetti_credenziale
 from .immatricola import immatricola
-from .lettura_dati import lettura_dati
+from .lettura_dati import Data_Repository, get_repository, lettura_dati, salva_blockchain, unita_di_lavoro
 from .logout import logout
 from .presenta_credenziale import presenta_credenziale
 from .pulizia import pulizia
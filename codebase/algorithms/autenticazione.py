@@ -1,14 +1,14 @@
 
 import json
-import os
 import time
 from actors import Student, University
-from algorithms.lettura_dati import lettura_dati
+from algorithms.lettura_dati import Data_Repository, get_repository, lettura_dati, unita_di_lavoro
 from algorithms.read_code import read_code
 from communication import Message, Parametric_Symmetric_Scheme
-from constants import DATA_DIRECTORY, MAXIMUM_TIMESTAMP_DIFFERENCE, STUDENTS_FOLDER, UNIVERSITIES_FOLDER, EXTRACT_RANDOM_NUMBER
+from constants import MAXIMUM_TIMESTAMP_DIFFERENCE, EXTRACT_RANDOM_NUMBER
 
 
+@unita_di_lavoro
 def autenticazione(args:list[str]=[]):
     """
         Funzione per autenticare uno studente.
@@ -185,15 +185,7 @@ def autenticazione(args:list[str]=[]):
 
     # Salva le nuove chiavi simmetriche nei rispettivi file JSON
 
-    with open(os.path.join(DATA_DIRECTORY, STUDENTS_FOLDER, "students.json"), 'r') as f:
-        students_data = json.load(f)
-    with open(os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER, "universities.json"), 'r') as f:
-        universities_data = json.load(f)    
-
-    students_data[student_code] = student.save_on_json()
-    universities_data[university_code] = university.save_on_json()
-
-    with open(os.path.join(DATA_DIRECTORY, STUDENTS_FOLDER, "students.json"), 'w') as f:
-        json.dump(students_data, f, indent=4)
-    with open(os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER, "universities.json"), 'w') as f:
-        json.dump(universities_data, f, indent=4)
+    repository = get_repository()
+    repository.mark_dirty(Data_Repository.STUDENTS, student_code)
+    repository.mark_dirty(Data_Repository.UNIVERSITIES, university_code)
+    repository.save()
@@ -1,18 +1,16 @@
-import json
-import os
 from actors import CA, University
-from algorithms.lettura_dati import lettura_dati
+from algorithms.lettura_dati import Data_Repository, get_repository, lettura_dati, salva_blockchain, unita_di_lavoro
 from algorithms.read_code import read_code
 from communication import Asymmetric_Scheme, Parametric_Asymmetric_Scheme
-from constants import BLOCKCHAIN_FOLDER, DATA_DIRECTORY, UNIVERSITIES_FOLDER, CAs_FOLDER
 
 
+@unita_di_lavoro
 def certifica_universita(args:list[str]=[]):
     """
         Funzione per certificare un'università, richiede il nome della CA e dell'università.
         L'università genera una coppia di chiavi, e chiede alla CA di pubblicare la propria chiave pubblica attraverso un certificato.
     """
-    _, universities, CAs, _, _, smart_contract = lettura_dati()
+    _, universities, CAs, _, blockchain, smart_contract = lettura_dati()
     if len(args) > 0:
         ca_name = args[0]
     else:
@@ -58,13 +56,9 @@ def certifica_universita(args:list[str]=[]):
     print(f"L'università {university.get_name()} è stata certificata con successo dalla CA {ca.get_code()}.")
 
     # Salva le chiavi aggiornate della CA e dell'università nei rispettivi file JSON
-    with open(os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER, "universities.json"), 'w') as f:
-        json.dump({code: uni.save_on_json() for code, uni in universities.items()}, f, indent=4)
-    with open(os.path.join(DATA_DIRECTORY, CAs_FOLDER, "CAs.json"), 'w') as f:
-        json.dump({name: ca_obj.save_on_json() for name, ca_obj in CAs.items()}, f, indent=4)
+    repository = get_repository()
+    repository.mark_dirty(Data_Repository.UNIVERSITIES, university_code)
+    repository.mark_dirty(Data_Repository.CAS, ca_name)
+    repository.save()
 
-    with open(os.path.join(DATA_DIRECTORY, BLOCKCHAIN_FOLDER, "blockchain.json"), 'r') as f:
-        data = json.load(f)
-    data["smart_contract"] = smart_contract.save_on_json()
-    with open(os.path.join(DATA_DIRECTORY, BLOCKCHAIN_FOLDER, "blockchain.json"), 'w') as f:
-        json.dump(data, f, indent=4)
+    salva_blockchain(blockchain, smart_contract)
@@ -1,11 +1,9 @@
-import json
-import os
 from actors import CA
-from algorithms.lettura_dati import lettura_dati
+from algorithms.lettura_dati import Data_Repository, get_repository, lettura_dati, unita_di_lavoro
 from communication import Parametric_Asymmetric_Scheme
-from constants import DATA_DIRECTORY, CAs_FOLDER
 
 
+@unita_di_lavoro
 def crea_CA(args:list[str]=[]):
     CAs = lettura_dati()[2]
     if len(args) > 0:
@@ -18,11 +16,11 @@ def crea_CA(args:list[str]=[]):
     
     print("CA creata con successo.")
     ca = CA(name)
-    CAs[name] = ca
 
     #* La CA genera una coppia di chiavi per sé e per i certificati
     scheme = Parametric_Asymmetric_Scheme()
     ca.add_key(ca, scheme)
 
-    with open(os.path.join(DATA_DIRECTORY, CAs_FOLDER, "CAs.json"), 'w') as f:
-        json.dump({name: ca.save_on_json() for name, ca in CAs.items()}, f, indent=4)
\ No newline at end of file
+    repository = get_repository()
+    repository.add(Data_Repository.CAS, name, ca)
+    repository.save()
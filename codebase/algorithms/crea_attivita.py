@@ -1,10 +1,11 @@
 
 from actors import University
-from algorithms.lettura_dati import lettura_dati
+from algorithms.lettura_dati import lettura_dati, unita_di_lavoro
 from algorithms.read_code import read_code
 from constants import Activity
 
 
+@unita_di_lavoro
 def crea_attivita(args:list[str]=[]):
     universities:dict[str, University] = lettura_dati()[1]
     university_code = read_code("Inserisci il codice dell'università: ", args[0] if len(args) > 0 else None)
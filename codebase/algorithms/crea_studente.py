@@ -1,13 +1,11 @@
 
 
-import json
-import os
 from actors import Student
-from algorithms.lettura_dati import lettura_dati
+from algorithms.lettura_dati import Data_Repository, get_repository, lettura_dati, unita_di_lavoro
 from algorithms.read_code import read_code
-from constants import DATA_DIRECTORY, STUDENTS_FOLDER
 
 
+@unita_di_lavoro
 def crea_studente(args:list[str]=[]):
     students = lettura_dati()[0]
     code = read_code("Inserisci il codice dello studente: ", args[0] if len(args) > 0 else None)
@@ -26,6 +24,7 @@ def crea_studente(args:list[str]=[]):
 
     print("Studente creato con successo.")
     student = Student(name, surname, code)
-    students[code] = student
-    with open(os.path.join(DATA_DIRECTORY, STUDENTS_FOLDER, "students.json"), 'w') as f:
-        json.dump({code: student.save_on_json() for code, student in students.items()}, f, indent=4)
+    repository = get_repository()
+    repository.add(Data_Repository.STUDENTS, code, student)
+    repository.save()
+
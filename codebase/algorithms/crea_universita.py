@@ -1,11 +1,10 @@
-import json
-import os
 from actors import University
-from algorithms.lettura_dati import lettura_dati
+from algorithms.lettura_dati import Data_Repository, get_repository, lettura_dati, unita_di_lavoro
 from algorithms.read_code import read_code
-from constants import BLOCKCHAIN_HASH_ALGORITHM, DATA_DIRECTORY, UNIVERSITIES_FOLDER
+from constants import BLOCKCHAIN_HASH_ALGORITHM
 
 
+@unita_di_lavoro
 def crea_universita(args:list[str]=[]):
     universities:dict[str, University] = lettura_dati()[1]
     code = read_code("Inserisci il codice dell'università: ", args[0] if len(args) > 0 else None)
@@ -20,6 +19,6 @@ def crea_universita(args:list[str]=[]):
     
     print("Università creata con successo.")
     university = University(name, code, BLOCKCHAIN_HASH_ALGORITHM())
-    universities[code] = university
-    with open(os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER, "universities.json"), 'w') as f:
-        json.dump({code: university.save_on_json() for code, university in universities.items()}, f, indent=4)
+    repository = get_repository()
+    repository.add(Data_Repository.UNIVERSITIES, code, university)
+    repository.save()
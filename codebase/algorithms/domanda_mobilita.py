@@ -5,7 +5,7 @@ from pkgutil import read_code
 import time
 from actors import CA, University
 from actors.Student import Student
-from algorithms.lettura_dati import lettura_dati
+from algorithms.lettura_dati import lettura_dati, unita_di_lavoro
 from algorithms.logout import logout
 from algorithms.read_code import read_code
 from algorithms.autenticazione import autenticazione
@@ -13,6 +13,7 @@ from communication import Message
 from constants import MAXIMUM_TIMESTAMP_DIFFERENCE, Activity, StudyPlan, EXTRACT_RANDOM_NUMBER
 
 
+@unita_di_lavoro
 def domanda_mobilita(args:list[str]=[]):
     """
         Funzione per inviare una domanda di mobilità dello studente.
@@ -1,17 +1,39 @@
 import json
-import os
 import time
 from actors import University
 from actors.Student import Student
-from algorithms.lettura_dati import lettura_dati
+from algorithms.lettura_dati import Data_Repository, get_repository, lettura_dati, salva_blockchain, unita_di_lavoro
 from algorithms.logout import logout
 from algorithms.read_code import read_code
 from algorithms.autenticazione import autenticazione
-from blockchain import MerkleTree
+from blockchain import Blockchain, MerkleTree
 from communication import Message
-from constants import BLOCKCHAIN_FOLDER, DATA_DIRECTORY, MAXIMUM_TIMESTAMP_DIFFERENCE, STUDENTS_FOLDER, stringify_credential_dicts, EXTRACT_RANDOM_NUMBER
+from constants import MAXIMUM_TIMESTAMP_DIFFERENCE, EXTRACT_RANDOM_NUMBER, Credential, credential_leaves_list, hash_credential_leaves
 
 
+def _previous_credential_leaves(student:Student, previous_credential_ID:str|None, blockchain:Blockchain) -> tuple[Credential|None, list[str]|None]:
+    """
+        Restituisce la credenziale precedente dello studente e gli hash delle sue foglie, da riutilizzare nella riemissione.
+        Gli hash conservati dallo studente sono usati solo se coincidono con le foglie certificate nel blocco della credenziale,
+        confronto che non richiede di calcolare alcun hash; altrimenti restituisce (None, None) e le foglie vengono ricalcolate.
+    """
+    if not previous_credential_ID:
+        return None, None
+    try:
+        credential, credential_ID = student.get_credential_data()
+    except ValueError:
+        return None, None
+    leaves = student.get_credential_leaves(credential) if credential_ID == previous_credential_ID else None
+    block = blockchain.find_block(previous_credential_ID) if leaves else None
+    if not block or block.get_delete_flag():
+        return None, None
+    tree = block.get_merkle_or_ID()
+    if not isinstance(tree, MerkleTree) or tree.get_leaves() != leaves:
+        return None, None
+    return credential, leaves
+
+
+@unita_di_lavoro
 def emetti_credenziale(args:list[str]=[]):
     """
         Funzione per emettere una credenziale di uno studente in mobilità iscritto ad un'università ospitante.
@@ -59,8 +81,12 @@ def emetti_credenziale(args:list[str]=[]):
     hashing_algorithm = blockchain.get_hashing_algorithm()
     if hashing_algorithm is None:
         raise ValueError("L'algoritmo di hashing della blockchain non è stato definito.")
-    stringified_credential = stringify_credential_dicts(credential)
-    merkle_leafs = [hashing_algorithm.hash(data) for data in stringified_credential]
+    # Gli hash delle foglie canoniche sono calcolati una sola volta e consegnati allo studente insieme alla credenziale
+    # In una riemissione si riutilizzano quelli delle foglie invariate della credenziale precedente
+    previous_credential_ID = university.get_credential_id(student)
+    previous_credential, previous_leaves = _previous_credential_leaves(student, previous_credential_ID, blockchain)
+    credential_leaves = hash_credential_leaves(credential, hashing_algorithm, previous_credential, previous_leaves)
+    merkle_leafs = credential_leaves_list(credential, credential_leaves)
     received_nonce = received_data['nonce']
     blockchain_request = {
         "timestamp": time.time(),
@@ -86,7 +112,8 @@ def emetti_credenziale(args:list[str]=[]):
         raise ValueError("L'università è stata inserita nella blacklist dello smart contract, impossibile procedere con la certificazione della credenziale.")
     
     #* 4 Lo smart contract verifica la richiesta e costruisce il merkle_tree
-    mt = MerkleTree(merkle_leafs, hashing_algorithm)
+    # In caso di riemissione ricalcola solo i cammini delle foglie cambiate rispetto alla credenziale precedente
+    mt = smart_contract.build_credential_MerkleTree(merkle_leafs, previous_credential_ID)
     credential_ID = smart_contract.certificate_credential_MerkleTree(mt, university)
 
 
@@ -114,6 +141,7 @@ def emetti_credenziale(args:list[str]=[]):
     credential_message = {
         "timestamp": time.time(),
         "credential": credential,
+        "credential_leaves": credential_leaves,
         "credential_ID": received_credential_id,
         "nonce": received_nonce,
     }
@@ -132,19 +160,12 @@ def emetti_credenziale(args:list[str]=[]):
         raise ValueError("Il nonce ricevuto non corrisponde a quello inviato.")
 
     received_credential = received_data["credential"]
-    student.save_credential(received_credential, credential_ID)
+    student.save_credential(received_credential, credential_ID, received_data["credential_leaves"])
     # Lo studente salva la credenziale in locale
     logout([university_code, student_code])  # Rimuove le chiavi dello studente dall'università e viceversa
 
-    with open(os.path.join(DATA_DIRECTORY, BLOCKCHAIN_FOLDER, "blockchain.json"), 'w') as f:
-        data = {
-            "blockchain": blockchain.save_on_json(),
-            "smart_contract": smart_contract.save_on_json()
-        }
-        json.dump(data, f, indent=4)
-
-    with open(os.path.join(DATA_DIRECTORY, STUDENTS_FOLDER, "students.json"), 'r') as f:
-        students_data = json.load(f)
-    students_data[student_code] = student.save_on_json()
-    with open(os.path.join(DATA_DIRECTORY, STUDENTS_FOLDER, "students.json"), 'w') as f:
-        json.dump(students_data, f, indent=4)
\ No newline at end of file
+    salva_blockchain(blockchain, smart_contract)
+
+    repository = get_repository()
+    repository.mark_dirty(Data_Repository.STUDENTS, student_code)
+    repository.save()
\ No newline at end of file
@@ -1,13 +1,13 @@
-import os
 import json
 import time
 
-from algorithms.lettura_dati import lettura_dati
+from algorithms.lettura_dati import Data_Repository, get_repository, lettura_dati, unita_di_lavoro
 from actors import CA, Student, University
 from communication import Certificate, Message
-from constants import DATA_DIRECTORY, MAXIMUM_TIMESTAMP_DIFFERENCE, STUDENTS_FOLDER, EXTRACT_RANDOM_NUMBER
+from constants import MAXIMUM_TIMESTAMP_DIFFERENCE, EXTRACT_RANDOM_NUMBER
 
 
+@unita_di_lavoro
 def immatricola(args:list[str]=[]):
     """
         Algoritmo di immatricolazione dello studente presso l'università. Lo studente deve fornire una password per autenticarsi in futuro.
@@ -142,8 +142,9 @@ def immatricola(args:list[str]=[]):
         print("La password non può essere vuota.")
         password = input("Inserisci una password per autenticarti all'università: ")
     student.set_password(password, university) # Lo studente si ricorderà la password per usi futuri (viene salvata in student.json in chiaro a scopo didattico)
-    with open(os.path.join(DATA_DIRECTORY, STUDENTS_FOLDER, "students.json"), 'w') as f:
-        json.dump({code: s.save_on_json() for code, s in students.items()}, f, indent=4)
+    repository = get_repository()
+    repository.mark_dirty(Data_Repository.STUDENTS, student_name)
+    repository.save()
 
     password_message = {
         "password": password,
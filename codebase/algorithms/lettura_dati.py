@@ -1,9 +1,12 @@
+import functools
 import json
 import os
+from contextlib import contextmanager
 from actors import CA, Student, University
-from blockchain import Smart_Contract, Blockchain
+from blockchain import Smart_Contract, Blockchain, Ledger_Storage
 from communication import Parametric_Asymmetric_Scheme
-from constants import BLOCKCHAIN_FOLDER, DATA_DIRECTORY, STUDENTS_FOLDER, UNIVERSITIES_FOLDER, CAs_FOLDER
+from constants import BLOCKCHAIN_FOLDER, BLOCKCHAIN_VERIFY_ON_LOAD, DATA_DIRECTORY, STUDENTS_FOLDER, UNIVERSITIES_FOLDER, CAs_FOLDER
+from persistence import Write_Journal, atomic_write_json
 
 
 def carica_blockchain()-> tuple[Blockchain, Smart_Contract]:
@@ -11,85 +14,381 @@ def carica_blockchain()-> tuple[Blockchain, Smart_Contract]:
         Il seguente algoritmo carica la struttura della blockchain e istanzia uno smart contract, col quale le università possono comunicare
         Si presume che tutte le università siano a conoscenza della chiave pubblica dello smart contract, e che a sua volta lo smart contract sia a conoscenza
         di tutte le chiavi pubbliche delle università a cui è permesso manipolare la blockchain.
+        Un eventuale blockchain.json del vecchio formato viene importato nel registro a segmenti e rinominato.
     """
 
-    if not os.path.exists(os.path.join(DATA_DIRECTORY, BLOCKCHAIN_FOLDER)):
-        os.makedirs(os.path.join(DATA_DIRECTORY, BLOCKCHAIN_FOLDER))
-    if not os.path.exists(os.path.join(DATA_DIRECTORY, BLOCKCHAIN_FOLDER, "blockchain.json")):
+    storage = Ledger_Storage(os.path.join(DATA_DIRECTORY, BLOCKCHAIN_FOLDER))
+    legacy_file = os.path.join(DATA_DIRECTORY, BLOCKCHAIN_FOLDER, "blockchain.json")
+    if not storage.exists() and os.path.exists(legacy_file):
+        with open(legacy_file, 'r') as f:
+            blockchain_data = json.load(f)
+        blockchain = Blockchain.load_from_json(blockchain_data["blockchain"], blockchain_data.get("checkpoints", []))
+        storage.sync(blockchain)
+        storage.save_smart_contract(blockchain_data["smart_contract"])
+        os.replace(legacy_file, legacy_file + ".old")
+
+    if not storage.exists():
         blockchain = Blockchain()
         smart_contract = Smart_Contract(blockchain, Parametric_Asymmetric_Scheme(), None)
-        with open(os.path.join(DATA_DIRECTORY, BLOCKCHAIN_FOLDER, "blockchain.json"), 'w') as f:
-            data = {
-                "blockchain": blockchain.save_on_json(),
-                "smart_contract": smart_contract.save_on_json()
-            }
-            json.dump(data, f, indent=4)
+        salva_blockchain(blockchain, smart_contract)
     else:
-        with open(os.path.join(DATA_DIRECTORY, BLOCKCHAIN_FOLDER, "blockchain.json"), 'r') as f:
-            blockchain_data = json.load(f)
-            blockchain = Blockchain.load_from_json(blockchain_data["blockchain"])
-            smart_contract = Smart_Contract.load_from_json(blockchain_data["smart_contract"])
-        smart_contract._link_blockchain(blockchain) # Perdita del riferimento dopo lettura
+        blockchain = storage.load_blockchain()
+        smart_contract = Smart_Contract.load_from_json(storage.load_smart_contract())
+        smart_contract._link_blockchain(blockchain, storage.load_revocation_filter(), storage.load_revocation_tree()) # Perdita del riferimento dopo lettura
+        if BLOCKCHAIN_VERIFY_ON_LOAD:
+            invalid_height = smart_contract.verify_blockchain()
+            if invalid_height is not None:
+                raise ValueError(f"La blockchain è stata alterata: il blocco {invalid_height} non è valido.")
     return blockchain, smart_contract
 
 
+def salva_blockchain(blockchain: Blockchain, smart_contract: Smart_Contract) -> None:
+    """
+        Aggiunge al registro i soli blocchi nuovi e salva i checkpoint di verifica e lo stato dello smart contract.
+        Prima del salvataggio lo smart contract firma un nuovo checkpoint, se sono stati aggiunti abbastanza blocchi.
+        Durante un'unità di lavoro il salvataggio è rimandato alla sua conclusione.
+    """
+    if _repository._defer_blockchain(blockchain, smart_contract):
+        return
+    smart_contract.checkpoint_blockchain()
+    storage = Ledger_Storage(os.path.join(DATA_DIRECTORY, BLOCKCHAIN_FOLDER))
+    storage.sync(blockchain)
+    storage.save_smart_contract(smart_contract.save_on_json())
+    revocation_tree = smart_contract.save_revocation_tree()
+    if revocation_tree is not None:
+        # I nodi sono scritti prima dell'indice, che con la sua radice indica se sono aggiornati
+        storage.save_revocation_tree(revocation_tree)
+    storage.save_revocation_filter(smart_contract.save_revocation_filter())
+    _repository._blockchain_saved(blockchain, smart_contract)
+
+
+class Data_Repository():
+    """
+        Repository dei dati condiviso da tutto il processo.
+        Mantiene una mappa delle identità di studenti, università e CA, per cui letture successive restituiscono gli stessi oggetti
+        senza rileggere i file JSON né ricaricare le chiavi. Una sezione viene ricaricata solo se il suo file è cambiato su disco,
+        confrontandone data di modifica e dimensione con quelle dell'ultima lettura o dell'ultimo salvataggio del repository.
+        Gli oggetti modificati vanno segnati con mark_dirty, e save scrive le sole voci segnate.
+        Dentro unit_of_work i salvataggi sono rimandati e le sezioni, una volta lette, non vengono ricaricate,
+        per cui le modifiche di un'intera esecuzione di un algoritmo sono scritte una sola volta alla fine, o scartate in caso di errore.
+    """
+    STUDENTS = "students"
+    UNIVERSITIES = "universities"
+    CAS = "CAs"
+    CONFIG = "config"
+    BLOCKCHAIN = "blockchain"
+
+    def __init__(self, directory: str = DATA_DIRECTORY):
+        self._directory = directory
+        self._stamps: dict[str, tuple] = {} # Sezione -> stato dei suoi file all'ultima lettura o scrittura
+        self._data: dict[str, dict] = {} # Sezione -> contenuto JSON del file
+        self._objects: dict[str, dict] = {} # Sezione -> mappa delle identità, codice -> oggetto
+        self._dirty: dict[str, set[str]] = {} # Sezione -> codici degli oggetti modificati e non ancora salvati
+        self._university_stamps: dict[str, tuple|None] = {} # Codice -> stato dell'archivio degli studenti dell'università
+        self._blockchain: tuple[Blockchain, Smart_Contract]|None = None
+        self._loads: dict[str, int] = {}
+        self._unit_depth = 0 # Numero di unità di lavoro annidate in corso
+        self._unit_sections: set[str] = set() # Sezioni già lette, e quindi fissate, nell'unità di lavoro in corso
+        self._pending_blockchain: tuple[Blockchain, Smart_Contract]|None = None # Blockchain da salvare alla fine dell'unità di lavoro
+
+    def _path(self, section: str) -> str:
+        if section == Data_Repository.STUDENTS:
+            return os.path.join(self._directory, STUDENTS_FOLDER, "students.json")
+        if section == Data_Repository.UNIVERSITIES:
+            return os.path.join(self._directory, UNIVERSITIES_FOLDER, "universities.json")
+        if section == Data_Repository.CAS:
+            return os.path.join(self._directory, CAs_FOLDER, "CAs.json")
+        if section == Data_Repository.CONFIG:
+            return os.path.join(self._directory, "config.json")
+        raise ValueError(f"La sezione {section} non esiste.")
+
+    def _files(self, section: str) -> list[str]:
+        """
+            Restituisce i file da cui dipende la sezione.
+        """
+        if section == Data_Repository.BLOCKCHAIN:
+            directory = os.path.join(self._directory, BLOCKCHAIN_FOLDER)
+            names = ["blockchain.json", Ledger_Storage.INDEX_FILE, Ledger_Storage.CHECKPOINTS_FILE, Ledger_Storage.SMART_CONTRACT_FILE, Ledger_Storage.REVOCATION_FILTER_FILE]
+            return [os.path.join(directory, name) for name in names]
+        if section == Data_Repository.UNIVERSITIES:
+            return [self._path(section), os.path.join(self._directory, UNIVERSITIES_FOLDER, "uni_.json")]
+        return [self._path(section)]
+
+    @staticmethod
+    def _stamp_file(path: str) -> tuple[int, int]|None:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _stamp(self, section: str) -> tuple:
+        return tuple(Data_Repository._stamp_file(path) for path in self._files(section))
+
+    def _initialize_files(self) -> None:
+        """
+            Crea le cartelle e i file JSON vuoti non ancora presenti,
+            dopo aver completato le scritture rimaste nel journal da un'esecuzione interrotta.
+        """
+        for folder in (STUDENTS_FOLDER, UNIVERSITIES_FOLDER, CAs_FOLDER):
+            os.makedirs(os.path.join(self._directory, folder), exist_ok=True)
+        Write_Journal(self._directory).recover()
+        for section in (Data_Repository.CONFIG, Data_Repository.STUDENTS, Data_Repository.UNIVERSITIES, Data_Repository.CAS):
+            path = self._path(section)
+            if not os.path.exists(path):
+                atomic_write_json(path, {})
+
+    def _load(self, section: str) -> None:
+        """
+            Legge il file della sezione e ricrea i suoi oggetti.
+        """
+        self._loads[section] = self._loads.get(section, 0) + 1
+        self._stamps[section] = self._stamp(section)
+        with open(self._path(section), 'r') as f:
+            data = json.load(f)
+        self._data[section] = data
+        self._dirty.pop(section, None)
+        if section == Data_Repository.STUDENTS:
+            self._objects[section] = {code: Student.load_from_json(value) for code, value in data.items()}
+        elif section == Data_Repository.UNIVERSITIES:
+            self._close_universities()
+            entries = dict(data)
+            private_uni_file = os.path.join(self._directory, UNIVERSITIES_FOLDER, "uni_.json")
+            if os.path.exists(private_uni_file):
+                with open(private_uni_file, 'r') as f_priv:
+                    entries.update(json.load(f_priv))
+            self._objects[section] = {code: University.load_from_json(value) for code, value in entries.items()}
+            if self._unit_depth > 0:
+                for university in self._objects[section].values():
+                    university.defer_writes()
+            self._university_stamps = {code: university.get_students_version() for code, university in self._objects[section].items()}
+        elif section == Data_Repository.CAS:
+            self._objects[section] = {code: CA.load_from_json(value) for code, value in data.items()}
+        else:
+            self._objects[section] = data
+
+    def _close_universities(self) -> None:
+        """
+            Chiude gli archivi degli studenti delle università caricate, prima di scartarle.
+        """
+        for university in self._objects.get(Data_Repository.UNIVERSITIES, {}).values():
+            university.close_storage()
+
+    def _get(self, section: str) -> dict:
+        """
+            Restituisce gli oggetti della sezione, ricaricandola solo se i suoi file sono cambiati su disco.
+        """
+        if section in self._unit_sections:
+            # Durante un'unità di lavoro gli oggetti già letti, con le loro modifiche non salvate, restano validi
+            return self._objects[section]
+        if self._stamps.get(section) != self._stamp(section):
+            self._initialize_files()
+            self._load(section)
+        elif section == Data_Repository.UNIVERSITIES:
+            # I dati degli studenti di ogni università sono in un archivio a parte, riletto senza ricreare l'università
+            for code, university in self._objects[section].items():
+                stamp = university.get_students_version()
+                if stamp != self._university_stamps.get(code):
+                    if stamp is not None:
+                        university.reload_students()
+                    self._university_stamps[code] = stamp
+        if self._unit_depth > 0:
+            self._unit_sections.add(section)
+        return self._objects[section]
+
+    def get_students(self) -> dict[str, Student]:
+        return self._get(Data_Repository.STUDENTS)
+
+    def get_universities(self) -> dict[str, University]:
+        return self._get(Data_Repository.UNIVERSITIES)
+
+    def get_CAs(self) -> dict[str, CA]:
+        return self._get(Data_Repository.CAS)
+
+    def get_config(self) -> dict[str, str]:
+        return self._get(Data_Repository.CONFIG)
+
+    def get_blockchain(self) -> tuple[Blockchain, Smart_Contract]:
+        """
+            Restituisce la blockchain e lo smart contract, ricaricandoli solo se il registro è cambiato su disco.
+        """
+        if Data_Repository.BLOCKCHAIN in self._unit_sections:
+            return self._blockchain # type: ignore
+        stamp = self._stamp(Data_Repository.BLOCKCHAIN)
+        if self._blockchain is None or self._stamps.get(Data_Repository.BLOCKCHAIN) != stamp:
+            self._loads[Data_Repository.BLOCKCHAIN] = self._loads.get(Data_Repository.BLOCKCHAIN, 0) + 1
+            self._blockchain = carica_blockchain()
+            self._stamps[Data_Repository.BLOCKCHAIN] = self._stamp(Data_Repository.BLOCKCHAIN)
+        if self._unit_depth > 0:
+            self._unit_sections.add(Data_Repository.BLOCKCHAIN)
+        return self._blockchain
+
+    def _blockchain_saved(self, blockchain: Blockchain, smart_contract: Smart_Contract) -> None:
+        """
+            Aggiorna lo stato dei file del registro dopo un salvataggio, per non ricaricare gli oggetti appena salvati.
+        """
+        if self._blockchain is not None and self._blockchain[0] is blockchain and self._blockchain[1] is smart_contract:
+            self._stamps[Data_Repository.BLOCKCHAIN] = self._stamp(Data_Repository.BLOCKCHAIN)
+
+    def _defer_blockchain(self, blockchain: Blockchain, smart_contract: Smart_Contract) -> bool:
+        """
+            Se è in corso un'unità di lavoro rimanda il salvataggio della blockchain alla sua conclusione e restituisce True.
+        """
+        if self._unit_depth == 0:
+            return False
+        self._pending_blockchain = (blockchain, smart_contract)
+        return True
+
+    def add(self, section: str, code: str, item: Student|University|CA) -> None:
+        """
+            Aggiunge un nuovo oggetto alla mappa delle identità della sezione, segnandolo da salvare.
+        """
+        self._get(section)[code] = item
+        if isinstance(item, University) and self._unit_depth > 0:
+            item.defer_writes()
+        self.mark_dirty(section, code)
+
+    def mark_dirty(self, section: str, code: str) -> None:
+        """
+            Segna l'oggetto con il codice specificato come modificato, per salvarlo al prossimo save.
+            La sezione non viene ricaricata anche se il suo file è cambiato, per non scartare le modifiche in memoria da segnare.
+        """
+        if code not in self._objects.get(section, {}):
+            raise ValueError(f"L'oggetto {code} non è presente nella sezione {section}.")
+        self._dirty.setdefault(section, set()).add(code)
+
+    def is_dirty(self, section: str, code: str|None = None) -> bool:
+        """
+            Indica se la sezione, o l'oggetto indicato, ha modifiche non ancora salvate.
+        """
+        dirty = self._dirty.get(section, set())
+        return bool(dirty) if code is None else code in dirty
+
+    def save(self) -> None:
+        """
+            Scrive nei file JSON le sole voci degli oggetti segnati come modificati.
+            Se nel frattempo il file è stato modificato da altri, le voci vengono unite al suo contenuto attuale.
+            I file di tutte le sezioni modificate sono scritti insieme attraverso il journal, per cui un'interruzione non ne aggiorna solo alcuni.
+            Durante un'unità di lavoro non scrive nulla, le voci restano segnate fino alla sua conclusione.
+        """
+        if self._unit_depth > 0:
+            return
+        files: dict[str, dict] = {}
+        for section, codes in self._dirty.items():
+            if not codes:
+                continue
+            path = self._path(section)
+            data = self._data[section]
+            if self._stamps.get(section) != self._stamp(section) and os.path.exists(path):
+                with open(path, 'r') as f:
+                    data = json.load(f)
+            objects = self._objects[section]
+            for code in codes:
+                item = objects[code]
+                data[code] = item if section == Data_Repository.CONFIG else item.save_on_json()
+            files[path] = data
+            self._data[section] = data
+        Write_Journal(self._directory).commit(files)
+        for section, codes in self._dirty.items():
+            if codes:
+                self._stamps[section] = self._stamp(section)
+        self._dirty.clear()
+
+    @contextmanager
+    def unit_of_work(self):
+        """
+            Contesto che raccoglie tutte le modifiche fatte al suo interno e le salva una sola volta all'uscita, nell'ordine di _flush:
+            prima la blockchain, poi gli archivi degli studenti delle università, infine le voci segnate di studenti, università e CA.
+            Se all'interno viene sollevata un'eccezione, come gli errori di validazione o di replay dei protocolli,
+            le modifiche vengono scartate e la lettura successiva rilegge i dati da disco.
+            Un'unità di lavoro aperta dentro un'altra si unisce a quella esterna.
+        """
+        if self._unit_depth == 0:
+            for university in self._objects.get(Data_Repository.UNIVERSITIES, {}).values():
+                university.defer_writes()
+        self._unit_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._unit_depth -= 1
+            if self._unit_depth == 0:
+                self._unit_sections.clear()
+                self._rollback()
+            raise
+        self._unit_depth -= 1
+        if self._unit_depth == 0:
+            self._unit_sections.clear()
+            self._flush()
+
+    def _flush(self) -> None:
+        """
+            Salva le modifiche raccolte dall'unità di lavoro appena conclusa.
+            Il salvataggio è ordinato ma non atomico: prima il registro della blockchain, poi gli archivi degli studenti delle università,
+            infine i file JSON attraverso il journal, e ciascun passo è atomico solo al proprio interno.
+            Un'interruzione tra due passi lascia quindi un nuovo blocco nel registro senza il credential_ID corrispondente
+            negli archivi di studenti e università; il blocco resta valido e la credenziale può essere emessa di nuovo.
+        """
+        pending_blockchain, self._pending_blockchain = self._pending_blockchain, None
+        if pending_blockchain is not None:
+            salva_blockchain(*pending_blockchain)
+        for university in self._objects.get(Data_Repository.UNIVERSITIES, {}).values():
+            university.flush_writes()
+        self.save()
+
+    def _rollback(self) -> None:
+        """
+            Scarta le modifiche raccolte dall'unità di lavoro, compresi gli oggetti modificati in memoria.
+        """
+        self._pending_blockchain = None
+        for university in self._objects.get(Data_Repository.UNIVERSITIES, {}).values():
+            university.discard_writes()
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """
+            Scarta tutti gli oggetti caricati e le modifiche non salvate; la prossima lettura rilegge i file.
+        """
+        self._close_universities()
+        self._stamps.clear()
+        self._data.clear()
+        self._objects.clear()
+        self._dirty.clear()
+        self._university_stamps.clear()
+        self._unit_sections.clear()
+        self._blockchain = None
+
+    def get_loads(self) -> dict[str, int]:
+        """
+            Restituisce il numero di letture da disco di ogni sezione, per valutare l'efficacia della cache.
+        """
+        return dict(self._loads)
+
+
+_repository = Data_Repository()
+
+
+def get_repository() -> Data_Repository:
+    """
+        Restituisce il repository dei dati condiviso da tutto il processo.
+    """
+    return _repository
+
+
+def unita_di_lavoro(algorithm):
+    """
+        Decoratore che esegue l'algoritmo dentro un'unità di lavoro del repository,
+        per cui le sue modifiche sono salvate una sola volta alla fine, o scartate se l'algoritmo solleva un'eccezione.
+    """
+    @functools.wraps(algorithm)
+    def wrapper(*args, **kwargs):
+        with _repository.unit_of_work():
+            return algorithm(*args, **kwargs)
+    return wrapper
+
 
 def lettura_dati() -> tuple[dict[str, Student], dict[str, University], dict[str, CA], dict[str, str], Blockchain, Smart_Contract]:
     """
         L'algoritmo legge i dati e le configurazioni dai file JSON presenti nella cartella "data".
+        Le letture passano dal repository condiviso, per cui i file vengono riletti solo se sono cambiati dall'ultima lettura.
     """
-    if not os.path.exists(DATA_DIRECTORY):
-        os.makedirs(DATA_DIRECTORY)
-
-    if not os.path.exists(os.path.join(DATA_DIRECTORY, "config.json")):
-        with open(os.path.join(DATA_DIRECTORY, "config.json"), 'w') as f:
-            configurazione = {}
-            # Eventuale configurazioni da inizializzare
-            json.dump(configurazione, f, indent=4)
-
-    if not os.path.exists(os.path.join(DATA_DIRECTORY, STUDENTS_FOLDER)):
-        os.makedirs(os.path.join(DATA_DIRECTORY, STUDENTS_FOLDER))
-    if not os.path.exists(os.path.join(DATA_DIRECTORY, STUDENTS_FOLDER, "students.json")):
-        with open(os.path.join(DATA_DIRECTORY, STUDENTS_FOLDER, "students.json"), 'w') as f:
-            students = {}
-            # Eventuale lista di studenti da inizializzare
-            json.dump(students, f, indent=4)
-
-    if not os.path.exists(os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER)):
-        os.makedirs(os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER))
-    if not os.path.exists(os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER, "universities.json")):
-        with open(os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER, "universities.json"), 'w') as f:
-            universities = {}
-            json.dump(universities, f, indent=4)
-
-    if not os.path.exists(os.path.join(DATA_DIRECTORY, CAs_FOLDER)):
-        os.makedirs(os.path.join(DATA_DIRECTORY, CAs_FOLDER))
-    if not os.path.exists(os.path.join(DATA_DIRECTORY, CAs_FOLDER, "CAs.json")):
-        with open(os.path.join(DATA_DIRECTORY, CAs_FOLDER, "CAs.json"), 'w') as f:
-            CAs = {}
-            json.dump(CAs, f, indent=4)
-
-    with open(os.path.join(DATA_DIRECTORY, STUDENTS_FOLDER, "students.json"), 'r') as f:
-        students = json.load(f)
-    with open(os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER, "universities.json"), 'r') as f:
-        universities = json.load(f)
-        private_uni_file = os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER, "uni_.json")
-        if os.path.exists(private_uni_file):
-            with open(private_uni_file, 'r') as f_priv:
-                private_universities = json.load(f_priv)
-                universities.update(private_universities)
-    with open(os.path.join(DATA_DIRECTORY, CAs_FOLDER, "CAs.json"), 'r') as f:
-        CAs = json.load(f)
-    with open(os.path.join(DATA_DIRECTORY, "config.json"), 'r') as f:
-        configurazione = json.load(f)
-
-    for student_name, student_data in students.items():
-        students[student_name] = Student.load_from_json(student_data)
-
-    for university_name, university_data in universities.items():
-        universities[university_name] = University.load_from_json(university_data)
-    
-    for ca_name, ca_data in CAs.items():
-        CAs[ca_name] = CA.load_from_json(ca_data)
-
-    return students, universities, CAs, configurazione, *carica_blockchain()
+    return _repository.get_students(), _repository.get_universities(), _repository.get_CAs(), _repository.get_config(), *_repository.get_blockchain()
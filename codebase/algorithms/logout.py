@@ -1,19 +1,16 @@
-import json
-import os
 from actors import University
 from actors.Student import Student
-from algorithms.lettura_dati import lettura_dati
+from algorithms.lettura_dati import Data_Repository, get_repository, lettura_dati, unita_di_lavoro
 from algorithms.read_code import read_code
-from constants import DATA_DIRECTORY, STUDENTS_FOLDER, UNIVERSITIES_FOLDER
 
 
+@unita_di_lavoro
 def logout(args:list[str]=[]):
     """
         Funzione per effettuare il logout dello studente.
         Rimuove le chiavi dello studente dall'università e viceversa.
     """
-    students = lettura_dati()[0]
-    universities = lettura_dati()[1]
+    students, universities = lettura_dati()[0:2]
 
     university_code = read_code("Inserisci il codice dell'università: ", args[0] if len(args) > 0 else None)
     while university_code not in universities:
@@ -33,10 +30,6 @@ def logout(args:list[str]=[]):
 
         # Salva le nuove chiavi simmetriche nei rispettivi file JSON
 
-    with open(os.path.join(DATA_DIRECTORY, STUDENTS_FOLDER, "students.json"), 'r') as f:
-        students_data = json.load(f)
-    with open(os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER, "universities.json"), 'r') as f:
-        universities_data = json.load(f)    
 
     # Lo studente rimuove la chiave dell'università dal proprio database e riprende quella pubblica
     # Per comodità si prende la precedente chiave pubblica dell'università
@@ -44,11 +37,7 @@ def logout(args:list[str]=[]):
     student.add_key(university, previous_public_key)
 
 
-    students_data[student_code] = student.save_on_json()
-    universities_data[university_code] = university.save_on_json()
-
-
-    with open(os.path.join(DATA_DIRECTORY, STUDENTS_FOLDER, "students.json"), 'w') as f:
-        json.dump(students_data, f, indent=4)
-    with open(os.path.join(DATA_DIRECTORY, UNIVERSITIES_FOLDER, "universities.json"), 'w') as f:
-        json.dump(universities_data, f, indent=4)
\ No newline at end of file
+    repository = get_repository()
+    repository.mark_dirty(Data_Repository.STUDENTS, student_code)
+    repository.mark_dirty(Data_Repository.UNIVERSITIES, university_code)
+    repository.save()
\ No newline at end of file
@@ -3,15 +3,16 @@ import json
 import time
 from actors import University
 from actors.Student import Student
-from algorithms.lettura_dati import lettura_dati
+from algorithms.lettura_dati import lettura_dati, unita_di_lavoro
 from algorithms.logout import logout
 from algorithms.read_code import read_code
 from algorithms.autenticazione import autenticazione
 from algorithms.divulga_credenziale import divulga_credenziale
-from constants import MAXIMUM_TIMESTAMP_DIFFERENCE, EXTRACT_RANDOM_NUMBER, Credential, stringify_credential_dicts
+from constants import MAXIMUM_TIMESTAMP_DIFFERENCE, EXTRACT_RANDOM_NUMBER, Credential, canonicalize_credential_dicts, stringify_credential_dicts
 from communication import Message
 
 
+@unita_di_lavoro
 def presenta_credenziale(args:list[str]=[]) -> tuple[Credential, Credential]:
     students, universities, _, _, blockchain, smart_contract = lettura_dati()
 
@@ -51,6 +52,7 @@ def presenta_credenziale(args:list[str]=[]) -> tuple[Credential, Credential]:
         "nonce": initial_nonce,
         "text": "Richiesta di validazione della credenziale",
         "credential": new_credential,
+        "credential_leaves": student.get_credential_leaves(new_credential), # Hash salvati all'emissione, che indicano la codifica usata; l'università li ricalcola comunque
         "credential_ID": credential_ID
     }
 
@@ -60,6 +62,7 @@ def presenta_credenziale(args:list[str]=[]) -> tuple[Credential, Credential]:
     received_message = university.get_last_message()
     received_data = json.loads(received_message.get_content())
     received_credential = received_data["credential"]
+    received_leaves = received_data.get("credential_leaves")
     received_credential_id = received_data["credential_ID"]
     received_nonce = received_data["nonce"]
     received_timestamp = received_data['timestamp']
@@ -71,7 +74,14 @@ def presenta_credenziale(args:list[str]=[]) -> tuple[Credential, Credential]:
         raise ValueError("La credenziale non è valida.")
 
     hashing_algorithm = blockchain.get_hashing_algorithm()
-    merkle_leafs = [hashing_algorithm.hash(data) for data in stringify_credential_dicts(received_credential)]
+    if received_leaves is None:
+        # Credenziale emessa con la codifica precedente, senza hash delle foglie salvati
+        merkle_leafs = hashing_algorithm.hash_many(stringify_credential_dicts(received_credential))
+    else:
+        # Gli hash ricevuti non sono fidati: sono ricalcolati dal contenuto divulgato e accettati solo se coincidono
+        merkle_leafs = hashing_algorithm.hash_many(canonicalize_credential_dicts(received_credential))
+        if merkle_leafs != received_leaves:
+            raise ValueError("Gli hash delle foglie non corrispondono alla credenziale.")
 
     request_certification_validation = {
         "timestamp": time.time(),
@@ -1,15 +1,15 @@
 
 import json
-import os
 import time
 from actors import University
 from actors.Student import Student
-from algorithms.lettura_dati import lettura_dati
+from algorithms.lettura_dati import lettura_dati, salva_blockchain, unita_di_lavoro
 from algorithms.read_code import read_code
 from communication import Message
-from constants import BLOCKCHAIN_FOLDER, DATA_DIRECTORY, MAXIMUM_TIMESTAMP_DIFFERENCE
+from constants import MAXIMUM_TIMESTAMP_DIFFERENCE
 
 
+@unita_di_lavoro
 def revoca_credenziale(args:list[str]=[]):
     students, universities, _, _, blockchain, smart_contract = lettura_dati()
 
@@ -70,10 +70,5 @@ def revoca_credenziale(args:list[str]=[]):
     received_message = university.get_last_message()
     received_data = json.loads(received_message.get_content())
 
-    with open(os.path.join(DATA_DIRECTORY, BLOCKCHAIN_FOLDER, "blockchain.json"), 'w') as f:
-        data = {
-            "blockchain": blockchain.save_on_json(),
-            "smart_contract": smart_contract.save_on_json()
-        }
-        json.dump(data, f, indent=4)
+    salva_blockchain(blockchain, smart_contract)
 
@@ -3,13 +3,15 @@ import json
 import time
 from actors import University
 from actors.Student import Student
-from algorithms.lettura_dati import lettura_dati
+from algorithms.lettura_dati import Data_Repository, get_repository, lettura_dati, unita_di_lavoro
 from algorithms.read_code import read_code
+from blockchain import Smart_Contract
 from communication import Message
-from constants import MAXIMUM_TIMESTAMP_DIFFERENCE
+from constants import CREDENTIAL_CONFIRMATION_MAX_AGE, MAXIMUM_TIMESTAMP_DIFFERENCE
 
+@unita_di_lavoro
 def verifica_credenziale(args:list[str]=[]):
-    students, universities, _, _, _, smart_contract = lettura_dati()
+    students, universities, _, _, blockchain, smart_contract = lettura_dati()
 
     student_code = read_code("Inserisci il codice dello studente: ", args[0] if len(args) > 0 else None)
     while student_code not in students:
@@ -29,47 +31,75 @@ def verifica_credenziale(args:list[str]=[]):
     if not credential_ID:
         raise ValueError("Credenziale non trovata per lo studente.")
 
-    # L'università invia la richiesta di verifica allo smart contract
-    verify_message = {
-        "timestamp": time.time(),
-        "credential_ID": credential_ID,
-        "text": "Richiesta di verifica della validità della credenziale"
-    }
-    message = Message(json.dumps(verify_message))
-    university.add_key(smart_contract, smart_contract.get_public_key())
-    university.send(smart_contract, message, encrypt=False, sign=True)
-
-    # Lo smart contract riceve la richiesta e verifica la validità della credenziale
-    received_message = smart_contract.get_last_message()
-    received_data = json.loads(received_message.get_content())
-    received_credential_id = received_data["credential_ID"]
-    received_timestamp = received_data["timestamp"]
-    if abs(time.time() - received_timestamp) > MAXIMUM_TIMESTAMP_DIFFERENCE:
-        raise ValueError("La differenza di timestamp supera il limite consentito, possibile replay attack.")
-
-    if smart_contract.is_blacklisted(university):
-        raise ValueError("L'università è stata inserita nella blacklist dello smart contract, impossibile procedere con la verifica.")
-
-    is_valid = smart_contract.validate_credential_ID(received_credential_id)
-
-    # Lo smart contract risponde all'università con l'esito della verifica
-    response_message = {
-        "timestamp": time.time(),
-        "credential_ID": received_credential_id,
-        "is_valid": is_valid
-    }
-    smart_contract.send(university, Message(json.dumps(response_message)), sign=True)
-
-
-    received_message = university.get_last_message()
-    received_data = json.loads(received_message.get_content())
-    if not received_data.get("credential_ID") == credential_ID:
-        raise ValueError("L'ID della credenziale ricevuto non corrisponde a quello inviato.")
-    if abs(time.time() - received_data['timestamp']) > MAXIMUM_TIMESTAMP_DIFFERENCE:
-        raise ValueError("La differenza di timestamp supera il limite consentito, possibile replay attack.")
-
-
-    received_is_valid = received_data["is_valid"]
+    # Radice delle revoche dell'ultimo blocco della blockchain, letta dall'università senza interpellare lo smart contract
+    last_block = blockchain.get_last_block()
+    state_root = last_block.get_state_root() if last_block else ""
+
+    # Una credenziale confermata di recente dallo smart contract è verificata con le sole prove di revoca
+    confirmation = university.get_credential_confirmation(credential_ID)
+    confirmed = bool(state_root) and confirmation is not None and time.time() - confirmation <= CREDENTIAL_CONFIRMATION_MAX_AGE
+    if confirmed:
+        received_is_valid = True
+    else:
+        # L'università invia la richiesta di verifica allo smart contract
+        verify_message = {
+            "timestamp": time.time(),
+            "credential_ID": credential_ID,
+            "text": "Richiesta di verifica della validità della credenziale"
+        }
+        message = Message(json.dumps(verify_message))
+        university.add_key(smart_contract, smart_contract.get_public_key())
+        university.send(smart_contract, message, encrypt=False, sign=True)
+
+        # Lo smart contract riceve la richiesta e verifica la validità della credenziale
+        received_message = smart_contract.get_last_message()
+        received_data = json.loads(received_message.get_content())
+        received_credential_id = received_data["credential_ID"]
+        received_timestamp = received_data["timestamp"]
+        if abs(time.time() - received_timestamp) > MAXIMUM_TIMESTAMP_DIFFERENCE:
+            raise ValueError("La differenza di timestamp supera il limite consentito, possibile replay attack.")
+
+        if smart_contract.is_blacklisted(university):
+            raise ValueError("L'università è stata inserita nella blacklist dello smart contract, impossibile procedere con la verifica.")
+
+        is_valid = smart_contract.validate_credential_ID(received_credential_id)
+
+        # Lo smart contract risponde all'università con l'esito della verifica
+        response_message = {
+            "timestamp": time.time(),
+            "credential_ID": received_credential_id,
+            "is_valid": is_valid
+        }
+        smart_contract.send(university, Message(json.dumps(response_message)), sign=True)
+
+
+        received_message = university.get_last_message()
+        received_data = json.loads(received_message.get_content())
+        if not received_data.get("credential_ID") == credential_ID:
+            raise ValueError("L'ID della credenziale ricevuto non corrisponde a quello inviato.")
+        if abs(time.time() - received_data['timestamp']) > MAXIMUM_TIMESTAMP_DIFFERENCE:
+            raise ValueError("La differenza di timestamp supera il limite consentito, possibile replay attack.")
+
+
+        received_is_valid = received_data["is_valid"]
+        if received_is_valid:
+            university.confirm_credential(credential_ID, time.time())
+
+    # L'università controlla le prove di revoca rispetto alla radice delle revoche dell'ultimo blocco della blockchain.
+    # Le prove sono dati pubblici, per cui sono lette dallo smart contract fuori dalla risposta cifrata;
+    # per una credenziale certificata in blocco serve anche la prova del blocco, che può essere revocato per intero
+    if state_root:
+        block_ID, index = Smart_Contract.split_credential_ID(credential_ID)
+        certified_height = blockchain.get_height(block_ID)
+        for revocation_ID in ([credential_ID] if index is None else [credential_ID, block_ID]):
+            proof = smart_contract.get_revocation_proof(revocation_ID)
+            revoked = Smart_Contract.check_revocation_proof(revocation_ID, proof, state_root, blockchain.get_hashing_algorithm())
+            if revoked and certified_height is not None and int(proof["value"]) > certified_height:
+                if received_is_valid and not confirmed:
+                    raise ValueError("La prova di revoca contraddice l'esito della verifica dello smart contract.")
+                received_is_valid = False
     if not received_is_valid:
         university.set_credential(student, None, None)
-    print(f"Credenziale {'valida' if is_valid else 'non valida'}.")
+        university.forget_credential(credential_ID)
+    get_repository().mark_dirty(Data_Repository.UNIVERSITIES, university_code)
+    print(f"Credenziale {'valida' if received_is_valid else 'non valida'}.")
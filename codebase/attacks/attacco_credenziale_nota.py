@@ -1,5 +1,4 @@
 import json
-import os
 
 import time
 from actors import University
@@ -7,7 +6,7 @@ from actors.Student import Student
 from algorithms import *
 from blockchain import MerkleTree
 from communication import Message
-from constants import BLOCKCHAIN_FOLDER, DATA_DIRECTORY, MAXIMUM_TIMESTAMP_DIFFERENCE, EXTRACT_RANDOM_NUMBER, STUDENTS_FOLDER, ExamResult, _registra_attivita, _registra_esame, stringify_credential_dicts
+from constants import BLOCKCHAIN_BINARY_HASHING, MAXIMUM_TIMESTAMP_DIFFERENCE, EXTRACT_RANDOM_NUMBER, ExamResult, _registra_attivita, _registra_esame, canonicalize_credential_dicts
 from attacks import Attacker
 
 def _emetti_credenziale(args:list[str]=[]):
@@ -59,8 +58,8 @@ def _emetti_credenziale(args:list[str]=[]):
     hashing_algorithm = blockchain.get_hashing_algorithm()
     if hashing_algorithm is None:
         raise ValueError("L'algoritmo di hashing della blockchain non è stato definito.")
-    stringified_credential = stringify_credential_dicts(credential)
-    merkle_leafs = [hashing_algorithm.hash(data) for data in stringified_credential]
+    stringified_credential = canonicalize_credential_dicts(credential)
+    merkle_leafs = hashing_algorithm.hash_many(stringified_credential)
     received_nonce = received_data['nonce']
     blockchain_request = {
         "timestamp": time.time(),
@@ -86,7 +85,7 @@ def _emetti_credenziale(args:list[str]=[]):
         raise ValueError("L'università è stata inserita nella blacklist dello smart contract, impossibile procedere con la certificazione della credenziale.")
     
     #* 4 Lo smart contract verifica la richiesta e costruisce il merkle_tree
-    mt = MerkleTree(merkle_leafs, hashing_algorithm)
+    mt = MerkleTree(merkle_leafs, hashing_algorithm, binary=BLOCKCHAIN_BINARY_HASHING)
     credential_ID = smart_contract.certificate_credential_MerkleTree(mt, university)
 
 
@@ -148,22 +147,15 @@ def _emetti_credenziale(args:list[str]=[]):
         raise ValueError("Il nonce ricevuto non corrisponde a quello inviato.")
 
     received_credential = received_data["credential"]
-    student.save_credential(received_credential, credential_ID)
+    student.save_credential(received_credential, credential_ID, received_data.get("credential_leaves"))
     # Lo studente salva la credenziale in locale
     logout([university_code, student_code])  # Rimuove le chiavi dello studente dall'università e viceversa
 
-    with open(os.path.join(DATA_DIRECTORY, BLOCKCHAIN_FOLDER, "blockchain.json"), 'w') as f:
-        data = {
-            "blockchain": blockchain.save_on_json(),
-            "smart_contract": smart_contract.save_on_json()
-        }
-        json.dump(data, f, indent=4)
-
-    with open(os.path.join(DATA_DIRECTORY, STUDENTS_FOLDER, "students.json"), 'r') as f:
-        students_data = json.load(f)
-    students_data[student_code] = student.save_on_json()
-    with open(os.path.join(DATA_DIRECTORY, STUDENTS_FOLDER, "students.json"), 'w') as f:
-        json.dump(students_data, f, indent=4)
+    salva_blockchain(blockchain, smart_contract)
+
+    repository = get_repository()
+    repository.mark_dirty(Data_Repository.STUDENTS, student_code)
+    repository.save()
 
 def attacco_credenziale_nota():
     COD_UNI_INT = "001"
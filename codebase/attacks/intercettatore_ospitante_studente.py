@@ -1,12 +1,11 @@
 import json
-import os
 
 import sys
 import time
 
 from algorithms import *
 from communication import Certificate
-from constants import DATA_DIRECTORY, MAXIMUM_TIMESTAMP_DIFFERENCE, EXTRACT_RANDOM_NUMBER, STUDENTS_FOLDER, _registra_attivita, _registra_esame
+from constants import MAXIMUM_TIMESTAMP_DIFFERENCE, EXTRACT_RANDOM_NUMBER, _registra_attivita, _registra_esame
 from communication import Message
 from actors import *
 from attacks import Attacker
@@ -154,8 +153,9 @@ def _immatricola(args:list[str]=[]):
         print("La password non può essere vuota.")
         password = input("Inserisci una password per autenticarti all'università: ")
     student.set_password(password, university) # Lo studente si ricorderà la password per usi futuri (viene salvata in student.json in chiaro a scopo didattico)
-    with open(os.path.join(DATA_DIRECTORY, STUDENTS_FOLDER, "students.json"), 'w') as f:
-        json.dump({code: s.save_on_json() for code, s in students.items()}, f, indent=4)
+    repository = get_repository()
+    repository.mark_dirty(Data_Repository.STUDENTS, student_name)
+    repository.save()
 
     password_message = {
         "password": password,
@@ -337,8 +337,9 @@ def _immatricola_OLD(args:list[str]=[]):
         print("La password non può essere vuota.")
         password = input("Inserisci una password per autenticarti all'università: ")
     student.set_password(password, university) # Lo studente si ricorderà la password per usi futuri (viene salvata in student.json in chiaro a scopo didattico)
-    with open(os.path.join(DATA_DIRECTORY, STUDENTS_FOLDER, "students.json"), 'w') as f:
-        json.dump({code: s.save_on_json() for code, s in students.items()}, f, indent=4)
+    repository = get_repository()
+    repository.mark_dirty(Data_Repository.STUDENTS, student_name)
+    repository.save()
 
     password_message = {
         "password": password,
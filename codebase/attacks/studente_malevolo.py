@@ -1,11 +1,9 @@
 
-import json
-import os
 import sys
 
 from actors.Student import Student
 from algorithms import *
-from constants import DATA_DIRECTORY, STUDENTS_FOLDER, ExamResult, _registra_attivita, _registra_esame
+from constants import ExamResult, _registra_attivita, _registra_esame
 
 def _manipola_credenziale(student_code: str, esame_non_superato: ExamResult):
     students = lettura_dati()[0]
@@ -20,14 +18,12 @@ def _manipola_credenziale(student_code: str, esame_non_superato: ExamResult):
     print(f"Aggiunta di un esame non superato: {esame_non_superato['name']}")
     lista_esami[esame_non_superato["name"]] = esame_non_superato
     credenziale["exams_results"] = list(lista_esami.values())
-    student.save_credential(credenziale, ID)
+    # Gli hash salvati all'emissione non corrispondono più alla credenziale manipolata
+    student.save_credential(credenziale, ID, None)
 
-    with open(os.path.join(DATA_DIRECTORY, STUDENTS_FOLDER, "students.json"), 'r') as f:
-        students_data = json.load(f)
-
-    students_data[student_code] = student.save_on_json()
-    with open(os.path.join(DATA_DIRECTORY, STUDENTS_FOLDER, "students.json"), 'w') as f:
-        json.dump(students_data, f, indent=4)
+    repository = get_repository()
+    repository.mark_dirty(Data_Repository.STUDENTS, student_code)
+    repository.save()
 
 def studente_malevolo():
     COD_UNI_INT = "001"
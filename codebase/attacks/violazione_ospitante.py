@@ -1,10 +1,9 @@
 import json
-import os
 import sys
 import time
 
 from algorithms import *
-from constants import BLOCKCHAIN_FOLDER, DATA_DIRECTORY, MAXIMUM_TIMESTAMP_DIFFERENCE, _registra_attivita, _registra_esame
+from constants import MAXIMUM_TIMESTAMP_DIFFERENCE, _registra_attivita, _registra_esame
 from communication import Message
 from actors import *
 
@@ -37,12 +36,7 @@ def vota_estromissione_universita(voter_uni_code:str, voted_uni_code:str, cod_CA
 
     smart_contract.vote_blacklist(smart_contract._keys[voter_university.get_code()], universities[voted_uni_code]) # type: ignore
     
-    with open(os.path.join(DATA_DIRECTORY, BLOCKCHAIN_FOLDER, "blockchain.json"), 'w') as f:
-        data = {
-            "blockchain": blockchain.save_on_json(),
-            "smart_contract": smart_contract.save_on_json()
-        }
-        json.dump(data, f, indent=4)
+    salva_blockchain(blockchain, smart_contract)
 
 
 
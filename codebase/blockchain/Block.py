@@ -1,3 +1,5 @@
+from typing import Callable
+from blockchain.Merkle_Cache import Merkle_Cache
 from blockchain.MerkleTree import MerkleTree
 from communication.Hash_Algorithm import Hash_Algorithm
 from constants import BLOCKCHAIN_HASH_ALGORITHM
@@ -7,12 +9,69 @@ class Block():
     """
     Classe che rappresenta un blocco nella blockchain.
     """
-    def __init__(self, prev_ID: str, author:str, merkle_or_ID:MerkleTree|str, delete_flag:bool=False, hashing_algorithm:Hash_Algorithm = BLOCKCHAIN_HASH_ALGORITHM()):
+    def __init__(self, prev_ID: str, author:str, merkle_or_ID:MerkleTree|str, delete_flag:bool=False, hashing_algorithm:Hash_Algorithm = BLOCKCHAIN_HASH_ALGORITHM(), binary:bool=False, state_root:str=""):
+        """
+            Inizializza un blocco e ne calcola l'ID.
+            Se binary è True l'ID è il digest della concatenazione dei campi in formato binario, altrimenti delle loro stringhe.
+            Per i blocchi di certificazione la modalità coincide con quella del Merkle Tree contenuto.
+            Se state_root non è vuoto, l'ID include anche la radice dello Sparse Merkle Tree delle revoche dopo il blocco;
+            i blocchi che ne sono privi mantengono l'ID calcolato come in precedenza.
+        """
         self._prev_ID = prev_ID
         self._author = author
         self._delete_flag = delete_flag
-        self._merkle_or_ID = merkle_or_ID
-        
+        self._merkle_or_ID: MerkleTree | str | None = merkle_or_ID
+        self._hashing = hashing_algorithm
+        self._root_hash = Block._root_hash_of(merkle_or_ID)
+        self._binary = binary
+        self._state_root = state_root
+        # Per i blocchi caricati senza Merkle Tree: funzione che ne restituisce il JSON e cache in cui conservarlo
+        self._body_loader: Callable[[], dict] | None = None
+        self._cache: Merkle_Cache | None = None
+        self._ID = self.compute_ID()
+
+    @staticmethod
+    def load_header(prev_ID: str, author: str, root_hash: str, ID: str, body_loader: Callable[[], dict], cache: Merkle_Cache | None = None, binary: bool = False, state_root: str = "", hashing_algorithm: Hash_Algorithm = BLOCKCHAIN_HASH_ALGORITHM()) -> 'Block':
+        """
+            Crea un blocco di certificazione con la sola intestazione, senza costruire il Merkle Tree.
+            L'albero viene caricato al primo accesso tramite body_loader e, se è indicata una cache, conservato in essa
+            finché non viene scartato; senza cache resta in memoria nel blocco.
+            Parametri:
+            - root_hash: hash della radice del Merkle Tree, come memorizzato nell'intestazione.
+            - ID: ID memorizzato del blocco, che non viene ricalcolato.
+            - body_loader: funzione che restituisce il Merkle Tree del blocco in formato JSON.
+            - cache: cache LRU condivisa dei Merkle Tree.
+        """
+        block = Block.__new__(Block)
+        block._prev_ID = prev_ID
+        block._author = author
+        block._delete_flag = False
+        block._merkle_or_ID = None
+        block._hashing = hashing_algorithm
+        block._root_hash = root_hash
+        block._binary = binary
+        block._state_root = state_root
+        block._body_loader = body_loader
+        block._cache = cache
+        block._ID = ID
+        return block
+
+    def _load_body(self) -> MerkleTree:
+        """
+            Carica il Merkle Tree del blocco, che deve avere la radice memorizzata nell'intestazione.
+        """
+        if self._body_loader is None:
+            raise ValueError("Il blocco non ha un Merkle Tree da caricare.")
+        tree = MerkleTree.load_from_json(self._body_loader())
+        if Block._root_hash_of(tree) != self._root_hash:
+            raise ValueError("Il Merkle Tree del blocco non corrisponde alla radice della sua intestazione.")
+        return tree
+
+    @staticmethod
+    def _root_hash_of(merkle_or_ID: MerkleTree|str) -> str:
+        """
+            Restituisce la stringa che rappresenta il contenuto del blocco nel calcolo dell'ID.
+        """
         if isinstance(merkle_or_ID, MerkleTree):
             root = merkle_or_ID.get_root()
             if root:
@@ -23,7 +82,32 @@ class Block():
                 string_merkle = ""
         else:
             string_merkle = merkle_or_ID
-        self._ID = hashing_algorithm.hash(self._prev_ID + self._author + string_merkle + str(self._delete_flag))
+        return string_merkle
+
+    def compute_ID(self) -> str:
+        """
+            Ricalcola l'ID del blocco a partire dai suoi campi e dalla radice attuale del Merkle Tree.
+        """
+        string_merkle = Block._root_hash_of(self.get_merkle_or_ID())
+        if self._binary:
+            fields = bytes.fromhex(self._prev_ID) + bytes.fromhex(self._author) + bytes.fromhex(string_merkle) + bytes([self._delete_flag]) + bytes.fromhex(self._state_root)
+            return self._hashing.digest(fields).hex()
+        return self._hashing.hash(self._prev_ID + self._author + string_merkle + str(self._delete_flag) + self._state_root)
+
+    def verify(self) -> bool:
+        """
+            Verifica l'integrità del blocco: l'ID memorizzato deve corrispondere a quello ricalcolato,
+            la radice dell'intestazione a quella del contenuto e l'eventuale Merkle Tree deve essere valido.
+        """
+        try:
+            merkle_or_ID = self.get_merkle_or_ID()
+        except ValueError: # Contenuto diverso dalla radice dell'intestazione
+            return False
+        if Block._root_hash_of(merkle_or_ID) != self._root_hash or self.compute_ID() != self._ID:
+            return False
+        if isinstance(merkle_or_ID, MerkleTree):
+            return merkle_or_ID.validate()
+        return True
 
     def get_prev_ID(self) -> str:
         return self._prev_ID
@@ -35,23 +119,71 @@ class Block():
         return self._delete_flag
 
     def get_merkle_or_ID(self) -> MerkleTree | str:
-        return self._merkle_or_ID
+        """
+            Restituisce il Merkle Tree o l'ID revocato, caricando il Merkle Tree se il blocco ha la sola intestazione.
+        """
+        if self._merkle_or_ID is not None:
+            return self._merkle_or_ID
+        if self._cache is None:
+            self._merkle_or_ID = self._load_body()
+            return self._merkle_or_ID
+        # La chiave è l'ID, così un blocco decodificato di nuovo ritrova il suo Merkle Tree
+        return self._cache.get(self._ID, self._load_body)
+
+    def is_loaded(self) -> bool:
+        """
+            Indica se il contenuto del blocco è in memoria senza doverlo caricare.
+        """
+        return self._merkle_or_ID is not None
 
     def get_ID(self) -> str:
         return self._ID
 
+    def is_binary(self) -> bool:
+        """
+            Indica se l'ID del blocco è calcolato sui digest binari.
+        """
+        return self._binary
+
+    def get_state_root(self) -> str:
+        """
+            Restituisce la radice dello Sparse Merkle Tree delle revoche a cui il blocco si impegna, o una stringa vuota.
+        """
+        return self._state_root
+
+    def get_root_hash(self) -> str:
+        """
+            Restituisce l'hash della radice del Merkle Tree, o l'ID revocato per i blocchi di cancellazione.
+        """
+        return self._root_hash
+
     def save_on_json(self) -> dict:
-        return {
+        if self._merkle_or_ID is None:
+            merkle_or_ID = self._body_loader() # Il JSON originale, senza costruire il Merkle Tree
+        elif isinstance(self._merkle_or_ID, str):
+            merkle_or_ID = self._merkle_or_ID
+        else:
+            merkle_or_ID = self._merkle_or_ID.save_on_json()
+        data = {
             'prev_ID': self._prev_ID,
             'author': self._author,
             'delete_flag': self._delete_flag,
-            'merkle_or_ID': self._merkle_or_ID if isinstance(self._merkle_or_ID, str) else self._merkle_or_ID.save_on_json(),
+            'merkle_or_ID': merkle_or_ID,
             'ID': self._ID
         }
+        if self._binary:
+            data['binary'] = True
+        if self._state_root:
+            data['state_root'] = self._state_root
+        return data
     
     @staticmethod
     def load_from_json(data: dict) -> 'Block':
-
+        """
+            Carica un blocco dal formato JSON, costruendo subito l'eventuale Merkle Tree.
+            Il JSON è già in memoria, per cui rimandare la costruzione dell'albero lo terrebbe comunque in memoria nel blocco;
+            i blocchi con la sola intestazione sono creati con load_header da chi può rileggere il contenuto dal disco, come Ledger_Storage.
+        """
         if data['delete_flag']:
             merkle_or_ID = data['merkle_or_ID']
         else:
@@ -61,7 +193,9 @@ class Block():
             prev_ID=data['prev_ID'],
             author=data['author'],
             merkle_or_ID=merkle_or_ID,
-            delete_flag=data['delete_flag']
+            delete_flag=data['delete_flag'],
+            binary=data.get('binary', False),
+            state_root=data.get('state_root', "")
         )
         block._ID = data['ID']
-        return block
\ No newline at end of file
+        return block
@@ -1,6 +1,63 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Iterator, TypedDict
 from blockchain.Block import Block
+from blockchain.Merkle_Cache import Merkle_Cache
+from blockchain.Stored_Blocks import Stored_Blocks
+from communication.Asymmetric_Scheme import Asymmetric_Scheme
 from communication.Hash_Algorithm import Hash_Algorithm
-from constants import BLOCKCHAIN_HASH_ALGORITHM
+from communication.Message import Message
+from constants import BLOCKCHAIN_CHECKPOINT_INTERVAL, BLOCKCHAIN_HASH_ALGORITHM, BLOCKCHAIN_VERIFY_SEGMENT_SIZE
+
+if TYPE_CHECKING:
+    from blockchain.Ledger_Storage import Ledger_Storage
+
+
+class Checkpoint(TypedDict):
+    """
+        Rappresenta un checkpoint di verifica: il blocco all'altezza indicata e tutti i precedenti sono già stati verificati.
+    """
+    height: int
+    ID: str # ID del blocco all'altezza indicata
+    signature: str # Firma dello smart contract su altezza e ID
+
+
+def _verify_segment(start_height: int, blocks_data: list[dict]) -> int|None:
+    """
+        Verifica un segmento di blocchi serializzati, ricalcolandone ID e Merkle Tree.
+        Restituisce l'altezza del primo blocco non valido, o None se il segmento è integro.
+        È definita a livello di modulo per poter essere eseguita in un processo separato.
+    """
+    for offset, block_data in enumerate(blocks_data):
+        try:
+            valid = Block.load_from_json(block_data).verify()
+        except (KeyError, TypeError, ValueError):
+            valid = False
+        if not valid:
+            return start_height + offset
+    return None
+
+
+def _verify_stored_segment(directory: str, start_height: int, end_height: int) -> int|None:
+    """
+        Verifica i blocchi del registro su disco tra le due altezze, leggendoli direttamente dai segmenti
+        e confrontandoli con le intestazioni dell'indice.
+        Il processo che la esegue apre il registro per conto proprio, per cui al processo principale non serve decodificare alcun blocco.
+        Restituisce l'altezza del primo blocco non valido, o None se il segmento è integro.
+    """
+    from blockchain.Ledger_Storage import Ledger_Storage # Importato qui per evitare un import circolare
+    storage = Ledger_Storage(directory)
+    try:
+        for height in range(start_height, end_height):
+            try:
+                valid = storage.verify_block(height)
+            except (KeyError, TypeError, ValueError):
+                valid = False
+            if not valid:
+                return height
+        return None
+    finally:
+        storage.close()
 
 
 class Blockchain():
@@ -8,12 +65,18 @@ class Blockchain():
         Classe che rappresenta una blockchain.
     """
 
-    def __init__(self, hash_algorithm:Hash_Algorithm=BLOCKCHAIN_HASH_ALGORITHM()):
+    def __init__(self, hash_algorithm:Hash_Algorithm=BLOCKCHAIN_HASH_ALGORITHM(), storage:'Ledger_Storage|None' = None):
         """
-            Inizializza una blockchain vuota.
+            Inizializza una blockchain vuota, o con i blocchi del registro specificato.
+            Parametri:
+            - storage: registro su disco da cui leggere i blocchi al primo accesso, cercandoli per ID con la sua tabella degli ID.
         """
-
-        self._blocks: list[Block] = []
+        # Cache condivisa dai blocchi caricati con la sola intestazione
+        self._merkle_cache = Merkle_Cache()
+        self._blocks: list[Block]|Stored_Blocks = Stored_Blocks(storage, self._merkle_cache) if storage else []
+        # Indice ID -> posizione del blocco nella lista, per la ricerca in tempo costante; i blocchi del registro hanno il proprio
+        self._index: dict[str, int] = {}
+        self._checkpoints: list[Checkpoint] = []
         self._hashing = hash_algorithm
 
     def add_block(self, block: Block) -> None:
@@ -26,13 +89,24 @@ class Blockchain():
         if self._blocks and block.get_prev_ID() != self._blocks[-1].get_ID():
             raise ValueError("Il blocco non è collegato correttamente alla blockchain.")
         
+        if not isinstance(self._blocks, Stored_Blocks):
+            self._index.setdefault(block.get_ID(), len(self._blocks))
         self._blocks.append(block)
 
-    def get_blocks(self) -> list[Block]:
+    def get_blocks(self) -> list[Block]|Stored_Blocks:
         """
-            Restituisce la lista dei blocchi nella blockchain.
+            Restituisce la sequenza dei blocchi nella blockchain.
+            Per una blockchain caricata dal registro i blocchi sono letti solo quando vi si accede.
         """
         return self._blocks
+
+    def _height_of(self, ID:str) -> int|None:
+        """
+            Restituisce l'altezza del blocco con l'ID specificato, dall'indice in memoria o dalla tabella degli ID del registro.
+        """
+        if isinstance(self._blocks, Stored_Blocks):
+            return self._blocks.find_height(ID)
+        return self._index.get(ID)
     
     def get_last_block(self) -> Block | None:
         """
@@ -56,16 +130,139 @@ class Blockchain():
         
         return True
     
+    def verify(self, workers:int|None = None, segment_size:int = BLOCKCHAIN_VERIFY_SEGMENT_SIZE, start:int = 0) -> int|None:
+        """
+            Verifica completa dell'integrità della blockchain.
+            Oltre ai collegamenti tra i blocchi, ricalcola l'ID di ogni blocco e la validità di ogni Merkle Tree,
+            distribuendo il lavoro su più processi a segmenti di catena.
+            Restituisce l'altezza del primo blocco non valido, o None se la blockchain è integra.
+            Parametri:
+            - workers: numero di processi da utilizzare, di default il numero di CPU; con 1 la verifica avviene nel processo corrente.
+            - segment_size: numero di blocchi per segmento.
+            - start: altezza del primo blocco da verificare, i precedenti sono considerati già verificati.
+        """
+        if segment_size <= 0:
+            raise ValueError("La dimensione del segmento deve essere positiva.")
+
+        first_invalid: int|None = None
+        for i in range(max(start, 1), len(self._blocks)):
+            if self._blocks[i].get_prev_ID() != self._blocks[i-1].get_ID():
+                first_invalid = i
+                break
+
+        # Non serve verificare i blocchi successivi ad un collegamento già interrotto
+        end = first_invalid if first_invalid is not None else len(self._blocks)
+        # I blocchi già salvati nel registro sono letti dai processi stessi, che ricevono solo la cartella e le altezze del segmento
+        tasks: list[tuple] = []
+        stored_end = start
+        if isinstance(self._blocks, Stored_Blocks):
+            stored_end = max(start, min(self._blocks.get_stored_height(), end))
+            directory = self._blocks.get_storage().get_directory()
+            tasks += [
+                (_verify_stored_segment, directory, segment_start, min(segment_start + segment_size, stored_end))
+                for segment_start in range(start, stored_end, segment_size)
+            ]
+        tasks += [
+            (_verify_segment, segment_start, [block.save_on_json() for block in self._blocks[segment_start:min(segment_start + segment_size, end)]])
+            for segment_start in range(stored_end, end, segment_size)
+        ]
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        if workers <= 1 or len(tasks) <= 1:
+            results = [function(*arguments) for function, *arguments in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(function, *arguments) for function, *arguments in tasks]
+                results = [future.result() for future in futures]
+
+        for result in results:
+            if result is not None:
+                return result
+        return first_invalid
+
+    @staticmethod
+    def _checkpoint_content(height:int, ID:str) -> str:
+        """
+            Restituisce il contenuto firmato di un checkpoint.
+        """
+        return f"CHECKPOINT:{height}:{ID}"
+
+    def get_checkpoints(self) -> list[Checkpoint]:
+        """
+            Restituisce i checkpoint di verifica della blockchain.
+        """
+        return self._checkpoints
+
+    def get_last_valid_checkpoint(self, verifier:Asymmetric_Scheme) -> Checkpoint|None:
+        """
+            Restituisce l'ultimo checkpoint con firma valida e che corrisponde ad un blocco presente nella blockchain.
+            Parametri:
+            - verifier: schema con la chiave pubblica di chi ha firmato i checkpoint.
+        """
+        for checkpoint in reversed(self._checkpoints):
+            height = checkpoint["height"]
+            if height < 0 or height >= len(self._blocks) or self._blocks[height].get_ID() != checkpoint["ID"]:
+                continue
+            if verifier.verify(Message(Blockchain._checkpoint_content(height, checkpoint["ID"]), checkpoint["signature"])):
+                return checkpoint
+        return None
+
+    def verify_from_checkpoint(self, verifier:Asymmetric_Scheme, workers:int|None = None, segment_size:int = BLOCKCHAIN_VERIFY_SEGMENT_SIZE) -> int|None:
+        """
+            Verifica incrementale della blockchain: ricalcola gli hash dei soli blocchi successivi all'ultimo checkpoint valido.
+            Per i blocchi precedenti controlla solamente i collegamenti, che non richiedono alcun hash.
+            Restituisce l'altezza del primo blocco non valido, o None se la blockchain è integra.
+        """
+        checkpoint = self.get_last_valid_checkpoint(verifier)
+        start = checkpoint["height"] + 1 if checkpoint else 0
+        for i in range(1, min(start, len(self._blocks))):
+            if self._blocks[i].get_prev_ID() != self._blocks[i-1].get_ID():
+                return i
+        return self.verify(workers, segment_size, start)
+
+    def advance_checkpoint(self, signer:Asymmetric_Scheme, interval:int = BLOCKCHAIN_CHECKPOINT_INTERVAL, workers:int|None = None) -> Checkpoint|None:
+        """
+            Crea un nuovo checkpoint sull'ultimo blocco se dopo l'ultimo checkpoint valido sono stati aggiunti almeno interval blocchi.
+            I blocchi non ancora coperti da un checkpoint vengono verificati prima di firmare.
+            Restituisce il nuovo checkpoint, o None se non è ancora necessario.
+            Parametri:
+            - signer: schema con la chiave privata con cui firmare il checkpoint.
+            - interval: numero minimo di nuovi blocchi tra due checkpoint.
+        """
+        checkpoint = self.get_last_valid_checkpoint(signer)
+        start = checkpoint["height"] + 1 if checkpoint else 0
+        if len(self._blocks) - start < interval:
+            return None
+
+        invalid_height = self.verify(workers, start=start)
+        if invalid_height is not None:
+            raise ValueError(f"Impossibile creare il checkpoint: il blocco {invalid_height} non è valido.")
+
+        height = len(self._blocks) - 1
+        ID = self._blocks[height].get_ID()
+        signature = signer.sign(Message(Blockchain._checkpoint_content(height, ID))).get_signature()
+        if signature is None:
+            raise ValueError("La firma del checkpoint non è valida.")
+        new_checkpoint: Checkpoint = {"height": height, "ID": ID, "signature": signature}
+        self._checkpoints.append(new_checkpoint)
+        return new_checkpoint
+
     def find_block(self, ID:str) -> Block|None:
         """
             Trova un blocco nella blockchain per ID.
             Restituisce il blocco se trovato, altrimenti None.
         """
-        for block in self._blocks:
-            if block.get_ID() == ID:
-                return block
-            
-        return None
+        height = self._height_of(ID)
+        if height is None:
+            return None
+        return self._blocks[height]
+
+    def get_height(self, ID:str) -> int|None:
+        """
+            Restituisce la posizione (altezza) del blocco con l'ID specificato, o None se non presente.
+        """
+        return self._height_of(ID)
 
     def save_on_json(self) -> list[dict]:
         """
@@ -73,13 +270,39 @@ class Blockchain():
         """
         return [block.save_on_json() for block in self._blocks]
 
+    def save_checkpoints(self) -> list[dict]:
+        """
+            Salva i checkpoint di verifica in formato JSON.
+        """
+        return [dict(checkpoint) for checkpoint in self._checkpoints]
+
+    def load_checkpoints(self, checkpoints: list[dict]) -> None:
+        """
+            Carica i checkpoint di verifica dal formato JSON, sostituendo quelli presenti.
+        """
+        self._checkpoints = [
+            {"height": checkpoint["height"], "ID": checkpoint["ID"], "signature": checkpoint["signature"]}
+            for checkpoint in checkpoints
+        ]
+
     @staticmethod
-    def load_from_json(data: list[dict]) -> 'Blockchain':
+    def load_from_json(data: list[dict], checkpoints: list[dict]|None = None) -> 'Blockchain':
+        """
+            Carica la blockchain dal formato JSON, usato per importare il vecchio blockchain.json nel registro a segmenti.
+            I Merkle Tree sono costruiti subito, siccome il JSON è già interamente in memoria.
+        """
         blockchain = Blockchain()
         for block_data in data:
             block = Block.load_from_json(block_data)
             blockchain.add_block(block)
+        blockchain.load_checkpoints(checkpoints or [])
         return blockchain
+
+    def get_merkle_cache(self) -> Merkle_Cache:
+        """
+            Restituisce la cache dei Merkle Tree caricati su richiesta, con i relativi contatori di accessi.
+        """
+        return self._merkle_cache
     
     def get_hashing_algorithm(self) -> Hash_Algorithm:
         """
@@ -92,11 +315,35 @@ class Blockchain():
             Restituisce il blocco successivo nella blockchain.
             Se non esiste, restituisce None.
         """
-        if not self._blocks:
+        height = self._height_of(block.get_ID())
+        if height is None or height + 1 >= len(self._blocks):
             return None
-        
-        for i in range(len(self._blocks) - 1):
-            if self._blocks[i] == block:
-                return self._blocks[i + 1]
-        
-        return None
\ No newline at end of file
+        return self._blocks[height + 1]
+
+    def iterate_from(self, start:str|int = 0, inclusive:bool = True, delete_flag:bool|None = None, author:str|None = None) -> Iterator[Block]:
+        """
+            Scorre in avanti i blocchi della blockchain a partire da un blocco, in tempo costante per ogni passo.
+            Parametri:
+            - start: ID o altezza del blocco di partenza.
+            - inclusive: Se True, come di default, restituisce anche il blocco di partenza, altrimenti solo quelli successivi.
+            - delete_flag: Se specificato, restituisce solo i blocchi con il delete flag corrispondente.
+            - author: Se specificato, restituisce solo i blocchi dell'autore indicato.
+        """
+        if isinstance(start, str):
+            height = self._height_of(start)
+            if height is None:
+                raise ValueError("Il blocco con l'ID specificato non esiste nella blockchain.")
+        else:
+            height = start
+        if height < 0:
+            raise ValueError("L'altezza del blocco non può essere negativa.")
+        if not inclusive:
+            height += 1
+
+        for i in range(height, len(self._blocks)):
+            block = self._blocks[i]
+            if delete_flag is not None and block.get_delete_flag() != delete_flag:
+                continue
+            if author is not None and block.get_author() != author:
+                continue
+            yield block
\ No newline at end of file
@@ -0,0 +1,122 @@
+import base64
+import math
+from typing import TypedDict
+from communication.Hash_Algorithm import Hash_Algorithm
+from constants import BLOCKCHAIN_HASH_ALGORITHM, REVOCATION_FILTER_CAPACITY, REVOCATION_FILTER_FALSE_POSITIVE_RATE
+
+
+class Bloom_Filter_Report(TypedDict):
+    """
+        Rappresenta lo stato di un filtro di Bloom: dimensionamento, occupazione e tasso di falsi positivi.
+    """
+    capacity: int # Numero di elementi per cui è dimensionato il filtro
+    count: int # Numero di elementi inseriti
+    bits: int
+    hashes: int # Numero di funzioni di hash
+    memory_bytes: int
+    false_positive_rate: float # Tasso di falsi positivi configurato
+    estimated_false_positive_rate: float # Tasso di falsi positivi stimato con gli elementi inseriti
+
+
+class Bloom_Filter():
+    """
+        Filtro di Bloom: insieme probabilistico senza falsi negativi.
+        Se un elemento non è contenuto nel filtro, sicuramente non è stato inserito;
+        se è contenuto, è stato inserito con probabilità pari a 1 meno il tasso di falsi positivi.
+    """
+
+    def __init__(self, capacity: int = REVOCATION_FILTER_CAPACITY, false_positive_rate: float = REVOCATION_FILTER_FALSE_POSITIVE_RATE, hash_algorithm: Hash_Algorithm = BLOCKCHAIN_HASH_ALGORITHM()):
+        """
+            Inizializza un filtro vuoto, dimensionato per rispettare il tasso di falsi positivi fino a capacity elementi.
+            Parametri:
+            - capacity: numero di elementi previsti.
+            - false_positive_rate: tasso di falsi positivi desiderato, tra 0 e 1 esclusi.
+            - hash_algorithm: algoritmo di hash da cui sono derivate le posizioni dei bit.
+        """
+        if capacity <= 0:
+            raise ValueError("La capacità del filtro deve essere positiva.")
+        if not 0 < false_positive_rate < 1:
+            raise ValueError("Il tasso di falsi positivi deve essere compreso tra 0 e 1.")
+        self._capacity = capacity
+        self._false_positive_rate = false_positive_rate
+        self._hash = hash_algorithm
+        self._bits_count = max(8, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self._hashes_count = max(1, round(self._bits_count / capacity * math.log(2)))
+        self._bits = bytearray((self._bits_count + 7) // 8)
+        self._count = 0
+
+    def _positions(self, item: str) -> list[int]:
+        """
+            Restituisce le posizioni dei bit dell'elemento, con il doppio hashing sui primi 16 byte del digest.
+        """
+        digest = self._hash.digest(item.encode('utf-8'))
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:16], 'big') | 1
+        return [(first + i * second) % self._bits_count for i in range(self._hashes_count)]
+
+    def add(self, item: str) -> None:
+        """
+            Inserisce l'elemento nel filtro.
+        """
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self._count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def is_full(self) -> bool:
+        """
+            Indica se il filtro contiene più elementi di quelli per cui è dimensionato, e il tasso di falsi positivi non è più garantito.
+        """
+        return self._count > self._capacity
+
+    def get_capacity(self) -> int:
+        return self._capacity
+
+    def get_false_positive_rate(self) -> float:
+        return self._false_positive_rate
+
+    def estimate_false_positive_rate(self) -> float:
+        """
+            Stima il tasso di falsi positivi con il numero di elementi inseriti.
+        """
+        return (1 - math.exp(-self._hashes_count * self._count / self._bits_count)) ** self._hashes_count
+
+    def get_memory(self) -> int:
+        """
+            Restituisce la memoria occupata dai bit del filtro, in byte.
+        """
+        return len(self._bits)
+
+    def get_report(self) -> Bloom_Filter_Report:
+        return {
+            "capacity": self._capacity,
+            "count": self._count,
+            "bits": self._bits_count,
+            "hashes": self._hashes_count,
+            "memory_bytes": self.get_memory(),
+            "false_positive_rate": self._false_positive_rate,
+            "estimated_false_positive_rate": self.estimate_false_positive_rate(),
+        }
+
+    def save_on_json(self) -> dict:
+        return {
+            "capacity": self._capacity,
+            "false_positive_rate": self._false_positive_rate,
+            "count": self._count,
+            "bits": base64.b64encode(self._bits).decode('ascii'),
+        }
+
+    @staticmethod
+    def load_from_json(data: dict) -> 'Bloom_Filter':
+        bloom_filter = Bloom_Filter(data["capacity"], data["false_positive_rate"])
+        bits = base64.b64decode(data["bits"])
+        if len(bits) != len(bloom_filter._bits):
+            raise ValueError("I bit salvati non corrispondono al dimensionamento del filtro.")
+        bloom_filter._bits = bytearray(bits)
+        bloom_filter._count = data["count"]
+        return bloom_filter
@@ -0,0 +1,356 @@
+from typing import Iterable, Iterator
+from blockchain.MerkleTree import MerkleTree, MerkleMultiProof, MerkleProofStep
+from communication.Hash_Algorithm import Hash_Algorithm
+from constants import BLOCKCHAIN_HASH_ALGORITHM, BLOCKCHAIN_MERKLE_FORMAT_VERSION
+
+
+class Flat_MerkleTree(MerkleTree):
+    """
+        Rappresentazione compatta del Merkle Tree, con tutti gli hash memorizzati in un unico buffer contiguo.
+        I nodi sono disposti in pre-ordine: un sottoalbero con m foglie occupa 2m-1 posizioni consecutive,
+        il figlio sinistro segue immediatamente il padre e il figlio destro segue l'intero sottoalbero sinistro.
+        La forma dell'albero è la stessa di MerkleTree, bilanciata o incrementale secondo _left_count, per cui la radice coincide.
+        Anche nella forma incrementale aggiungere una foglia cambia la disposizione del buffer,
+        per cui l'albero compatto viene riscritto per intero.
+    """
+
+    def __init__(self, leaves: Iterable[str], hash_algorithm: Hash_Algorithm = BLOCKCHAIN_HASH_ALGORITHM(), leaves_count: int|None = None, binary: bool = False, incremental: bool = False):
+        """
+            Inizializza il Merkle Tree compatto con le foglie specificate, in formato esadecimale.
+            Se leaves_count è noto a priori le foglie vengono consumate man mano, senza essere copiate in una lista.
+            In modalità binaria i nodi interni sono calcolati direttamente sui digest del buffer, senza conversioni.
+            Se incremental è True l'albero ha la forma incrementale di MerkleTree.
+        """
+        self._hash = hash_algorithm
+        self._binary = binary
+        self._incremental = incremental
+        self._consistent = True
+        if leaves_count is None:
+            leaves = list(leaves)
+            leaves_count = len(leaves)
+        self._leaves_count = leaves_count
+        self._root = None
+        self._digest_size = 0
+        self._buffer = bytearray()
+        if not leaves_count:
+            return
+
+        self._digest_size = hash_algorithm.get_digest_size()
+        self._buffer = bytearray(self._digest_size * (2 * leaves_count - 1))
+        self._fill(iter(leaves), leaves_count)
+
+    def _fill(self, leaves: Iterator[str], count: int) -> None:
+        """
+            Riempie il buffer preallocato con una visita iterativa in post-ordine, con la stessa forma di MerkleTree._build_tree.
+        """
+        pending: list[tuple[int, int, bool]] = [(0, count, False)] # (posizione, numero di foglie, figli già visitati)
+        while pending:
+            position, size, visited = pending.pop()
+            if size == 1:
+                leaf = next(leaves, None)
+                if leaf is None:
+                    raise ValueError("Il numero di foglie è inferiore a quello dichiarato.")
+                self._set(position, leaf)
+                continue
+            left, right = self._children(position, size)
+            if not visited:
+                pending.append((position, size, True))
+                half = self._left_count(size, self._incremental)
+                pending.append((right, size - half, False))
+                pending.append((left, half, False))
+            else:
+                self._set_digest(position, self._combine_at(left, right))
+
+        if next(leaves, None) is not None:
+            raise ValueError("Il numero di foglie è superiore a quello dichiarato.")
+
+    def _children(self, position: int, count: int) -> tuple[int, int]:
+        """
+            Restituisce le posizioni dei figli del nodo in posizione position, radice di un sottoalbero con count foglie.
+        """
+        return position + 1, position + 2 * self._left_count(count, self._incremental)
+
+    def _get(self, position: int) -> str:
+        """
+            Restituisce l'hash esadecimale del nodo in posizione position.
+        """
+        offset = position * self._digest_size
+        return self._buffer[offset:offset + self._digest_size].hex()
+
+    def _get_digest(self, position: int) -> bytes:
+        """
+            Restituisce il digest binario del nodo in posizione position.
+        """
+        offset = position * self._digest_size
+        return bytes(self._buffer[offset:offset + self._digest_size])
+
+    def _set(self, position: int, node_hash: str) -> None:
+        """
+            Scrive l'hash esadecimale nel nodo in posizione position.
+        """
+        self._set_digest(position, bytes.fromhex(node_hash))
+
+    def _set_digest(self, position: int, digest: bytes) -> None:
+        """
+            Scrive il digest binario nel nodo in posizione position.
+        """
+        if len(digest) != self._digest_size:
+            raise ValueError("Tutti gli hash del Merkle Tree devono avere la stessa lunghezza.")
+        offset = position * self._digest_size
+        self._buffer[offset:offset + self._digest_size] = digest
+
+    def _combine_at(self, left: int, right: int) -> bytes:
+        """
+            Calcola il digest del padre dei nodi nelle posizioni left e right.
+        """
+        if self._binary:
+            return self._hash.digest(self._get_digest(left) + self._get_digest(right))
+        return bytes.fromhex(self._hash.hash(self._get(left) + self._get(right)))
+
+    def __len__(self) -> int:
+        return 2 * self._leaves_count - 1 if self._leaves_count else 0
+
+    def get_root(self) -> MerkleTree._Node | None:
+        """
+            Restituisce un nodo con il solo hash della radice, senza figli.
+        """
+        if not self._leaves_count:
+            return None
+        return MerkleTree._Node(self._get(0))
+
+    def get_leaves_count(self) -> int:
+        return self._leaves_count
+
+    def get_leaves(self) -> list[str]:
+        leaves: list[str] = []
+        stack = [(0, self._leaves_count)] if self._leaves_count else []
+        while stack:
+            position, count = stack.pop()
+            if count == 1:
+                leaves.append(self._get(position))
+                continue
+            left, right = self._children(position, count)
+            half = self._left_count(count, self._incremental)
+            stack.append((right, count - half))
+            stack.append((left, half))
+        return leaves
+
+    def validate(self) -> bool:
+        """
+            Controlla che ogni nodo interno sia l'hash della concatenazione dei suoi figli.
+        """
+        if not self._leaves_count:
+            return False
+        stack = [(0, self._leaves_count)]
+        while stack:
+            position, count = stack.pop()
+            if count == 1:
+                continue
+            left, right = self._children(position, count)
+            if self._combine_at(left, right) != self._get_digest(position):
+                self._consistent = False
+                return False
+            half = self._left_count(count, self._incremental)
+            stack.append((right, count - half))
+            stack.append((left, half))
+        self._consistent = True
+        return True
+
+    def get_proof(self, index: int) -> list[MerkleProofStep]:
+        count = self._leaves_count
+        if index < 0 or index >= count:
+            raise ValueError(f"La foglia {index} non è presente nel Merkle Tree.")
+
+        proof: list[MerkleProofStep] = []
+        position = 0
+        while count > 1:
+            left, right = self._children(position, count)
+            half = self._left_count(count, self._incremental)
+            if index < half:
+                proof.append({"hash": self._get(right), "left": False})
+                position, count = left, half
+            else:
+                proof.append({"hash": self._get(left), "left": True})
+                position, count = right, count - half
+                index -= half
+
+        proof.reverse()
+        return proof
+
+    def copy(self) -> 'Flat_MerkleTree':
+        """
+            Restituisce una copia indipendente dell'albero compatto, copiando il buffer senza ricalcolare gli hash.
+        """
+        flat = Flat_MerkleTree([], self._hash, binary=self._binary, incremental=self._incremental)
+        flat._leaves_count = self._leaves_count
+        flat._digest_size = self._digest_size
+        flat._buffer = bytearray(self._buffer)
+        flat._consistent = self._consistent
+        return flat
+
+    def update_leaf(self, index: int, leaf: str) -> str:
+        """
+            Sostituisce la foglia in posizione index direttamente nel buffer, ricalcolando solo i nodi del cammino verso la radice.
+        """
+        count = self._leaves_count
+        if index < 0 or index >= count:
+            raise ValueError(f"La foglia {index} non è presente nel Merkle Tree.")
+
+        path: list[tuple[int, int, int]] = [] # (antenato, figlio sinistro, figlio destro)
+        position = 0
+        while count > 1:
+            left, right = self._children(position, count)
+            path.append((position, left, right))
+            half = self._left_count(count, self._incremental)
+            if index < half:
+                position, count = left, half
+            else:
+                position, count, index = right, count - half, index - half
+
+        self._set(position, leaf)
+        for ancestor, left, right in reversed(path):
+            self._set_digest(ancestor, self._combine_at(left, right))
+        return self._get(0)
+
+    def update_leaves(self, leaves: Iterable[str]) -> str:
+        """
+            Sostituisce tutte le foglie dell'albero compatto.
+            Se il numero di foglie non cambia vengono ricalcolati solo i cammini delle foglie cambiate; altrimenti la disposizione
+            del buffer cambia e l'albero viene ricostruito.
+        """
+        leaves = list(leaves)
+        if self._leaves_count and len(leaves) == self._leaves_count:
+            for index, (old_leaf, leaf) in enumerate(zip(self.get_leaves(), leaves)):
+                if old_leaf != leaf:
+                    self.update_leaf(index, leaf)
+            return self._get(0)
+
+        self._leaves_count = len(leaves)
+        self._digest_size = self._hash.get_digest_size() if leaves else 0
+        self._buffer = bytearray(self._digest_size * (2 * len(leaves) - 1)) if leaves else bytearray()
+        if not leaves:
+            return ""
+        self._fill(iter(leaves), len(leaves))
+        return self._get(0)
+
+    def append_leaf(self, leaf: str) -> str:
+        """
+            Aggiunge una foglia in coda, ricostruendo il buffer siccome la sua disposizione dipende dal numero di foglie.
+        """
+        return self.update_leaves(self.get_leaves() + [leaf])
+
+    def get_multiproof(self, indices: list[int]) -> MerkleMultiProof:
+        count = self._leaves_count
+        selected = sorted(set(indices))
+        if not selected:
+            raise ValueError("È necessario specificare almeno una foglia.")
+        if selected[0] < 0 or selected[-1] >= count:
+            raise ValueError("Alcune foglie richieste non sono presenti nel Merkle Tree.")
+
+        hashes: list[str] = []
+        self._collect_flat_multiproof(0, 0, count, selected, hashes)
+        return {"leaves_count": count, "indices": selected, "hashes": hashes, "incremental": self._incremental}
+
+    def _collect_flat_multiproof(self, position: int, start: int, count: int, selected: list[int], hashes: list[str]) -> None:
+        """
+            Visita il sottoalbero delle foglie [start, start+count) raccogliendo gli hash necessari alla prova.
+        """
+        if not MerkleTree._contains_index(selected, start, count):
+            hashes.append(self._get(position))
+            return
+        if count == 1:
+            return
+        half = self._left_count(count, self._incremental)
+        left, right = self._children(position, count)
+        self._collect_flat_multiproof(left, start, half, selected, hashes)
+        self._collect_flat_multiproof(right, start + half, count - half, selected, hashes)
+
+    def to_merkle_tree(self) -> MerkleTree:
+        """
+            Converte l'albero compatto nella rappresentazione a nodi, senza ricalcolare gli hash.
+        """
+        tree = MerkleTree([], self._hash, binary=self._binary, incremental=self._incremental)
+        tree._leaves_count = self._leaves_count
+        tree._consistent = self._consistent
+        if not self._leaves_count:
+            return tree
+
+        tree._root = MerkleTree._Node(self._get(0))
+        stack = [(tree._root, 0, self._leaves_count)]
+        while stack:
+            node, position, count = stack.pop()
+            if count == 1:
+                continue
+            left, right = self._children(position, count)
+            left_node = MerkleTree._Node(self._get(left))
+            right_node = MerkleTree._Node(self._get(right))
+            node.set_left(left_node)
+            node.set_right(right_node)
+            half = self._left_count(count, self._incremental)
+            stack.append((right_node, right, count - half))
+            stack.append((left_node, left, half))
+        return tree
+
+    @staticmethod
+    def from_merkle_tree(tree: MerkleTree) -> 'Flat_MerkleTree':
+        """
+            Converte un Merkle Tree a nodi nella rappresentazione compatta, senza ricalcolare gli hash.
+        """
+        flat = Flat_MerkleTree([], tree._hash, binary=tree.is_binary(), incremental=tree.is_incremental())
+        root = tree.get_root()
+        if not root:
+            return flat
+        root_hash = root.get_hash()
+        if root_hash is None:
+            raise ValueError("Il Merkle Tree non ha un hash valido nella radice.")
+
+        count = tree.get_leaves_count()
+        flat._leaves_count = count
+        flat._consistent = tree.is_consistent()
+        flat._digest_size = len(bytes.fromhex(root_hash))
+        flat._buffer = bytearray(flat._digest_size * (2 * count - 1))
+        stack = [(root, 0, count)]
+        while stack:
+            node, position, count = stack.pop()
+            node_hash = node.get_hash()
+            if node_hash is None:
+                raise ValueError("I nodi dell'albero devono avere un hash valido.")
+            flat._set(position, node_hash)
+            if count == 1:
+                continue
+            left_node = node.get_left()
+            right_node = node.get_right()
+            if not left_node or not right_node:
+                raise ValueError("Il Merkle Tree deve essere completo.")
+            left, right = flat._children(position, count)
+            half = flat._left_count(count, flat._incremental)
+            stack.append((right_node, right, count - half))
+            stack.append((left_node, left, half))
+        return flat
+
+    def save_on_json(self, version: int = BLOCKCHAIN_MERKLE_FORMAT_VERSION) -> dict:
+        if version == 2:
+            data = {
+                'version': 2,
+                'root': self._get(0) if self._leaves_count else "",
+                'leaves': self.get_leaves()
+            }
+            if self._binary:
+                data['binary'] = True
+            if self._incremental:
+                data['incremental'] = True
+            return data
+        return self.to_merkle_tree().save_on_json(version)
+
+    @staticmethod
+    def load_from_json(data: dict) -> 'Flat_MerkleTree':
+        """
+            Carica il Merkle Tree compatto da entrambi i formati JSON, ricalcolando i nodi interni dalle foglie nel formato compatto.
+        """
+        if MerkleTree.get_format_version(data) == 2:
+            flat = Flat_MerkleTree(data['leaves'], binary=data.get('binary', False), incremental=data.get('incremental', False))
+            if flat._leaves_count and flat._get(0) != data['root']:
+                flat._set(0, data['root'])
+                flat._consistent = False
+            return flat
+        return Flat_MerkleTree.from_merkle_tree(MerkleTree.load_from_json(data))
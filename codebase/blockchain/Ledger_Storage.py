@@ -0,0 +1,524 @@
+import json
+import mmap
+import os
+import struct
+from typing import TypedDict
+from blockchain.Block import Block
+from blockchain.Blockchain import Blockchain
+from blockchain.Merkle_Cache import Merkle_Cache
+from communication.Hash_Algorithm import Hash_Algorithm
+from constants import BLOCKCHAIN_HASH_ALGORITHM, BLOCKCHAIN_ID_INDEX_CAPACITY, BLOCKCHAIN_SEGMENT_SIZE, PERSISTENCE_FSYNC
+from persistence import atomic_write_bytes, atomic_write_json
+
+
+class BlockRecord(TypedDict):
+    """
+        Rappresenta un record dell'indice del registro: intestazione del blocco e sua posizione su disco.
+    """
+    ID: str
+    prev_ID: str
+    author: str
+    root: str # Hash della radice del Merkle Tree, o ID revocato per i blocchi di cancellazione
+    state_root: str # Radice dello Sparse Merkle Tree delle revoche, o stringa vuota
+    root_in_segment: bool # True se l'ID revocato non è un digest (ID composto) ed è salvato solo nel segmento
+    delete_flag: bool
+    binary: bool
+    segment: int
+    offset: int
+    length: int
+
+
+class Ledger_Storage():
+    """
+        Archivio append-only della blockchain su disco.
+        Ogni blocco è una riga JSON in un file segmento, e i segmenti ruotano ogni segment_size blocchi.
+        Un indice a record di lunghezza fissa associa ad ogni altezza l'intestazione del blocco e la sua posizione nel segmento,
+        per cui aggiungere un blocco scrive soltanto quel blocco ed il suo record.
+        Lo stato dello smart contract ed i checkpoint sono salvati in file separati.
+        In lettura i file sono mappati in memoria, e una tabella hash persistente associa ogni ID alla sua altezza,
+        per cui la ricerca di un blocco decodifica soltanto quel blocco.
+    """
+    INDEX_FILE = "index.bin"
+    INDEX_VERSION = 2 # Versione del formato dei record dell'indice
+    METADATA_FILE = "ledger.json"
+    ID_INDEX_FILE = "ids.bin"
+    CHECKPOINTS_FILE = "checkpoints.json"
+    SMART_CONTRACT_FILE = "smart_contract.json"
+    REVOCATION_FILTER_FILE = "revocation_filter.json"
+    REVOCATION_TREE_FILE = "revocation_tree.bin"
+    _DELETE_FLAG = 1
+    _BINARY_FLAG = 2
+    _ROOT_IN_SEGMENT_FLAG = 4
+
+    def __init__(self, directory: str, hash_algorithm: Hash_Algorithm = BLOCKCHAIN_HASH_ALGORITHM(), segment_size: int = BLOCKCHAIN_SEGMENT_SIZE):
+        """
+            Inizializza l'archivio nella cartella specificata, creandola se non esiste.
+            Parametri:
+            - directory: cartella dei file del registro.
+            - hash_algorithm: algoritmo di hash della blockchain, determina la dimensione degli ID nei record.
+            - segment_size: numero di blocchi per file segmento.
+        """
+        if segment_size <= 0:
+            raise ValueError("La dimensione del segmento deve essere positiva.")
+        self._directory = directory
+        self._segment_size = segment_size
+        self._digest_size = hash_algorithm.get_digest_size()
+        # ID, prev_ID, autore, radice, radice delle revoche, flag, segmento, offset, lunghezza
+        self._record = struct.Struct(f">{self._digest_size}s{self._digest_size}s{self._digest_size}s{self._digest_size}s{self._digest_size}sBIQI")
+        # Intestazione della tabella degli ID: capacità, numero di ID, altezza indicizzata
+        self._id_header = struct.Struct(">QQQ")
+        # Posizione della tabella degli ID: ID, altezza + 1 (0 indica una posizione libera)
+        self._id_slot = struct.Struct(f">{self._digest_size}sQ")
+        self._maps: dict[str, mmap.mmap] = {}
+        os.makedirs(directory, exist_ok=True)
+        self._upgrade_index()
+        self.recover()
+
+    def _upgrade_index(self) -> None:
+        """
+            Converte l'indice salvato con una versione precedente del formato dei record.
+            La versione 1 non contiene la radice delle revoche, che per quei blocchi è vuota.
+        """
+        metadata_path = self._path(Ledger_Storage.METADATA_FILE)
+        version = 1
+        if os.path.exists(metadata_path):
+            with open(metadata_path, 'r') as f:
+                version = json.load(f)["index_version"]
+        if version == Ledger_Storage.INDEX_VERSION:
+            return
+        if version != 1:
+            raise ValueError(f"Versione {version} dell'indice del registro non supportata.")
+
+        index_path = self._path(Ledger_Storage.INDEX_FILE)
+        if os.path.exists(index_path):
+            digest = self._digest_size
+            old_record = struct.Struct(f">{digest}s{digest}s{digest}s{digest}sBIQI")
+            with open(index_path, 'rb') as f:
+                data = f.read()
+            records = []
+            for offset in range(0, len(data) - old_record.size + 1, old_record.size):
+                ID, prev_ID, author, root, *position = old_record.unpack_from(data, offset)
+                records.append(self._record.pack(ID, prev_ID, author, root, bytes(digest), *position))
+            atomic_write_bytes(index_path, b"".join(records))
+        atomic_write_json(metadata_path, {"index_version": Ledger_Storage.INDEX_VERSION}, indent=None)
+
+    def recover(self) -> bool:
+        """
+            Scarta i record in coda all'indice lasciati da un'aggiunta interrotta: un record incompleto,
+            o un record il cui blocco non è stato scritto per intero nel segmento.
+            I byte dei blocchi scritti nei segmenti ma non ancora indicizzati non vengono mai letti, siccome ogni record ne indica la posizione.
+            Restituisce True se l'indice è stato troncato.
+        """
+        index_path = self._path(Ledger_Storage.INDEX_FILE)
+        if not os.path.exists(index_path):
+            return False
+        size = os.path.getsize(index_path)
+        height = size // self._record.size
+        while height > 0 and not self._is_complete(self._read_record(height - 1)):
+            height -= 1
+        if height * self._record.size == size:
+            return False
+        self._unmap(index_path)
+        with open(index_path, 'r+b') as f:
+            f.truncate(height * self._record.size)
+            if PERSISTENCE_FSYNC:
+                os.fsync(f.fileno())
+        return True
+
+    def _is_complete(self, record: 'BlockRecord') -> bool:
+        """
+            Controlla che il blocco del record sia presente per intero nel suo segmento, con lo stesso ID.
+        """
+        try:
+            return self._read_block_data(record).get("ID") == record["ID"]
+        except ValueError: # Segmento troppo corto o riga non decodificabile
+            return False
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self._directory, filename)
+
+    def _segment_path(self, segment: int) -> str:
+        return self._path(f"segment_{segment:06d}.jsonl")
+
+    def _map(self, path: str, size: int) -> mmap.mmap | None:
+        """
+            Restituisce una mappatura in sola lettura del file, che copra almeno size byte.
+            Le mappature sono riutilizzate tra le letture e rinnovate quando il file è cresciuto.
+        """
+        mapped = self._maps.get(path)
+        if mapped is not None and len(mapped) >= size:
+            return mapped
+        self._unmap(path)
+        if not os.path.exists(path) or os.path.getsize(path) < max(size, 1):
+            return None
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps[path] = mapped
+        return mapped
+
+    def _unmap(self, path: str) -> None:
+        mapped = self._maps.pop(path, None)
+        if mapped is not None:
+            mapped.close()
+
+    def close(self) -> None:
+        """
+            Rilascia le mappature in memoria dei file del registro.
+        """
+        for path in list(self._maps):
+            self._unmap(path)
+
+    def get_directory(self) -> str:
+        """
+            Restituisce la cartella dei file del registro.
+        """
+        return self._directory
+
+    def exists(self) -> bool:
+        """
+            Controlla se nella cartella è già presente un registro.
+        """
+        return os.path.exists(self._path(Ledger_Storage.INDEX_FILE))
+
+    def get_height(self) -> int:
+        """
+            Restituisce il numero di blocchi salvati, ricavato dalla dimensione dell'indice.
+            Un eventuale record incompleto, dovuto ad una scrittura interrotta, viene ignorato.
+        """
+        index_path = self._path(Ledger_Storage.INDEX_FILE)
+        if not os.path.exists(index_path):
+            return 0
+        return os.path.getsize(index_path) // self._record.size
+
+    def _encode_hash(self, value: str) -> bytes:
+        if not value:
+            return bytes(self._digest_size)
+        digest = bytes.fromhex(value)
+        if len(digest) != self._digest_size:
+            raise ValueError("La lunghezza dell'hash non corrisponde all'algoritmo della blockchain.")
+        return digest
+
+    def _decode_hash(self, value: bytes) -> str:
+        return "" if not any(value) else value.hex()
+
+    def _pack_record(self, block: Block, segment: int, offset: int, length: int) -> bytes:
+        flags = (Ledger_Storage._DELETE_FLAG if block.get_delete_flag() else 0) | (Ledger_Storage._BINARY_FLAG if block.is_binary() else 0)
+        try:
+            root = self._encode_hash(block.get_root_hash())
+        except ValueError:
+            if not block.get_delete_flag():
+                raise
+            # ID composto di una credenziale certificata in blocco: resta leggibile dal segmento
+            root = bytes(self._digest_size)
+            flags |= Ledger_Storage._ROOT_IN_SEGMENT_FLAG
+        return self._record.pack(
+            self._encode_hash(block.get_ID()),
+            self._encode_hash(block.get_prev_ID()),
+            self._encode_hash(block.get_author()),
+            root,
+            self._encode_hash(block.get_state_root()),
+            flags, segment, offset, length
+        )
+
+    def _unpack_record(self, data: bytes) -> BlockRecord:
+        ID, prev_ID, author, root, state_root, flags, segment, offset, length = self._record.unpack(data)
+        return {
+            "ID": self._decode_hash(ID),
+            "prev_ID": self._decode_hash(prev_ID),
+            "author": self._decode_hash(author),
+            "root": self._decode_hash(root),
+            "state_root": self._decode_hash(state_root),
+            "root_in_segment": bool(flags & Ledger_Storage._ROOT_IN_SEGMENT_FLAG),
+            "delete_flag": bool(flags & Ledger_Storage._DELETE_FLAG),
+            "binary": bool(flags & Ledger_Storage._BINARY_FLAG),
+            "segment": segment,
+            "offset": offset,
+            "length": length,
+        }
+
+    def _read_record(self, height: int) -> BlockRecord:
+        """
+            Legge il record dell'indice all'altezza indicata.
+        """
+        end = (height + 1) * self._record.size
+        index = self._map(self._path(Ledger_Storage.INDEX_FILE), end)
+        if index is None:
+            raise ValueError(f"Il blocco {height} non è presente nel registro.")
+        return self._unpack_record(index[end - self._record.size:end])
+
+    def read_records(self) -> list[BlockRecord]:
+        """
+            Legge tutti i record dell'indice, in ordine di altezza.
+        """
+        return [self._read_record(height) for height in range(self.get_height())]
+
+    def append_blocks(self, blocks: list[Block]) -> None:
+        """
+            Aggiunge i blocchi in coda al registro, scrivendo solo i nuovi blocchi ed i loro record.
+            I blocchi vengono scritti e sincronizzati nei segmenti prima che l'indice li renda visibili, per cui dopo un'interruzione
+            l'indice non può riferirsi a blocchi persi; un record scritto solo in parte viene scartato da recover.
+        """
+        index_path = self._path(Ledger_Storage.INDEX_FILE)
+        if not blocks:
+            open(index_path, 'ab').close() # Crea il registro anche se vuoto
+            return
+        height = records_start = self.get_height()
+        records: list[bytes] = []
+        segment_file = None
+        current_segment = -1
+        try:
+            for block in blocks:
+                segment = height // self._segment_size
+                if segment != current_segment:
+                    if segment_file:
+                        Ledger_Storage._sync(segment_file)
+                        segment_file.close()
+                    segment_file = open(self._segment_path(segment), 'ab')
+                    current_segment = segment
+                line = (json.dumps(block.save_on_json(), separators=(',', ':')) + "\n").encode('utf-8')
+                offset = segment_file.tell()
+                segment_file.write(line)
+                records.append(self._pack_record(block, segment, offset, len(line)))
+                height += 1
+            Ledger_Storage._sync(segment_file)
+        finally:
+            if segment_file:
+                segment_file.close()
+
+        self._unmap(index_path)
+        with open(index_path, 'ab') as f:
+            # Scarta l'eventuale record incompleto lasciato da una scrittura interrotta
+            f.truncate(records_start * self._record.size)
+            f.write(b"".join(records))
+            Ledger_Storage._sync(f)
+        self._index_IDs(blocks, records_start)
+
+    @staticmethod
+    def _sync(f) -> None:
+        """
+            Sincronizza su disco il file aperto, se le scritture sincronizzate sono abilitate.
+        """
+        if PERSISTENCE_FSYNC:
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _read_block_data(self, record: BlockRecord) -> dict:
+        """
+            Legge dal segmento mappato in memoria i soli byte del blocco descritto dal record.
+        """
+        end = record["offset"] + record["length"]
+        segment = self._map(self._segment_path(record["segment"]), end)
+        if segment is None:
+            raise ValueError(f"Il segmento {record['segment']} del registro è incompleto.")
+        return json.loads(segment[record["offset"]:end])
+
+    def read_block(self, height: int) -> Block:
+        """
+            Legge dal disco il solo blocco all'altezza indicata.
+        """
+        if height < 0 or height >= self.get_height():
+            raise ValueError(f"Il blocco {height} non è presente nel registro.")
+        return Block.load_from_json(self._read_block_data(self._read_record(height)))
+
+    def verify_block(self, height: int) -> bool:
+        """
+            Verifica il blocco all'altezza indicata così come è salvato: il blocco letto dal segmento deve essere integro,
+            e il suo record dell'indice, da cui sono decodificati i blocchi con la sola intestazione, deve descriverlo fedelmente.
+        """
+        record = self._read_record(height)
+        block = Block.load_from_json(self._read_block_data(record))
+        root = "" if record["root_in_segment"] else block.get_root_hash()
+        header = (record["ID"], record["prev_ID"], record["author"], record["root"], record["state_root"], record["delete_flag"], record["binary"])
+        if header != (block.get_ID(), block.get_prev_ID(), block.get_author(), root, block.get_state_root(), block.get_delete_flag(), block.is_binary()):
+            return False
+        return block.verify()
+
+    def _slot_of(self, ID: bytes, capacity: int) -> int:
+        """
+            Restituisce la posizione iniziale dell'ID nella tabella, ricavata dai primi byte del digest.
+        """
+        return int.from_bytes(ID[:8], 'big') & (capacity - 1)
+
+    def _insert_ID(self, table: bytearray | mmap.mmap, capacity: int, ID: bytes, height: int) -> bool:
+        """
+            Inserisce l'ID nella tabella con indirizzamento aperto, se non è già presente.
+            Come nella blockchain, un ID ripetuto resta associato alla sua prima altezza.
+        """
+        slot = self._slot_of(ID, capacity)
+        while True:
+            offset = self._id_header.size + slot * self._id_slot.size
+            slot_ID, slot_height = self._id_slot.unpack_from(table, offset)
+            if not slot_height:
+                self._id_slot.pack_into(table, offset, ID, height + 1)
+                return True
+            if slot_ID == ID:
+                return False
+            slot = (slot + 1) & (capacity - 1)
+
+    def _rebuild_ID_index(self) -> None:
+        """
+            Ricostruisce la tabella degli ID a partire dall'indice, con una capacità almeno doppia del numero di blocchi.
+            La nuova tabella sostituisce la precedente solo quando è stata scritta per intero.
+        """
+        height = self.get_height()
+        capacity = BLOCKCHAIN_ID_INDEX_CAPACITY
+        while capacity < 2 * height:
+            capacity *= 2
+        table = bytearray(self._id_header.size + capacity * self._id_slot.size)
+        count = 0
+        for block_height in range(height):
+            if self._insert_ID(table, capacity, self._encode_hash(self._read_record(block_height)["ID"]), block_height):
+                count += 1
+        self._id_header.pack_into(table, 0, capacity, count, height)
+
+        path = self._path(Ledger_Storage.ID_INDEX_FILE)
+        self._unmap(path)
+        atomic_write_bytes(path, table)
+
+    def _index_IDs(self, blocks: list[Block], start_height: int) -> None:
+        """
+            Aggiunge alla tabella degli ID i blocchi appena scritti a partire da start_height.
+            Se la tabella manca, non è allineata all'indice o supererebbe metà della capacità viene ricostruita.
+        """
+        path = self._path(Ledger_Storage.ID_INDEX_FILE)
+        if not os.path.exists(path):
+            self._rebuild_ID_index()
+            return
+        self._unmap(path)
+        with open(path, 'r+b') as f:
+            table = mmap.mmap(f.fileno(), 0)
+            try:
+                capacity, count, height = self._id_header.unpack_from(table, 0)
+                rebuild = height != start_height or 2 * (count + len(blocks)) > capacity
+                if not rebuild:
+                    for offset, block in enumerate(blocks):
+                        if self._insert_ID(table, capacity, self._encode_hash(block.get_ID()), start_height + offset):
+                            count += 1
+                    self._id_header.pack_into(table, 0, capacity, count, start_height + len(blocks))
+                    table.flush()
+            finally:
+                table.close()
+        if rebuild:
+            self._rebuild_ID_index()
+
+    def get_block_height(self, ID: str) -> int | None:
+        """
+            Restituisce l'altezza del blocco con l'ID specificato, consultando la tabella persistente degli ID.
+            Vengono lette solo le poche pagine della tabella attraversate dalla ricerca.
+        """
+        try:
+            digest = self._encode_hash(ID)
+        except ValueError:
+            return None
+        path = self._path(Ledger_Storage.ID_INDEX_FILE)
+        table = self._map(path, self._id_header.size)
+        if table is None or self._id_header.unpack_from(table, 0)[2] != self.get_height():
+            self._rebuild_ID_index()
+            table = self._map(path, self._id_header.size)
+        capacity = self._id_header.unpack_from(table, 0)[0]
+
+        slot = self._slot_of(digest, capacity)
+        while True:
+            slot_ID, slot_height = self._id_slot.unpack_from(table, self._id_header.size + slot * self._id_slot.size)
+            if not slot_height:
+                return None
+            if slot_ID == digest:
+                return slot_height - 1
+            slot = (slot + 1) & (capacity - 1)
+
+    def find_block(self, ID: str) -> Block | None:
+        """
+            Cerca e decodifica il solo blocco con l'ID specificato, senza caricare il resto del registro.
+        """
+        height = self.get_block_height(ID)
+        if height is None:
+            return None
+        return self.read_block(height)
+
+    def read_header(self, height: int, cache: Merkle_Cache | None = None) -> Block:
+        """
+            Decodifica il blocco all'altezza indicata leggendo soltanto il suo record dell'indice.
+            I blocchi di certificazione hanno la sola intestazione, e il Merkle Tree è letto dal segmento mappato in memoria al primo accesso.
+            Parametri:
+            - height: altezza del blocco.
+            - cache: cache in cui conservare il Merkle Tree caricato su richiesta.
+        """
+        record = self._read_record(height)
+        if record["root_in_segment"]:
+            return Block.load_from_json(self._read_block_data(record))
+        if record["delete_flag"]:
+            block = Block(record["prev_ID"], record["author"], record["root"], True, binary=record["binary"], state_root=record["state_root"])
+            block._ID = record["ID"]
+            return block
+        return Block.load_header(
+            prev_ID=record["prev_ID"],
+            author=record["author"],
+            root_hash=record["root"],
+            ID=record["ID"],
+            body_loader=lambda: self._read_block_data(record)["merkle_or_ID"],
+            cache=cache,
+            binary=record["binary"],
+            state_root=record["state_root"]
+        )
+
+    def load_blockchain(self) -> Blockchain:
+        """
+            Carica la blockchain senza leggere i record dell'indice.
+            Ogni blocco è decodificato dal suo record al primo accesso, e le ricerche per ID usano la tabella persistente degli ID,
+            per cui il costo del caricamento non dipende dall'altezza del registro.
+        """
+        blockchain = Blockchain(storage=self)
+        blockchain.load_checkpoints(self.load_checkpoints())
+        return blockchain
+
+    def sync(self, blockchain: Blockchain) -> None:
+        """
+            Aggiunge al registro i blocchi della blockchain non ancora salvati e aggiorna i checkpoint.
+        """
+        height = self.get_height()
+        blocks = blockchain.get_blocks()
+        if height > len(blocks):
+            raise ValueError("Il registro su disco contiene più blocchi della blockchain da salvare.")
+        if height:
+            last_record = self._read_record(height - 1)
+            if last_record["ID"] != blocks[height - 1].get_ID():
+                raise ValueError("La blockchain da salvare non prosegue quella presente nel registro.")
+        self.append_blocks(blocks[height:])
+        self.save_checkpoints(blockchain.save_checkpoints())
+
+    def save_checkpoints(self, checkpoints: list[dict]) -> None:
+        atomic_write_json(self._path(Ledger_Storage.CHECKPOINTS_FILE), checkpoints)
+
+    def load_checkpoints(self) -> list[dict]:
+        path = self._path(Ledger_Storage.CHECKPOINTS_FILE)
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def save_smart_contract(self, data: dict) -> None:
+        atomic_write_json(self._path(Ledger_Storage.SMART_CONTRACT_FILE), data)
+
+    def load_smart_contract(self) -> dict:
+        with open(self._path(Ledger_Storage.SMART_CONTRACT_FILE), 'r') as f:
+            return json.load(f)
+
+    def save_revocation_filter(self, data: dict) -> None:
+        atomic_write_json(self._path(Ledger_Storage.REVOCATION_FILTER_FILE), data, indent=None)
+
+    def load_revocation_filter(self) -> dict|None:
+        path = self._path(Ledger_Storage.REVOCATION_FILTER_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def save_revocation_tree(self, data: bytes) -> None:
+        atomic_write_bytes(self._path(Ledger_Storage.REVOCATION_TREE_FILE), data)
+
+    def load_revocation_tree(self) -> bytes|None:
+        path = self._path(Ledger_Storage.REVOCATION_TREE_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
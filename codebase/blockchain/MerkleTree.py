@@ -1,6 +1,27 @@
+from bisect import bisect_left
+from typing import Iterable, Iterator, NotRequired, TypedDict
 from cycler import V
 from communication.Hash_Algorithm import Hash_Algorithm
-from constants import BLOCKCHAIN_HASH_ALGORITHM
+from constants import BLOCKCHAIN_HASH_ALGORITHM, BLOCKCHAIN_MERKLE_FORMAT_VERSION
+
+
+class MerkleProofStep(TypedDict):
+    """
+        Rappresenta un passo di una prova di inclusione di una foglia nel Merkle Tree.
+    """
+    hash: str # Hash del nodo fratello
+    left: bool # True se il nodo fratello si trova a sinistra
+
+
+class MerkleMultiProof(TypedDict):
+    """
+        Rappresenta una prova di inclusione compatta per più foglie del Merkle Tree.
+        Gli hash dei nodi condivisi tra le foglie compaiono una sola volta.
+    """
+    leaves_count: int # Numero di foglie dell'albero
+    indices: list[int] # Posizioni delle foglie provate, in ordine crescente
+    hashes: list[str] # Hash dei sottoalberi necessari, in ordine di visita da sinistra a destra
+    incremental: NotRequired[bool] # True se l'albero ha la forma incrementale, assente nelle prove precedenti
 
 
 class MerkleTree():
@@ -40,12 +61,11 @@ class MerkleTree():
         def set_right(self, right: 'MerkleTree._Node | None'):
             self._right = right
 
-        def _validate(self, hash_alg:Hash_Algorithm) -> bool:
+        def _validate(self, hash_alg:Hash_Algorithm, binary:bool=False) -> bool:
             
             if not self.get_hash():
                 return False
             
-            hash_function = hash_alg.hash
             left = self.get_left()
             right = self.get_right()
 
@@ -54,34 +74,35 @@ class MerkleTree():
                 right_hash = right.get_hash()
                 if left_hash is None or right_hash is None:
                     return False
-                return (hash_function(left_hash + right_hash) == self.get_hash()) and left._validate(hash_alg) and right._validate(hash_alg)
+                return (MerkleTree._combine(hash_alg, left_hash, right_hash, binary) == self.get_hash()) and left._validate(hash_alg, binary) and right._validate(hash_alg, binary)
             elif not left and not right:
                 return self.get_hash() is not None
             else:
                 return False
 
-        def _validate_leaf(self, hash_leaf:str):
-            """
-                Controlla se il nodo corrente è una foglia e se il suo hash corrisponde a quello della foglia specificata.
-            """
-            left_node = self.get_left()
-            right_node = self.get_right()
-            if not left_node and not right_node:
-                return self.get_hash() == hash_leaf
-            elif left_node and right_node:
-                return left_node._validate_leaf(hash_leaf) or right_node._validate_leaf(hash_leaf)
-            raise ValueError("Il nodo non è una foglia né è intero e l'albero non è valido")
-
-    def __init__(self, leaves: list[str], hash_algorithm: Hash_Algorithm = BLOCKCHAIN_HASH_ALGORITHM()):
+    def __init__(self, leaves: Iterable[str], hash_algorithm: Hash_Algorithm = BLOCKCHAIN_HASH_ALGORITHM(), leaves_count: int|None = None, binary: bool = False, incremental: bool = False):
         """
             Inizializza un Merkle Tree con i nodi foglia specificati.
+            Parametri:
+            - leaves: hash delle foglie, anche come generatore
+            - hash_algorithm: algoritmo di hash usato per i nodi interni
+            - leaves_count: numero di foglie, se noto a priori le foglie vengono consumate man mano senza essere copiate in una lista
+            - binary: se True i nodi interni sono il digest della concatenazione dei digest binari dei figli
+            - incremental: se True il sottoalbero sinistro di ogni nodo ha come foglie la più grande potenza di due minore del totale,
+              per cui aggiungere una foglia ricalcola solo il bordo destro; altrimenti la suddivisione è bilanciata
         """
         self._hash = hash_algorithm
-        if not leaves:
+        self._binary = binary
+        self._incremental = incremental
+        self._consistent = True # I nodi interni sono calcolati dalle foglie, per cui l'albero è valido per costruzione
+        if leaves_count is None:
+            leaves = list(leaves)
+            leaves_count = len(leaves)
+        self._leaves_count: int|None = leaves_count
+        self._root: MerkleTree._Node|None = None
+        if not leaves_count:
             return
-        merkle_leaves: list[MerkleTree._Node] = [MerkleTree._Node(leaf) for leaf in leaves]
-        self._root = self._build_tree(merkle_leaves)
-        # print(len(self))
+        self._root = self._build_tree(iter(leaves), leaves_count)
 
     def __len__(self) -> int:
         """
@@ -95,29 +116,77 @@ class MerkleTree():
         else:
             return 1 + len(left) + len(right)
 
-    def _build_tree(self, leaves:list[_Node]) -> _Node:
+    @staticmethod
+    def _left_count(count: int, incremental: bool) -> int:
+        """
+            Restituisce il numero di foglie del sottoalbero sinistro di un sottoalbero con count foglie.
+            Nella forma bilanciata è count//2, in quella incrementale la più grande potenza di due minore di count.
+        """
+        if incremental:
+            return 1 << ((count - 1).bit_length() - 1)
+        return count // 2
+
+    def _build_tree(self, leaves:Iterator[str], count:int) -> _Node:
         """
             Costruisce il MerkleTree a partire dalle foglie, siccome è un albero completo per definizione.
-            Cerca di bilanciarlo quanto più possibile, per cui calcola a priori il numero di nodi necessario (NUM_FOGLIE-1).
+            Il sottoalbero sinistro riceve le foglie indicate da _left_count, per cui l'albero è bilanciato o incrementale.
+            La visita in post-ordine è iterativa e lavora sul numero di foglie dei sottoalberi, per cui non copia
+            la lista delle foglie e consuma le foglie nell'ordine in cui arrivano.
         """
-        if len(leaves) == 1:
-            return leaves[0]
-        node = MerkleTree._Node()
-        node.set_left(self._build_tree(leaves[:len(leaves)//2]))
-        node.set_right(self._build_tree(leaves[len(leaves)//2:]))
+        built: list[MerkleTree._Node] = [] # Sottoalberi completati, in attesa del padre
+        pending: list[tuple[int, bool]] = [(count, False)] # (numero di foglie, figli già visitati)
+        while pending:
+            size, visited = pending.pop()
+            if size == 1:
+                leaf = next(leaves, None)
+                if leaf is None:
+                    raise ValueError("Il numero di foglie è inferiore a quello dichiarato.")
+                built.append(MerkleTree._Node(leaf))
+            elif not visited:
+                half = MerkleTree._left_count(size, self._incremental)
+                pending.append((size, True))
+                pending.append((size - half, False))
+                pending.append((half, False))
+            else:
+                right_node = built.pop()
+                left_node = built.pop()
+                built.append(self._join(left_node, right_node))
 
-        left_node = node.get_left()
-        right_node = node.get_right()
-        if left_node is None or right_node is None:
-            raise ValueError("Il Merkle Tree deve essere completo e bilanciato.")
-        
+        if next(leaves, None) is not None:
+            raise ValueError("Il numero di foglie è superiore a quello dichiarato.")
+        return built[0]
+
+    def _join(self, left_node: _Node, right_node: _Node) -> _Node:
+        """
+            Restituisce un nuovo nodo interno con i figli specificati, calcolandone l'hash.
+        """
         left_hash = left_node.get_hash()
         right_hash = right_node.get_hash()
         if left_hash is None or right_hash is None:
             raise ValueError("I nodi figli devono avere un hash valido.")
-        node.set_hash(self._hash.hash(left_hash + right_hash))
-        return node
+        return MerkleTree._Node(MerkleTree._combine(self._hash, left_hash, right_hash, self._binary), left_node, right_node)
+
+    @staticmethod
+    def _combine(hash_algorithm: Hash_Algorithm, left_hash: str, right_hash: str, binary: bool) -> str:
+        """
+            Calcola l'hash di un nodo interno a partire dagli hash dei figli.
+            In modalità binaria concatena i digest (2 * digest_size byte) invece delle loro stringhe esadecimali.
+        """
+        if binary:
+            return hash_algorithm.digest(bytes.fromhex(left_hash) + bytes.fromhex(right_hash)).hex()
+        return hash_algorithm.hash(left_hash + right_hash)
 
+    def is_binary(self) -> bool:
+        """
+            Indica se i nodi interni sono calcolati sui digest binari.
+        """
+        return self._binary
+
+    def is_incremental(self) -> bool:
+        """
+            Indica se l'albero ha la forma incrementale, in cui aggiungere una foglia ricalcola solo il bordo destro.
+        """
+        return self._incremental
 
     def _node_to_dict(self, node: 'MerkleTree._Node|None') -> dict:
         if node is None:
@@ -137,14 +206,66 @@ class MerkleTree():
         node.set_right(MerkleTree._dict_to_node(data['right']))
         return node
 
-    def save_on_json(self) -> dict:
-        data = self._node_to_dict(self._root)
+    def save_on_json(self, version: int = BLOCKCHAIN_MERKLE_FORMAT_VERSION) -> dict:
+        """
+            Salva il Merkle Tree in formato JSON.
+            Parametri:
+            - version: 1 per il formato annidato con tutti i nodi, 2 per il formato compatto con le sole foglie e la radice.
+        """
+        if version == 1:
+            data = self._node_to_dict(self._root)
+        elif version == 2:
+            root = self.get_root()
+            data = {
+                'version': 2,
+                'root': root.get_hash() if root else "",
+                'leaves': self.get_leaves()
+            }
+        else:
+            raise ValueError(f"Versione {version} del formato del Merkle Tree non supportata.")
+        if self._binary:
+            data['binary'] = True
+        if self._incremental:
+            data['incremental'] = True
         return data
 
+    @staticmethod
+    def get_format_version(data: dict) -> int:
+        """
+            Restituisce la versione del formato del Merkle Tree salvato; il formato annidato non ha versione.
+        """
+        return data.get('version', 1)
+
+    @staticmethod
+    def root_hash_from_json(data: dict) -> str:
+        """
+            Restituisce l'hash della radice del Merkle Tree salvato, senza ricostruirlo.
+        """
+        if MerkleTree.get_format_version(data) == 2:
+            return data['root']
+        return data.get('hash') or ""
+
     @staticmethod
     def load_from_json(data: dict) -> 'MerkleTree':
-        tree = MerkleTree([])
-        tree._root = MerkleTree._dict_to_node(data)
+        """
+            Carica il Merkle Tree da entrambi i formati JSON.
+            Nel formato compatto i nodi interni sono ricalcolati dalle foglie; se la radice ottenuta non coincide con quella
+            salvata, la radice mantiene l'hash salvato e l'albero risulta non valido, come un albero annidato alterato.
+        """
+        version = MerkleTree.get_format_version(data)
+        if version == 2:
+            tree = MerkleTree(data['leaves'], binary=data.get('binary', False), incremental=data.get('incremental', False))
+            root = tree.get_root()
+            if root and root.get_hash() != data['root']:
+                root.set_hash(data['root'])
+                tree._consistent = False
+            return tree
+        if version != 1:
+            raise ValueError(f"Versione {version} del formato del Merkle Tree non supportata.")
+        tree = MerkleTree([], binary=data.get('binary', False), incremental=data.get('incremental', False))
+        tree._root = MerkleTree._dict_to_node(data) if 'hash' in data else None # Un albero vuoto può contenere solo 'binary' e 'incremental'
+        tree._leaves_count = None # Calcolato alla prima richiesta
+        tree._consistent = tree._root is None # Gli hash dei nodi salvati non sono ancora stati controllati
         return tree
     
     def get_root(self) -> _Node | None:
@@ -158,7 +279,16 @@ class MerkleTree():
         if not self._root or not self._root.get_hash():
             return False
 
-        return self._root._validate(self._hash)
+        self._consistent = self._root._validate(self._hash, self._binary)
+        return self._consistent
+
+    def is_consistent(self) -> bool:
+        """
+            Indica se tutti i nodi interni sono stati calcolati a partire dalle foglie, costruendo o aggiornando l'albero,
+            oppure controllati da validate, per cui l'albero è valido senza doverlo visitare.
+            Un albero caricato nel formato annidato, o con una radice diversa da quella ricalcolata, non lo è finché non viene validato.
+        """
+        return self._consistent
 
     def validate_leafs(self, leafs: list[str]) -> bool:
         """
@@ -173,7 +303,378 @@ class MerkleTree():
         if not root or not root.get_hash():
             raise ValueError("Il Merkle Tree non è valido o non ha una radice.")
         
+        tree_leafs = set(self.get_leaves())
         for leaf in leafs:
-            if not root._validate_leaf(leaf):
+            if leaf not in tree_leafs:
                 return False
         return True
+
+    def get_leaves(self) -> list[str]:
+        """
+            Restituisce gli hash delle foglie del Merkle Tree, nell'ordine in cui sono state inserite.
+        """
+        root = self.get_root()
+        if not root:
+            return []
+        leaves: list[str] = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            left = node.get_left()
+            right = node.get_right()
+            if left and right:
+                stack.append(right)
+                stack.append(left)
+            elif not left and not right:
+                leaf_hash = node.get_hash()
+                if leaf_hash is None:
+                    raise ValueError("La foglia del Merkle Tree non ha un hash valido.")
+                leaves.append(leaf_hash)
+            else:
+                raise ValueError("Il nodo non è una foglia né è intero e l'albero non è valido")
+        return leaves
+
+    def get_leaves_count(self) -> int:
+        """
+            Restituisce il numero di foglie del Merkle Tree.
+        """
+        if self._leaves_count is None:
+            self._leaves_count = len(self.get_leaves())
+        return self._leaves_count
+
+    def copy(self) -> 'MerkleTree':
+        """
+            Restituisce una copia del Merkle Tree che condivide i nodi con l'originale, in tempo costante.
+            Gli aggiornamenti delle foglie non modificano mai i nodi esistenti ma li sostituiscono,
+            per cui la copia e l'originale possono essere aggiornati indipendentemente.
+        """
+        tree = MerkleTree([], self._hash, binary=self._binary, incremental=self._incremental)
+        tree._root = self._root
+        tree._leaves_count = self._leaves_count
+        tree._consistent = self._consistent
+        return tree
+
+    def update_leaf(self, index: int, leaf: str) -> str:
+        """
+            Sostituisce la foglia in posizione index, ricalcolando solo gli hash del cammino dalla foglia alla radice.
+            I nodi del cammino vengono ricreati e i sottoalberi fratelli riutilizzati, per cui servono O(log n) hash.
+            Restituisce il nuovo hash della radice.
+            Parametri:
+            - index: posizione della foglia, secondo l'ordine di inserimento
+            - leaf: nuovo hash della foglia
+        """
+        count = self.get_leaves_count()
+        if index < 0 or index >= count:
+            raise ValueError(f"La foglia {index} non è presente nel Merkle Tree.")
+
+        path: list[tuple[MerkleTree._Node, bool]] = [] # (antenato, True se il cammino prosegue a sinistra)
+        node = self._root
+        # Discende l'albero seguendo la stessa suddivisione usata in costruzione
+        while node and count > 1:
+            if not node.get_left() or not node.get_right():
+                raise ValueError("Il Merkle Tree deve essere completo e bilanciato.")
+            half = self._left_count(count, self._incremental)
+            if index < half:
+                path.append((node, True))
+                node, count = node.get_left(), half
+            else:
+                path.append((node, False))
+                node, count, index = node.get_right(), count - half, index - half
+
+        current = MerkleTree._Node(leaf)
+        for ancestor, went_left in reversed(path):
+            left = ancestor.get_left()
+            right = ancestor.get_right()
+            if not left or not right:
+                raise ValueError("Il Merkle Tree deve essere completo e bilanciato.")
+            current = self._join(current, right) if went_left else self._join(left, current)
+        self._root = current
+        return str(current.get_hash())
+
+    def update_leaves(self, leaves: Iterable[str]) -> str:
+        """
+            Sostituisce tutte le foglie del Merkle Tree, riutilizzando i sottoalberi rimasti invariati.
+            Vengono ricalcolati solo gli hash dei nodi il cui intervallo di foglie contiene una foglia cambiata o aggiunta,
+            o non compare nell'albero precedente: una foglia cambiata costa O(log n) hash, ed anche una foglia aggiunta
+            se l'albero è incrementale.
+            Restituisce il nuovo hash della radice, o una stringa vuota se non ci sono foglie.
+            Parametri:
+            - leaves: nuovi hash delle foglie, nell'ordine di inserimento
+        """
+        leaves = list(leaves)
+        old_leaves = self.get_leaves()
+        changed = {index: leaf for index, leaf in enumerate(leaves) if index >= len(old_leaves) or old_leaves[index] != leaf}
+        return self._rebuild(len(leaves), changed)
+
+    def append_leaf(self, leaf: str) -> str:
+        """
+            Aggiunge una foglia in coda al Merkle Tree, riutilizzando tutti i sottoalberi che non la contengono.
+            Nella forma incrementale i sottoalberi sinistri restano invariati e si ricalcola solo il bordo destro, con O(log n) hash;
+            nella forma bilanciata i confini dei sottoalberi possono spostarsi e vanno ricalcolati quelli nuovi.
+            Restituisce il nuovo hash della radice.
+        """
+        count = self.get_leaves_count()
+        return self._rebuild(count + 1, {count: leaf})
+
+    def _rebuild(self, count: int, changed: dict[int, str]) -> str:
+        """
+            Ricostruisce l'albero con count foglie, in cui cambiano solo le foglie indicate e le altre restano quelle attuali.
+            Ogni sottoalbero che non contiene foglie cambiate viene cercato nell'albero attuale, scendendo dalla radice,
+            e riutilizzato se vi compare con lo stesso intervallo di foglie, per cui non vengono visitati i sottoalberi invariati.
+            Parametri:
+            - count: numero di foglie del nuovo albero
+            - changed: posizione -> hash delle foglie cambiate o aggiunte
+        """
+        old_count = self.get_leaves_count() if self._root else 0
+        positions = sorted(changed)
+        built: list[MerkleTree._Node] = []
+        if count:
+            pending: list[tuple[int, int, bool]] = [(0, count, False)] # (prima foglia, numero di foglie, figli già visitati)
+            while pending:
+                start, size, visited = pending.pop()
+                if visited:
+                    right_node = built.pop()
+                    left_node = built.pop()
+                    built.append(self._join(left_node, right_node))
+                    continue
+                node = None
+                if start + size <= old_count and not MerkleTree._contains_index(positions, start, size):
+                    node = self._find_subtree(start, size, old_count)
+                if node:
+                    built.append(node)
+                elif size == 1:
+                    built.append(MerkleTree._Node(changed[start]))
+                else:
+                    half = self._left_count(size, self._incremental)
+                    pending.append((start, size, True))
+                    pending.append((start + half, size - half, False))
+                    pending.append((start, half, False))
+
+        self._leaves_count = count
+        self._root = built[0] if built else None
+        return str(self._root.get_hash()) if self._root else ""
+
+    def _find_subtree(self, start: int, size: int, count: int) -> 'MerkleTree._Node|None':
+        """
+            Restituisce il nodo dell'albero attuale, con count foglie, che copre esattamente le foglie [start, start+size),
+            o None se nessun nodo ha quell'intervallo.
+        """
+        node = self._root
+        node_start = 0
+        while node:
+            if node_start == start and count == size:
+                return node
+            if count == 1:
+                return None
+            half = self._left_count(count, self._incremental)
+            if start + size <= node_start + half:
+                node, count = node.get_left(), half
+            elif start >= node_start + half:
+                node, node_start, count = node.get_right(), node_start + half, count - half
+            else:
+                return None # L'intervallo è diviso tra i due figli
+        raise ValueError("Il Merkle Tree deve essere completo e bilanciato.")
+
+    def get_proof(self, index: int) -> list[MerkleProofStep]:
+        """
+            Restituisce la prova di inclusione della foglia in posizione index.
+            La prova è la lista dei nodi fratelli lungo il cammino dalla foglia alla radice, con la loro posizione.
+            Parametri:
+            - index: posizione della foglia, secondo l'ordine di inserimento
+        """
+        count = self.get_leaves_count()
+        if index < 0 or index >= count:
+            raise ValueError(f"La foglia {index} non è presente nel Merkle Tree.")
+
+        proof: list[MerkleProofStep] = []
+        node = self.get_root()
+        # Discende l'albero seguendo la stessa suddivisione usata in costruzione
+        while node and count > 1:
+            left = node.get_left()
+            right = node.get_right()
+            if not left or not right:
+                raise ValueError("Il Merkle Tree deve essere completo e bilanciato.")
+            half = self._left_count(count, self._incremental)
+            if index < half:
+                sibling, node, count, left_sibling = right, left, half, False
+            else:
+                sibling, node, count, left_sibling = left, right, count - half, True
+                index -= half
+            sibling_hash = sibling.get_hash()
+            if sibling_hash is None:
+                raise ValueError("I nodi figli devono avere un hash valido.")
+            proof.append({"hash": sibling_hash, "left": left_sibling})
+
+        proof.reverse()
+        return proof
+
+    @staticmethod
+    def leaf_path(index: int, leaves_count: int, incremental: bool = False) -> list[bool]|None:
+        """
+            Restituisce la posizione dei nodi fratelli lungo il cammino della foglia index, dalla foglia alla radice,
+            con lo stesso significato di MerkleProofStep["left"]; la sua lunghezza è la profondità della foglia.
+            Restituisce None se index non è una foglia di un albero con leaves_count foglie.
+        """
+        if index < 0 or index >= leaves_count:
+            return None
+        path: list[bool] = []
+        start, size = 0, leaves_count
+        while size > 1:
+            half = MerkleTree._left_count(size, incremental)
+            if index < start + half:
+                path.append(False)
+                size = half
+            else:
+                path.append(True)
+                start, size = start + half, size - half
+        path.reverse()
+        return path
+
+    @staticmethod
+    def verify_proof(leaf: str, proof: list[MerkleProofStep], root_hash: str, index: int, leaves_count: int, hash_algorithm: Hash_Algorithm = BLOCKCHAIN_HASH_ALGORITHM(), binary: bool = False, incremental: bool = False) -> bool:
+        """
+            Verifica una prova di inclusione rispetto all'hash della radice, senza bisogno dell'albero.
+            La prova deve avere esattamente i passi del cammino della foglia index, per cui un nodo interno o la radice
+            non possono essere presentati come foglie con una prova accorciata.
+            Parametri:
+            - leaf: hash della foglia da verificare
+            - proof: prova di inclusione generata da get_proof
+            - root_hash: hash della radice del Merkle Tree
+            - index: posizione della foglia
+            - leaves_count: numero di foglie dell'albero, da una fonte attendibile come il blocco che lo certifica
+            - hash_algorithm: algoritmo di hash usato per costruire l'albero
+            - binary: modalità di hashing dell'albero
+            - incremental: forma dell'albero
+        """
+        computed = MerkleTree.proof_root(leaf, proof, index, leaves_count, hash_algorithm, binary, incremental)
+        return computed is not None and computed == root_hash
+
+    @staticmethod
+    def proof_root(leaf: str, proof: list[MerkleProofStep], index: int, leaves_count: int, hash_algorithm: Hash_Algorithm = BLOCKCHAIN_HASH_ALGORITHM(), binary: bool = False, incremental: bool = False) -> str|None:
+        """
+            Ricalcola l'hash della radice a partire dalla foglia e dalla sua prova di inclusione.
+            Restituisce None se la prova non segue il cammino della foglia index in un albero con leaves_count foglie.
+        """
+        if [step["left"] for step in proof] != MerkleTree.leaf_path(index, leaves_count, incremental):
+            return None
+        current = leaf
+        for step in proof:
+            if step["left"]:
+                current = MerkleTree._combine(hash_algorithm, step["hash"], current, binary)
+            else:
+                current = MerkleTree._combine(hash_algorithm, current, step["hash"], binary)
+        return current
+
+    def get_multiproof(self, indices: list[int]) -> MerkleMultiProof:
+        """
+            Restituisce una prova di inclusione unica per le foglie nelle posizioni indicate.
+            Per ogni sottoalbero che non contiene foglie richieste viene incluso solo l'hash della sua radice.
+            Parametri:
+            - indices: posizioni delle foglie, secondo l'ordine di inserimento
+        """
+        count = self.get_leaves_count()
+        selected = sorted(set(indices))
+        if not selected:
+            raise ValueError("È necessario specificare almeno una foglia.")
+        if selected[0] < 0 or selected[-1] >= count:
+            raise ValueError("Alcune foglie richieste non sono presenti nel Merkle Tree.")
+        root = self.get_root()
+        if not root:
+            raise ValueError("Il Merkle Tree non è valido o non ha una radice.")
+
+        hashes: list[str] = []
+        self._collect_multiproof(root, 0, count, selected, hashes)
+        return {"leaves_count": count, "indices": selected, "hashes": hashes, "incremental": self._incremental}
+
+    def _collect_multiproof(self, node: 'MerkleTree._Node', start: int, count: int, selected: list[int], hashes: list[str]) -> None:
+        """
+            Visita il sottoalbero delle foglie [start, start+count) raccogliendo gli hash necessari alla prova.
+        """
+        if not MerkleTree._contains_index(selected, start, count):
+            node_hash = node.get_hash()
+            if node_hash is None:
+                raise ValueError("I nodi dell'albero devono avere un hash valido.")
+            hashes.append(node_hash)
+            return
+        if count == 1:
+            return # La foglia è fornita dal verificatore
+        left = node.get_left()
+        right = node.get_right()
+        if not left or not right:
+            raise ValueError("Il Merkle Tree deve essere completo e bilanciato.")
+        half = self._left_count(count, self._incremental)
+        self._collect_multiproof(left, start, half, selected, hashes)
+        self._collect_multiproof(right, start + half, count - half, selected, hashes)
+
+    @staticmethod
+    def verify_multiproof(leafs: list[str], proof: MerkleMultiProof, root_hash: str, hash_algorithm: Hash_Algorithm = BLOCKCHAIN_HASH_ALGORITHM(), binary: bool = False) -> bool:
+        """
+            Verifica una prova di inclusione multipla rispetto all'hash della radice, ricalcolando ogni nodo interno una sola volta.
+            Parametri:
+            - leafs: hash delle foglie, nello stesso ordine di proof["indices"]
+            - proof: prova generata da get_multiproof
+            - root_hash: hash della radice del Merkle Tree
+            - hash_algorithm: algoritmo di hash usato per costruire l'albero
+            - binary: modalità di hashing dell'albero
+        """
+        computed = MerkleTree.multiproof_root(leafs, proof, hash_algorithm, binary)
+        return computed is not None and computed == root_hash
+
+    @staticmethod
+    def multiproof_root(leafs: list[str], proof: MerkleMultiProof, hash_algorithm: Hash_Algorithm = BLOCKCHAIN_HASH_ALGORITHM(), binary: bool = False) -> str|None:
+        """
+            Ricalcola l'hash della radice a partire dalle foglie e dalla prova di inclusione multipla.
+            Restituisce None se la prova non è ben formata.
+            Il numero di foglie e la forma sono quelli dichiarati nella prova: chi verifica deve confrontarli con quelli
+            dell'albero certificato, altrimenti un nodo interno potrebbe essere presentato come foglia di un albero più piccolo.
+        """
+        indices = proof["indices"]
+        count = proof["leaves_count"]
+        if not leafs or len(leafs) != len(indices) or indices != sorted(set(indices)):
+            return None
+        if indices[0] < 0 or indices[-1] >= count:
+            return None
+
+        return MerkleTree._multiproof_root(indices, leafs, proof["hashes"], count, hash_algorithm, binary, proof.get("incremental", False))
+
+    @staticmethod
+    def _multiproof_root(indices: list[int], leafs: list[str], hashes: list[str], count: int, hash_algorithm: Hash_Algorithm, binary: bool, incremental: bool) -> str|None:
+        """
+            Ricalcola l'hash della radice dal basso verso l'alto, un livello alla volta, senza ricorsione.
+            I nodi interni da ricalcolare sono quelli sui cammini delle foglie indicate, ottenuti seguendo la suddivisione dell'albero;
+            i loro figli mancanti sono i sottoalberi forniti dalla prova, che sono disgiunti e quindi nell'ordine delle loro prime foglie.
+            Restituisce None se il numero di hash della prova non è quello atteso.
+        """
+        known: dict[tuple[int, int], str] = {(index, 1): leaf for index, leaf in zip(indices, leafs)} # (prima foglia, numero di foglie) -> hash
+        depths: dict[tuple[int, int], int] = {} # Nodi interni da ricalcolare -> profondità
+        for index in indices:
+            start, size, depth = 0, count, 0
+            while size > 1:
+                depths[(start, size)] = depth
+                half = MerkleTree._left_count(size, incremental)
+                if index < start + half:
+                    size = half
+                else:
+                    start, size = start + half, size - half
+                depth += 1
+
+        children = {node: MerkleTree._left_count(node[1], incremental) for node in depths}
+        missing = sorted({child for (start, size), half in children.items() for child in ((start, half), (start + half, size - half))
+                          if child not in depths and child not in known})
+        if len(missing) != len(hashes):
+            return None # Prova troppo corta o con hash non utilizzati
+        known.update(zip(missing, hashes))
+
+        # I figli hanno profondità maggiore del padre, per cui i livelli sono combinati dal più profondo alla radice
+        for start, size in sorted(depths, key=depths.__getitem__, reverse=True):
+            half = children[(start, size)]
+            known[(start, size)] = MerkleTree._combine(hash_algorithm, known[(start, half)], known[(start + half, size - half)], binary)
+        return known[(0, count)]
+
+    @staticmethod
+    def _contains_index(indices: list[int], start: int, count: int) -> bool:
+        """
+            Controlla se la lista ordinata di posizioni contiene almeno una foglia in [start, start+count).
+        """
+        position = bisect_left(indices, start)
+        return position < len(indices) and indices[position] < start + count
@@ -0,0 +1,61 @@
+from collections import OrderedDict
+from typing import Callable
+from blockchain.MerkleTree import MerkleTree
+from constants import BLOCKCHAIN_MERKLE_CACHE_SIZE
+
+
+class Merkle_Cache():
+    """
+        Cache LRU di dimensione limitata per i Merkle Tree dei blocchi caricati su richiesta.
+        Superata la capacità viene scartato l'albero usato meno di recente, che verrà ricaricato al successivo accesso.
+    """
+
+    def __init__(self, capacity: int = BLOCKCHAIN_MERKLE_CACHE_SIZE):
+        """
+            Inizializza una cache vuota.
+            Parametri:
+            - capacity: numero massimo di Merkle Tree mantenuti in memoria.
+        """
+        if capacity <= 0:
+            raise ValueError("La capacità della cache deve essere positiva.")
+        self._capacity = capacity
+        self._entries: OrderedDict[object, MerkleTree] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: object, loader: Callable[[], MerkleTree]) -> MerkleTree:
+        """
+            Restituisce il Merkle Tree associato alla chiave, caricandolo con loader se non è presente.
+        """
+        tree = self._entries.get(key)
+        if tree is not None:
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return tree
+
+        self._misses += 1
+        tree = loader()
+        self._entries[key] = tree
+        if len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
+        return tree
+
+    def clear(self) -> None:
+        """
+            Svuota la cache e ne azzera i contatori.
+        """
+        self._entries.clear()
+        self._hits = 0
+        self._misses = 0
+
+    def get_capacity(self) -> int:
+        return self._capacity
+
+    def get_hits(self) -> int:
+        return self._hits
+
+    def get_misses(self) -> int:
+        return self._misses
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,29 +1,321 @@
+import json
 from blockchain.Blockchain import Blockchain
 from blockchain.Block import Block
-from blockchain.MerkleTree import MerkleTree
+from blockchain.Bloom_Filter import Bloom_Filter
+from blockchain.MerkleTree import MerkleTree, MerkleMultiProof, MerkleProofStep
+from blockchain.Sparse_MerkleTree import Sparse_MerkleTree, SparseMerkleProof
 from actors.University import University
 from communication.Asymmetric_Scheme import Asymmetric_Scheme
+from communication.Hash_Algorithm import Hash_Algorithm
 from communication.User import User
-from constants import BLACKLIST_THRESHOLD
+from constants import BATCH_CREDENTIAL_ID_SEPARATOR, BLACKLIST_THRESHOLD, BLOCKCHAIN_BINARY_HASHING, BLOCKCHAIN_CHECKPOINT_WORKERS, BLOCKCHAIN_MERKLE_INCREMENTAL, REVOCATION_FILTER_CAPACITY, REVOCATION_FILTER_FALSE_POSITIVE_RATE
 
 class Smart_Contract(User):
     def __init__(self, blockchain:Blockchain|None, scheme:Asymmetric_Scheme, blacklist: dict[str, list[Asymmetric_Scheme]]|None) -> None:
         super().__init__("SMART_CONTRACT")
         self._blockchain = blockchain
+        # Indice delle credenziali revocate: ID della credenziale -> altezza del blocco di revoca
+        self._revocations: dict[str, int] = {}
+        # Filtro di Bloom degli ID revocati: una risposta negativa evita la ricerca esatta nell'indice delle revoche
+        self._revocation_filter = Bloom_Filter(REVOCATION_FILTER_CAPACITY, REVOCATION_FILTER_FALSE_POSITIVE_RATE)
+        self._revocation_lookups = 0
+        self._revocation_lookups_skipped = 0
+        # Sparse Merkle Tree delle revoche: ID revocato -> altezza del blocco di revoca, la cui radice è inclusa in ogni nuovo blocco
+        self._revocation_tree = Sparse_MerkleTree()
+        self._saved_state_root: str|None = None # Radice dei nodi delle revoche salvati, per riscriverli solo se cambiano
         if blockchain:
             self._hashing = blockchain.get_hashing_algorithm()
+            self._index_revocations()
         self._keys[self._code] = scheme
         if not blacklist:
             self._blacklist = {}
         else:
             self._blacklist = blacklist
 
-    def _link_blockchain(self, blockchain: Blockchain) -> None:
+    def _link_blockchain(self, blockchain: Blockchain, revocation_filter: dict|None = None, revocation_tree: bytes|None = None) -> None:
         """
             Collega lo smart contract alla blockchain.
+            Parametri:
+            - revocation_filter: filtro ed indice delle revoche salvati con save_revocation_filter, aggiornati con i soli blocchi successivi.
+            - revocation_tree: nodi dello Sparse Merkle Tree delle revoche salvati con save_revocation_tree.
         """
         self._blockchain = blockchain
         self._hashing = blockchain.get_hashing_algorithm()
+        self._index_revocations(revocation_filter, revocation_tree)
+
+    def _index_revocations(self, revocation_filter: dict|None = None, revocation_tree: bytes|None = None) -> None:
+        """
+            Ricostruisce l'indice delle revoche a partire dai blocchi di cancellazione presenti nella blockchain.
+            Se l'indice ed il filtro salvati con save_revocation_filter coprono i primi blocchi della blockchain vengono caricati,
+            e sono scansionati solo i blocchi aggiunti dopo il salvataggio; altrimenti la blockchain è scansionata per intero.
+            Allo stesso modo lo Sparse Merkle Tree è caricato dai nodi salvati, se corrispondono alla radice salvata con l'indice,
+            e vi sono aggiunte solo le nuove revoche; altrimenti viene ricostruito.
+        """
+        self._revocations = {}
+        self._revocation_tree = Sparse_MerkleTree(self._hashing)
+        self._saved_state_root = None
+        if not self._blockchain:
+            return
+        start = 0
+        loaded = bool(revocation_filter and "revocations" in revocation_filter and revocation_filter["height"] <= len(self._blockchain.get_blocks()))
+        if revocation_filter and loaded:
+            self._revocations = dict(revocation_filter["revocations"])
+            self._revocation_filter = Bloom_Filter.load_from_json(revocation_filter["filter"])
+            start = revocation_filter["height"]
+            if revocation_tree is not None and revocation_filter.get("state_root"):
+                tree = Sparse_MerkleTree.load_nodes(revocation_tree, {revoked_ID: str(height) for revoked_ID, height in self._revocations.items()}, self._hashing)
+                if tree.get_root() == revocation_filter["state_root"]:
+                    self._revocation_tree = tree
+                    self._saved_state_root = tree.get_root()
+        tree_loaded = len(self._revocation_tree) == len(self._revocations)
+
+        for block in self._blockchain.iterate_from(start, delete_flag=True):
+            revoked_ID = block.get_merkle_or_ID()
+            height = self._blockchain.get_height(block.get_ID())
+            if isinstance(revoked_ID, str) and height is not None and revoked_ID not in self._revocations:
+                self._revocations[revoked_ID] = height
+                if loaded:
+                    self._revocation_filter.add(revoked_ID)
+                if tree_loaded:
+                    self._revocation_tree.set(revoked_ID, str(height))
+
+        if not tree_loaded:
+            for revoked_ID, height in self._revocations.items():
+                self._revocation_tree.set(revoked_ID, str(height))
+
+        if not loaded or self._revocation_filter.is_full():
+            self._rebuild_revocation_filter()
+
+    def _rebuild_revocation_filter(self) -> None:
+        """
+            Ricostruisce il filtro delle revoche, con una capacità almeno doppia del numero di revoche.
+        """
+        capacity = REVOCATION_FILTER_CAPACITY
+        while capacity < 2 * len(self._revocations):
+            capacity *= 2
+        self._revocation_filter = Bloom_Filter(capacity, REVOCATION_FILTER_FALSE_POSITIVE_RATE)
+        for revoked_ID in self._revocations:
+            self._revocation_filter.add(revoked_ID)
+
+    def _register_revocation(self, block: Block) -> None:
+        """
+            Registra nell'indice e nel filtro la revoca contenuta in un blocco di cancellazione già aggiunto alla blockchain.
+            Viene mantenuta la prima revoca, come nella scansione della blockchain.
+        """
+        if not self._blockchain:
+            raise ValueError("Lo smart contract non è collegato a nessuna blockchain.")
+        revoked_ID = block.get_merkle_or_ID()
+        height = self._blockchain.get_height(block.get_ID())
+        if isinstance(revoked_ID, str) and height is not None and revoked_ID not in self._revocations:
+            self._revocations[revoked_ID] = height
+            if self._revocation_tree.get(revoked_ID) != str(height):
+                self._revocation_tree.set(revoked_ID, str(height))
+            self._revocation_filter.add(revoked_ID)
+            if self._revocation_filter.is_full():
+                self._rebuild_revocation_filter()
+
+    def get_state_root(self) -> str:
+        """
+            Restituisce la radice attuale dello Sparse Merkle Tree delle revoche, inclusa nel prossimo blocco.
+        """
+        return self._revocation_tree.get_root()
+
+    def get_revocation_proof(self, credential_ID: str) -> SparseMerkleProof:
+        """
+            Restituisce la prova di revoca, o di non revoca, della credenziale rispetto alla radice attuale delle revoche.
+            Per una credenziale certificata in blocco va verificata anche la prova dell'ID del blocco, revocabile per intero.
+        """
+        return self._revocation_tree.get_proof(credential_ID)
+
+    @staticmethod
+    def check_revocation_proof(credential_ID: str, proof: SparseMerkleProof, state_root: str, hash_algorithm: Hash_Algorithm) -> bool:
+        """
+            Verifica senza lo smart contract se la credenziale risulta revocata rispetto alla radice delle revoche di un blocco.
+            Restituisce True se la credenziale è revocata, False se non lo è.
+            Parametri:
+            - credential_ID: ID della credenziale
+            - proof: prova generata da get_revocation_proof
+            - state_root: radice delle revoche inclusa in un blocco recente, ottenuta con Block.get_state_root
+            - hash_algorithm: algoritmo di hash della blockchain
+        """
+        if not Sparse_MerkleTree.verify_proof(credential_ID, proof, state_root, hash_algorithm):
+            raise ValueError("La prova di revoca non è valida per la radice indicata.")
+        return proof["value"] is not None
+
+    def verify_state_root(self) -> bool:
+        """
+            Controlla che l'ultimo blocco con una radice delle revoche si impegni sullo stato delle revoche ricostruito dalla blockchain.
+        """
+        if not self._blockchain:
+            raise ValueError("Lo smart contract non è collegato a nessuna blockchain.")
+        for block in reversed(self._blockchain.get_blocks()):
+            if block.get_state_root():
+                return block.get_state_root() == self.get_state_root()
+        return True
+
+    def get_revocation_filter_report(self) -> dict:
+        """
+            Restituisce lo stato del filtro delle revoche e quante verifiche di revoca ha risolto senza consultare l'indice.
+        """
+        report = dict(self._revocation_filter.get_report())
+        report["lookups"] = self._revocation_lookups
+        report["skipped_lookups"] = self._revocation_lookups_skipped
+        return report
+
+    def save_revocation_filter(self) -> dict:
+        """
+            Salva il filtro e l'indice delle revoche in formato JSON, insieme all'altezza della blockchain che rappresentano
+            ed alla radice dello Sparse Merkle Tree delle revoche, con cui validare i nodi salvati con save_revocation_tree.
+        """
+        if not self._blockchain:
+            raise ValueError("Lo smart contract non è collegato a nessuna blockchain.")
+        return {
+            "height": len(self._blockchain.get_blocks()),
+            "filter": self._revocation_filter.save_on_json(),
+            "revocations": dict(self._revocations),
+            "state_root": self.get_state_root()
+        }
+
+    def save_revocation_tree(self) -> bytes|None:
+        """
+            Restituisce i nodi dello Sparse Merkle Tree delle revoche in formato binario,
+            o None se non sono cambiati dall'ultimo caricamento o salvataggio.
+        """
+        state_root = self.get_state_root()
+        if state_root == self._saved_state_root:
+            return None
+        self._saved_state_root = state_root
+        return self._revocation_tree.save_nodes()
+
+    def is_revoked(self, credential_ID: str) -> bool:
+        """
+            Controlla se la credenziale è stata revocata da un blocco successivo a quello che la certifica.
+            Una credenziale certificata in blocco è revocata anche quando viene revocato l'intero blocco.
+        """
+        if not self._blockchain:
+            raise ValueError("Lo smart contract non è collegato a nessuna blockchain.")
+        block_ID, index = Smart_Contract.split_credential_ID(credential_ID)
+        self._revocation_lookups += 1
+        if credential_ID not in self._revocation_filter and (index is None or block_ID not in self._revocation_filter):
+            self._revocation_lookups_skipped += 1
+            return False
+        height = self._blockchain.get_height(block_ID)
+        if height is None:
+            return False
+        revocations = [self._revocations.get(credential_ID)]
+        if index is not None:
+            revocations.append(self._revocations.get(block_ID))
+        return any(revocation_height is not None and revocation_height > height for revocation_height in revocations)
+
+    def get_revocation_height(self, credential_ID: str) -> int|None:
+        """
+            Restituisce l'altezza del blocco che ha revocato la credenziale, o None se non è stata revocata.
+        """
+        return self._revocations.get(credential_ID)
+
+    @staticmethod
+    def compose_credential_ID(block_ID: str, index: int) -> str:
+        """
+            Restituisce l'ID composto della credenziale in posizione index nel blocco di certificazione multipla.
+        """
+        return f"{block_ID}{BATCH_CREDENTIAL_ID_SEPARATOR}{index}"
+
+    @staticmethod
+    def split_credential_ID(credential_ID: str) -> tuple[str, int|None]:
+        """
+            Separa l'ID di una credenziale nell'ID del blocco e nella posizione della credenziale al suo interno.
+            Per le credenziali certificate singolarmente la posizione è None.
+        """
+        block_ID, separator, index = credential_ID.partition(BATCH_CREDENTIAL_ID_SEPARATOR)
+        if not separator:
+            return credential_ID, None
+        if not index.isdigit():
+            raise ValueError("L'ID composto della credenziale non è valido.")
+        return block_ID, int(index)
+
+    def _find_credential_block(self, credential_ID: str) -> tuple[Block|None, int|None]:
+        """
+            Restituisce il blocco che certifica la credenziale e la posizione della credenziale al suo interno.
+            Il blocco è None se non esiste o se la posizione non è presente nel suo Merkle Tree.
+        """
+        if not self._blockchain:
+            raise ValueError("Lo smart contract non è collegato a nessuna blockchain.")
+        block_ID, index = Smart_Contract.split_credential_ID(credential_ID)
+        block = self._blockchain.find_block(block_ID)
+        if not block or index is None:
+            return block, index
+        if block.get_delete_flag():
+            return None, index
+        tree = block.get_merkle_or_ID()
+        if not isinstance(tree, MerkleTree) or index >= tree.get_leaves_count():
+            return None, index
+        return block, index
+
+    @staticmethod
+    def batch_leaf(credential_root: str, leaves_count: int, incremental: bool, hash_algorithm: Hash_Algorithm) -> str:
+        """
+            Restituisce la foglia del blocco di certificazione multipla per una credenziale.
+            La foglia impegna, oltre alla radice, il numero di foglie e la forma del Merkle Tree della credenziale,
+            che non è salvato nella blockchain, per cui le prove delle foglie della credenziale sono legate alla loro profondità.
+            Parametri:
+            - credential_root: hash della radice del Merkle Tree della credenziale.
+            - leaves_count: numero di foglie del Merkle Tree della credenziale.
+            - incremental: forma del Merkle Tree della credenziale.
+            - hash_algorithm: algoritmo di hash della blockchain.
+        """
+        return hash_algorithm.hash(json.dumps([credential_root, leaves_count, incremental], separators=(",", ":")))
+
+    def _matches_batch_root(self, block: Block, index: int, credential_root: str, leaves_count: int, incremental: bool) -> bool:
+        """
+            Controlla che credential_root sia la radice della credenziale in posizione index nel blocco di certificazione multipla,
+            con il numero di foglie e la forma indicati.
+        """
+        tree = block.get_merkle_or_ID()
+        if not isinstance(tree, MerkleTree):
+            return False
+        leaf = Smart_Contract.batch_leaf(credential_root, leaves_count, incremental, self._hashing)
+        return MerkleTree.verify_proof(leaf, tree.get_proof(index), block.get_root_hash(), index, tree.get_leaves_count(), self._hashing, block.is_binary(), tree.is_incremental())
+
+    def get_batch_proof(self, credential_ID: str) -> list[MerkleProofStep]:
+        """
+            Restituisce la prova di inclusione che collega la foglia di una credenziale certificata in blocco, calcolata da batch_leaf,
+            all'hash della radice del blocco.
+            Con essa chiunque conosca l'intestazione del blocco può verificare la credenziale senza consultare lo smart contract.
+        """
+        block, index = self._find_credential_block(credential_ID)
+        if not block or index is None:
+            raise ValueError("La credenziale non è stata certificata in un blocco di certificazione multipla.")
+        tree = block.get_merkle_or_ID()
+        if not isinstance(tree, MerkleTree):
+            raise TypeError("Il Merkle Tree non è valido o non è un'istanza di MerkleTree.")
+        return tree.get_proof(index)
+
+    def _get_scheme(self) -> Asymmetric_Scheme:
+        """
+            Restituisce lo schema crittografico completo dello smart contract.
+        """
+        scheme = self._keys.get(self._code)
+        if not isinstance(scheme, Asymmetric_Scheme):
+            raise TypeError("Lo schema dello smart contract deve essere un'istanza di Asymmetric_Scheme.")
+        return scheme
+
+    def verify_blockchain(self, workers: int|None = None) -> int|None:
+        """
+            Verifica l'integrità della blockchain a partire dall'ultimo checkpoint firmato dallo smart contract.
+            Restituisce l'altezza del primo blocco non valido, o None se la blockchain è integra.
+        """
+        if not self._blockchain:
+            raise ValueError("Lo smart contract non è collegato a nessuna blockchain.")
+        return self._blockchain.verify_from_checkpoint(self._get_scheme(), workers)
+
+    def checkpoint_blockchain(self) -> None:
+        """
+            Firma un nuovo checkpoint di verifica se sono stati aggiunti abbastanza blocchi dall'ultimo.
+            La verifica dei blocchi avviene nel processo corrente, siccome è eseguita ad ogni salvataggio della blockchain.
+        """
+        if not self._blockchain:
+            raise ValueError("Lo smart contract non è collegato a nessuna blockchain.")
+        self._blockchain.advance_checkpoint(self._get_scheme(), workers=BLOCKCHAIN_CHECKPOINT_WORKERS)
 
     def whitelist_university(self, university:University, author_public_key: Asymmetric_Scheme) -> None:
         """
@@ -58,19 +350,71 @@ class Smart_Contract(User):
         top_block = self._blockchain.get_last_block()
         if not top_block:
             return False
-        block_to_invalidate = self._blockchain.find_block(block_ID)
+        block_to_invalidate, index = self._find_credential_block(block_ID)
         if not block_to_invalidate:
             return False
         
+        # La radice delle revoche del blocco include già la revoca che contiene
+        if block_ID not in self._revocations:
+            self._revocation_tree.set(block_ID, str(len(self._blockchain.get_blocks())))
         new_block = Block(
             prev_ID=top_block.get_ID(),
             author=block_to_invalidate.get_author(),
-            merkle_or_ID=block_to_invalidate.get_ID(),
-            delete_flag=True
+            merkle_or_ID=block_ID,
+            delete_flag=True,
+            binary=BLOCKCHAIN_BINARY_HASHING and index is None, # Un ID composto non è un digest
+            state_root=self._revocation_tree.get_root()
         ) 
         self._blockchain.add_block(new_block)
+        self._register_revocation(new_block)
         return True
     
+    def _next_prev_ID(self) -> str:
+        """
+            Restituisce il prev_ID del prossimo blocco da aggiungere alla blockchain.
+        """
+        if not self._blockchain:
+            raise ValueError("Lo smart contract non è collegato a nessuna blockchain.")
+        last_block = self._blockchain.get_last_block()
+        if not last_block:
+            return self._hashing.hash("Genesis Block")
+        return last_block.get_ID()
+
+    def _author_of(self, university: University) -> str:
+        """
+            Restituisce l'autore dei blocchi certificati dall'università, ovvero l'hash della sua chiave pubblica.
+        """
+        key = self._keys.get(university.get_code())
+        if not key:
+            raise ValueError("La chiave pubblica dell'autore non è valida.")
+        if not isinstance(key, Asymmetric_Scheme):
+            raise TypeError("La chiave pubblica dell'autore deve essere un'istanza di Asymmetric_Scheme.")
+        key = key.get_public_key()
+        if not key:
+            raise ValueError("La chiave pubblica dell'autore non è valida.")
+        return self._hashing.hash(key.get_key().hex())
+
+    def build_credential_MerkleTree(self, leafs: list[str], previous_credential_ID: str|None = None) -> MerkleTree:
+        """
+            Costruisce il Merkle Tree di una credenziale.
+            Se la credenziale è una riemissione, parte dal Merkle Tree della credenziale precedente e ricalcola solo
+            i cammini delle foglie cambiate o aggiunte, senza modificare l'albero del blocco precedente.
+            Un albero precedente con una forma diversa da quella configurata viene ricostruito, per cui le riemissioni
+            successive passano alla forma incrementale.
+            Parametri:
+            - leafs: hash delle foglie della nuova credenziale
+            - previous_credential_ID: ID della credenziale precedente dello studente, se presente
+        """
+        if previous_credential_ID and self._blockchain:
+            block = self._blockchain.find_block(previous_credential_ID)
+            if block and not block.get_delete_flag() and block.is_binary() == BLOCKCHAIN_BINARY_HASHING:
+                previous_tree = block.get_merkle_or_ID()
+                if isinstance(previous_tree, MerkleTree) and previous_tree.is_incremental() == BLOCKCHAIN_MERKLE_INCREMENTAL:
+                    tree = previous_tree.copy()
+                    tree.update_leaves(leafs)
+                    return tree
+        return MerkleTree(leafs, self._hashing, binary=BLOCKCHAIN_BINARY_HASHING, incremental=BLOCKCHAIN_MERKLE_INCREMENTAL)
+
     def certificate_credential_MerkleTree(self, tree:MerkleTree, university:University) -> str:
         """
             Certifica un Merkle Tree, restituendo il suo ID.
@@ -94,34 +438,70 @@ class Smart_Contract(User):
         if not self._validate_merkle_tree(tree):
             raise ValueError("Il Merkle Tree non è valido.")
         
-        last_block = self._blockchain.get_last_block()
-        if not last_block:
-            prev_ID = self._hashing.hash("Genesis Block")
-        else:
-            prev_ID = last_block.get_ID()
-        key = self._keys.get(university.get_code())
-        if not key:
-            raise ValueError("La chiave pubblica dell'autore non è valida.")
-        if not isinstance(key, Asymmetric_Scheme):
-            raise TypeError("La chiave pubblica dell'autore deve essere un'istanza di Asymmetric_Scheme.")
-        key = key.get_public_key()
-        if not key:
-            raise ValueError("La chiave pubblica dell'autore non è valida.")
-        
         block = Block(
-            prev_ID=prev_ID,
-            author=self._hashing.hash(key.get_key().hex()),
+            prev_ID=self._next_prev_ID(),
+            author=self._author_of(university),
             merkle_or_ID=tree,
-            delete_flag=False
+            delete_flag=False,
+            binary=tree.is_binary(),
+            state_root=self._revocation_tree.get_root()
         )
         self._add_block(block)
         return block.get_ID()
 
+    def certificate_credentials_MerkleTrees(self, trees:list[MerkleTree], university:University) -> list[str]:
+        """
+            Certifica più credenziali in un unico blocco, il cui Merkle Tree ha come foglie le radici dei Merkle Tree delle credenziali,
+            insieme al loro numero di foglie ed alla loro forma (batch_leaf).
+            Restituisce gli ID composti delle credenziali (ID del blocco e posizione), nello stesso ordine degli alberi.
+            Le foglie delle credenziali non vengono salvate nella blockchain: vanno validate con le prove di inclusione,
+            e get_batch_proof collega la radice di ciascuna credenziale a quella del blocco.
+            Parametri:
+            - trees: Merkle Tree delle credenziali, tutti nella stessa modalità di hashing.
+            - university: università che certifica le credenziali.
+        """
+        if not self._blockchain:
+            raise ValueError("Lo smart contract non è collegato a nessuna blockchain.")
+        if not trees:
+            raise ValueError("È necessario specificare almeno un Merkle Tree.")
+
+        if self.is_blacklisted(university):
+            raise ValueError("L'università è stata inserita nella blacklist dello smart contract, impossibile procedere con la certificazione.")
+
+        binary = trees[0].is_binary() if isinstance(trees[0], MerkleTree) else False
+        roots: list[str] = []
+        for tree in trees:
+            if not isinstance(tree, MerkleTree):
+                raise TypeError("Tutti gli alberi devono essere istanze di MerkleTree.")
+            if tree.is_binary() != binary:
+                raise ValueError("Tutti i Merkle Tree devono usare la stessa modalità di hashing.")
+            root = tree.get_root()
+            root_hash = root.get_hash() if root else None
+            if not root_hash:
+                raise ValueError("Il Merkle Tree non ha un hash valido nella radice.")
+            if not self._validate_merkle_tree(tree):
+                raise ValueError("Il Merkle Tree non è valido.")
+            roots.append(Smart_Contract.batch_leaf(root_hash, tree.get_leaves_count(), tree.is_incremental(), self._hashing))
+
+        batch_tree = MerkleTree(roots, self._hashing, len(roots), binary=binary)
+        block = Block(
+            prev_ID=self._next_prev_ID(),
+            author=self._author_of(university),
+            merkle_or_ID=batch_tree,
+            delete_flag=False,
+            binary=binary,
+            state_root=self._revocation_tree.get_root()
+        )
+        self._add_block(block)
+        return [Smart_Contract.compose_credential_ID(block.get_ID(), index) for index in range(len(roots))]
+
     def _validate_merkle_tree(self, tree:MerkleTree) -> bool:
         """
             Controlla che il Merkle Tree sia valido.
+            Un albero costruito o aggiornato a partire dalle foglie, come quello di una riemissione, è valido per costruzione
+            e non viene visitato; gli altri, ad esempio caricati nel formato annidato, sono validati per intero.
         """
-        return tree.validate()
+        return tree.is_consistent() or tree.validate()
 
     def save_on_json(self) -> dict:
         data = super().save_on_json()
@@ -183,12 +563,94 @@ class Smart_Contract(User):
             return False
 
         # Controlla se l'ID è stato revocato successivamente nella blockchain
-        next_block = self._blockchain.next(block)
-        while next_block:
-            if next_block.get_delete_flag() and next_block.get_merkle_or_ID() == credential_ID:
-                return False #Il blocco ha revocato la credenziale
+        if self.is_revoked(credential_ID):
+            return False #Il blocco ha revocato la credenziale
 
-            next_block = self._blockchain.next(next_block)
+        return True
+
+    def validate_credential_MerkleProofs(self, leafs: list[str], indices: list[int], proofs: list[list[MerkleProofStep]], credential_ID: str, leaves_count: int|None = None, incremental: bool = False) -> bool:
+        """
+            Valida le foglie di una credenziale attraverso le loro prove di inclusione.
+            Ogni prova deve seguire il cammino della foglia nella sua posizione, per cui la radice o un nodo interno
+            non possono essere presentati come foglie.
+            Per una credenziale certificata da sola, numero di foglie e forma sono quelli del Merkle Tree del blocco;
+            per una certificata in blocco sono quelli indicati, che devono coincidere con quelli impegnati nella foglia del blocco.
+            Parametri:
+            - leafs: hash delle foglie divulgate
+            - indices: posizioni delle foglie nel Merkle Tree della credenziale, nello stesso ordine
+            - proofs: prove di inclusione delle foglie, nello stesso ordine
+            - credential_ID: ID della credenziale
+            - leaves_count: numero di foglie del Merkle Tree di una credenziale certificata in blocco
+            - incremental: forma del Merkle Tree di una credenziale certificata in blocco
+        """
+        if not self._blockchain:
+            raise ValueError("Lo smart contract non è collegato a nessuna blockchain.")
+        if not leafs or not credential_ID:
+            raise ValueError("Le foglie e l'ID della credenziale non possono essere vuoti.")
+        if len(leafs) != len(proofs) or len(leafs) != len(indices):
+            raise ValueError("Il numero di prove non corrisponde al numero di foglie.")
+
+        block, index = self._find_credential_block(credential_ID)
+        if not block or block.get_delete_flag():
+            return False
+
+        if index is None:
+            tree = block.get_merkle_or_ID()
+            if not isinstance(tree, MerkleTree):
+                return False
+            root_hash = block.get_root_hash()
+            leaves_count, incremental = tree.get_leaves_count(), tree.is_incremental()
+        else:
+            if leaves_count is None:
+                raise ValueError("Per una credenziale certificata in blocco va indicato il numero di foglie.")
+            # La radice della credenziale non è nel blocco: la si ricava dalla prima prova e la si collega a quella del blocco
+            root_hash = MerkleTree.proof_root(leafs[0], proofs[0], indices[0], leaves_count, self._hashing, block.is_binary(), incremental)
+            if root_hash is None or not self._matches_batch_root(block, index, root_hash, leaves_count, incremental):
+                return False
+        for leaf, leaf_index, proof in zip(leafs, indices, proofs):
+            if not MerkleTree.verify_proof(leaf, proof, root_hash, leaf_index, leaves_count, self._hashing, block.is_binary(), incremental):
+                return False
+
+        # Controlla se l'ID è stato revocato successivamente nella blockchain
+        if self.is_revoked(credential_ID):
+            return False
+
+        return True
+
+    def validate_credential_MerkleMultiProof(self, leafs: list[str], proof: MerkleMultiProof, credential_ID: str) -> bool:
+        """
+            Valida le foglie divulgate di una credenziale attraverso un'unica prova di inclusione multipla.
+            Il numero di foglie e la forma dichiarati nella prova devono essere quelli del Merkle Tree del blocco,
+            o quelli impegnati nella foglia del blocco per una credenziale certificata in blocco.
+            Parametri:
+            - leafs: hash delle foglie divulgate, nell'ordine delle posizioni della prova
+            - proof: prova di inclusione multipla
+            - credential_ID: ID della credenziale
+        """
+        if not self._blockchain:
+            raise ValueError("Lo smart contract non è collegato a nessuna blockchain.")
+        if not leafs or not credential_ID:
+            raise ValueError("Le foglie e l'ID della credenziale non possono essere vuoti.")
+
+        block, index = self._find_credential_block(credential_ID)
+        if not block or block.get_delete_flag():
+            return False
+
+        incremental = proof.get("incremental", False)
+        if index is None:
+            tree = block.get_merkle_or_ID()
+            if not isinstance(tree, MerkleTree) or proof["leaves_count"] != tree.get_leaves_count() or incremental != tree.is_incremental():
+                return False
+            if not MerkleTree.verify_multiproof(leafs, proof, block.get_root_hash(), self._hashing, block.is_binary()):
+                return False
+        else:
+            credential_root = MerkleTree.multiproof_root(leafs, proof, self._hashing, block.is_binary())
+            if credential_root is None or not self._matches_batch_root(block, index, credential_root, proof["leaves_count"], incremental):
+                return False
+
+        # Controlla se l'ID è stato revocato successivamente nella blockchain
+        if self.is_revoked(credential_ID):
+            return False
 
         return True
 
@@ -230,17 +692,13 @@ class Smart_Contract(User):
         if self.is_blacklisted(university):
             raise ValueError("L'università è stata inserita nella blacklist dello smart contract, impossibile procedere con la revocazione.")
 
-        block = self._blockchain.find_block(credential_ID)
+        block, _ = self._find_credential_block(credential_ID)
         if not block:
             raise ValueError("Il blocco con l'ID specificato non esiste nella blockchain.")
         
         # Controlla se l'ID è stato revocato successivamente nella blockchain
-        next_block = self._blockchain.next(block)
-        while next_block:
-            if next_block.get_delete_flag() and next_block.get_merkle_or_ID() == credential_ID:
-                raise ValueError("La credenziale è già stata revocata in un blocco successivo.")
-    
-            next_block = self._blockchain.next(next_block)
+        if self.is_revoked(credential_ID):
+            raise ValueError("La credenziale è già stata revocata in un blocco successivo.")
 
         if not self._invalidate_block(credential_ID):
             raise ValueError("La revoca della credenziale è fallita.")
@@ -252,16 +710,12 @@ class Smart_Contract(User):
         if not self._blockchain:
             raise ValueError("Lo smart contract non è collegato a nessuna blockchain.")
 
-        block = self._blockchain.find_block(credential_ID)
+        block, _ = self._find_credential_block(credential_ID)
         if not block:
             return False
 
         # Controlla se l'ID è stato revocato successivamente nella blockchain
-        next_block = self._blockchain.next(block)
-        while next_block:
-            if next_block.get_delete_flag() and next_block.get_merkle_or_ID() == credential_ID:
-                return False
-
-            next_block = self._blockchain.next(next_block)
+        if self.is_revoked(credential_ID):
+            return False
 
         return True
\ No newline at end of file
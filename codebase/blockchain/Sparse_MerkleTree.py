@@ -0,0 +1,170 @@
+import struct
+from typing import TypedDict
+from blockchain.MerkleTree import MerkleTree
+from communication.Hash_Algorithm import Hash_Algorithm
+from constants import BLOCKCHAIN_HASH_ALGORITHM
+
+
+class SparseMerkleProof(TypedDict):
+    """
+        Rappresenta una prova di appartenenza o di non appartenenza di una chiave al Sparse Merkle Tree.
+        Sono inclusi solo i fratelli diversi dal valore predefinito del loro livello, segnalati dai bit di bitmap.
+    """
+    value: str|None # Valore associato alla chiave, o None per una prova di non appartenenza
+    bitmap: str # Intero esadecimale: il bit i è 1 se il fratello al livello i (dalle foglie) è incluso
+    siblings: list[str] # Hash dei fratelli inclusi, dalle foglie verso la radice
+
+
+class Sparse_MerkleTree():
+    """
+        Sparse Merkle Tree: albero binario completo con una foglia per ogni possibile digest della chiave.
+        Le foglie vuote e i sottoalberi interamente vuoti hanno un hash predefinito per livello, per cui vengono
+        memorizzati solo i nodi lungo i percorsi delle chiavi presenti.
+        Ogni chiave ha una prova di appartenenza, se presente, o di non appartenenza, se assente, di lunghezza pari alla profondità.
+    """
+
+    def __init__(self, hash_algorithm: Hash_Algorithm = BLOCKCHAIN_HASH_ALGORITHM()):
+        """
+            Inizializza un albero vuoto, con profondità pari al numero di bit del digest dell'algoritmo di hash.
+        """
+        self._hash = hash_algorithm
+        self._depth = hash_algorithm.get_digest_size() * 8
+        self._defaults = Sparse_MerkleTree._default_hashes(hash_algorithm, self._depth)
+        # Nodi non predefiniti: (livello, prefisso della chiave) -> hash; il livello 0 contiene le foglie
+        self._nodes: dict[tuple[int, int], str] = {}
+        self._values: dict[str, str] = {}
+
+    @staticmethod
+    def _default_hashes(hash_algorithm: Hash_Algorithm, depth: int) -> list[str]:
+        """
+            Restituisce gli hash dei sottoalberi vuoti per ogni livello, dalla foglia vuota alla radice.
+        """
+        defaults = [hash_algorithm.hash("")]
+        for _ in range(depth):
+            defaults.append(MerkleTree._combine(hash_algorithm, defaults[-1], defaults[-1], False))
+        return defaults
+
+    @staticmethod
+    def _key_of(hash_algorithm: Hash_Algorithm, key: str) -> int:
+        """
+            Restituisce la posizione della foglia associata alla chiave.
+        """
+        return int(hash_algorithm.hash(key), 16)
+
+    @staticmethod
+    def _leaf_hash(hash_algorithm: Hash_Algorithm, key: str, value: str) -> str:
+        return hash_algorithm.hash(f"{key}:{value}")
+
+    def _get_node(self, level: int, prefix: int) -> str:
+        return self._nodes.get((level, prefix), self._defaults[level])
+
+    def set(self, key: str, value: str) -> str:
+        """
+            Associa il valore alla chiave e ricalcola il percorso dalla foglia alla radice.
+            Restituisce il nuovo hash della radice.
+        """
+        self._values[key] = value
+        prefix = Sparse_MerkleTree._key_of(self._hash, key)
+        current = Sparse_MerkleTree._leaf_hash(self._hash, key, value)
+        self._nodes[(0, prefix)] = current
+        for level in range(self._depth):
+            sibling = self._get_node(level, prefix ^ 1)
+            if prefix & 1:
+                current = MerkleTree._combine(self._hash, sibling, current, False)
+            else:
+                current = MerkleTree._combine(self._hash, current, sibling, False)
+            prefix >>= 1
+            self._nodes[(level + 1, prefix)] = current
+        return current
+
+    def get(self, key: str) -> str|None:
+        return self._values.get(key)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def get_root(self) -> str:
+        return self._get_node(self._depth, 0)
+
+    def get_values(self) -> dict[str, str]:
+        return self._values
+
+    def _node_record(self) -> struct.Struct:
+        # Livello, prefisso della chiave ed hash del nodo, di lunghezza fissa
+        digest_size = self._hash.get_digest_size()
+        return struct.Struct(f">H{digest_size}s{digest_size}s")
+
+    def save_nodes(self) -> bytes:
+        """
+            Restituisce i nodi non predefiniti dell'albero in formato binario, per ricaricarlo senza ricalcolare alcun hash.
+            Le chiavi non sono ricavabili dai nodi, per cui i valori vanno salvati a parte.
+        """
+        record = self._node_record()
+        digest_size = self._hash.get_digest_size()
+        return b"".join(record.pack(level, prefix.to_bytes(digest_size, 'big'), bytes.fromhex(node_hash)) for (level, prefix), node_hash in self._nodes.items())
+
+    @staticmethod
+    def load_nodes(data: bytes, values: dict[str, str], hash_algorithm: Hash_Algorithm = BLOCKCHAIN_HASH_ALGORITHM()) -> 'Sparse_MerkleTree':
+        """
+            Carica l'albero dai nodi salvati con save_nodes e dai valori associati alle chiavi.
+            Parametri:
+            - data: nodi in formato binario
+            - values: valori associati alle chiavi, salvati a parte
+            - hash_algorithm: algoritmo di hash con cui è stato costruito l'albero
+        """
+        tree = Sparse_MerkleTree(hash_algorithm)
+        record = tree._node_record()
+        if len(data) % record.size:
+            raise ValueError("I nodi dello Sparse Merkle Tree salvati sono incompleti.")
+        tree._nodes = {(level, int.from_bytes(prefix, 'big')): node_hash.hex() for level, prefix, node_hash in record.iter_unpack(data)}
+        tree._values = dict(values)
+        return tree
+
+    def get_proof(self, key: str) -> SparseMerkleProof:
+        """
+            Restituisce la prova di appartenenza della chiave, o di non appartenenza se la chiave è assente.
+        """
+        prefix = Sparse_MerkleTree._key_of(self._hash, key)
+        bitmap = 0
+        siblings: list[str] = []
+        for level in range(self._depth):
+            sibling = self._nodes.get((level, prefix ^ 1))
+            if sibling is not None:
+                bitmap |= 1 << level
+                siblings.append(sibling)
+            prefix >>= 1
+        return {"value": self._values.get(key), "bitmap": format(bitmap, 'x'), "siblings": siblings}
+
+    @staticmethod
+    def verify_proof(key: str, proof: SparseMerkleProof, root_hash: str, hash_algorithm: Hash_Algorithm = BLOCKCHAIN_HASH_ALGORITHM()) -> bool:
+        """
+            Verifica la prova rispetto all'hash della radice, senza bisogno dell'albero.
+            Se la prova è valida, proof["value"] è il valore associato alla chiave, o None se la chiave è assente.
+            Parametri:
+            - key: chiave della prova
+            - proof: prova generata da get_proof
+            - root_hash: hash della radice dello Sparse Merkle Tree
+            - hash_algorithm: algoritmo di hash usato per costruire l'albero
+        """
+        depth = hash_algorithm.get_digest_size() * 8
+        defaults = Sparse_MerkleTree._default_hashes(hash_algorithm, depth)
+        prefix = Sparse_MerkleTree._key_of(hash_algorithm, key)
+        bitmap = int(proof["bitmap"], 16)
+        if bitmap >> depth:
+            return False
+        siblings = iter(proof["siblings"])
+        value = proof["value"]
+        current = defaults[0] if value is None else Sparse_MerkleTree._leaf_hash(hash_algorithm, key, value)
+        try:
+            for level in range(depth):
+                sibling = next(siblings) if bitmap >> level & 1 else defaults[level]
+                if prefix & 1:
+                    current = MerkleTree._combine(hash_algorithm, sibling, current, False)
+                else:
+                    current = MerkleTree._combine(hash_algorithm, current, sibling, False)
+                prefix >>= 1
+        except StopIteration:
+            return False # Prova troppo corta
+        if next(siblings, None) is not None:
+            return False # Prova con hash non utilizzati
+        return current == root_hash
@@ -0,0 +1,93 @@
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Sequence, overload
+from blockchain.Block import Block
+from blockchain.Merkle_Cache import Merkle_Cache
+from constants import BLOCKCHAIN_DECODED_BLOCKS_SIZE
+
+if TYPE_CHECKING:
+    from blockchain.Ledger_Storage import Ledger_Storage
+
+
+class Stored_Blocks(Sequence[Block]):
+    """
+        Sequenza dei blocchi di una blockchain caricata dal registro su disco.
+        I blocchi salvati sono decodificati dall'indice mappato in memoria solo al primo accesso, e solo i più recenti restano in memoria; le ricerche per ID
+        passano per la tabella persistente degli ID, per cui caricare la blockchain non legge alcun record.
+        I blocchi aggiunti dopo il caricamento restano in memoria, indicizzati per ID, finché la blockchain non viene salvata.
+    """
+
+    def __init__(self, storage: 'Ledger_Storage', cache: Merkle_Cache, capacity: int = BLOCKCHAIN_DECODED_BLOCKS_SIZE):
+        """
+            Parametri:
+            - storage: registro da cui leggere i blocchi, di cui vengono considerati i blocchi presenti al momento della creazione.
+            - cache: cache della blockchain in cui conservare i Merkle Tree caricati su richiesta.
+            - capacity: numero massimo di blocchi decodificati mantenuti in memoria.
+        """
+        if capacity <= 0:
+            raise ValueError("La capacità della cache deve essere positiva.")
+        self._storage = storage
+        self._cache = cache
+        self._stored_height = storage.get_height()
+        self._capacity = capacity
+        # Altezza -> blocco decodificato di recente, scartato il meno recente oltre la capacità (cache LRU)
+        self._decoded: OrderedDict[int, Block] = OrderedDict()
+        self._appended: list[Block] = []
+        self._appended_index: dict[str, int] = {} # ID -> altezza dei blocchi aggiunti in memoria
+
+    def __len__(self) -> int:
+        return self._stored_height + len(self._appended)
+
+    @overload
+    def __getitem__(self, position: int) -> Block: ...
+
+    @overload
+    def __getitem__(self, position: slice) -> list[Block]: ...
+
+    def __getitem__(self, position: int|slice) -> Block|list[Block]:
+        if isinstance(position, slice):
+            return [self[height] for height in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if position < 0 or position >= len(self):
+            raise IndexError("Il blocco non è presente nella blockchain.")
+        if position >= self._stored_height:
+            return self._appended[position - self._stored_height]
+        block = self._decoded.get(position)
+        if block is not None:
+            self._decoded.move_to_end(position)
+            return block
+        block = self._storage.read_header(position, self._cache)
+        self._decoded[position] = block
+        if len(self._decoded) > self._capacity:
+            self._decoded.popitem(last=False)
+        return block
+
+    def get_storage(self) -> 'Ledger_Storage':
+        """
+            Restituisce il registro da cui vengono letti i blocchi.
+        """
+        return self._storage
+
+    def get_stored_height(self) -> int:
+        """
+            Restituisce il numero di blocchi letti dal registro, esclusi quelli aggiunti in memoria.
+        """
+        return self._stored_height
+
+    def append(self, block: Block) -> None:
+        """
+            Aggiunge in coda un blocco non ancora salvato nel registro.
+        """
+        self._appended_index.setdefault(block.get_ID(), len(self))
+        self._appended.append(block)
+
+    def find_height(self, ID: str) -> int|None:
+        """
+            Restituisce l'altezza del blocco con l'ID specificato, o None se non presente.
+            Come nella blockchain in memoria, un ID ripetuto resta associato alla sua prima altezza.
+        """
+        height = self._storage.get_block_height(ID)
+        if height is not None and height < self._stored_height:
+            return height
+        # Un blocco salvato dopo il caricamento è già tra quelli aggiunti in memoria
+        return self._appended_index.get(ID)
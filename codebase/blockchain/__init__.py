@@ -1,4 +1,9 @@
 from .Block import Block
 from .Blockchain import Blockchain
 from .MerkleTree import MerkleTree
-from .Smart_Contract import Smart_Contract
\ No newline at end of file
+from .Smart_Contract import Smart_Contract
+from .Flat_MerkleTree import Flat_MerkleTree
+from .Ledger_Storage import Ledger_Storage
+from .Merkle_Cache import Merkle_Cache
+from .Bloom_Filter import Bloom_Filter
+from .Sparse_MerkleTree import Sparse_MerkleTree
@@ -1,4 +1,6 @@
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
 from communication.Hash_Algorithm import Hash_Algorithm
 
 class Generic_Hash_Algorithm(Hash_Algorithm):
@@ -36,6 +38,49 @@ class Generic_Hash_Algorithm(Hash_Algorithm):
         self.hasher = hashlib.new(self._algorithm_name)
         self.hasher.update(data.encode('utf-8'))
         return self.hasher.hexdigest()
+
+    def hash_many(self, data: Iterable[str], workers: int = 1) -> list[str]:
+        """
+        Calcola gli hash di un lotto di stringhe, copiando un hasher già inizializzato invece di crearne uno nuovo per ogni stringa.
+
+        Args:
+            data: Le stringhe da hashare.
+            workers: Numero di thread da usare; hashlib rilascia il GIL per input di grandi dimensioni,
+                per cui più thread sono utili solo per lotti con stringhe lunghe.
+
+        Returns:
+            Gli hash delle stringhe in formato esadecimale, nello stesso ordine.
+        """
+        initial_hasher = hashlib.new(self._algorithm_name)
+
+        def hash_one(item: str) -> str:
+            hasher = initial_hasher.copy()
+            hasher.update(item.encode('utf-8'))
+            return hasher.hexdigest()
+
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(hash_one, data))
+        return [hash_one(item) for item in data]
+
+    def digest(self, data: bytes) -> bytes:
+        """
+        Calcola il digest binario dei byte dati.
+
+        Args:
+            data: I byte da hashare.
+
+        Returns:
+            Il digest in formato binario.
+        """
+        return hashlib.new(self._algorithm_name, data).digest()
+
+    def get_digest_size(self) -> int:
+        """
+        Restituisce la lunghezza in byte dei digest prodotti dall'algoritmo.
+        """
+        return self.hasher.digest_size
+
     def get_algorithm_name(self) -> str:
         """
         Restituisce il nome dell'algoritmo di hash.
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Iterable
 
 
 
@@ -14,6 +15,27 @@ class Hash_Algorithm(ABC):
         """
         pass
 
+    def hash_many(self, data: Iterable[str], workers: int = 1) -> list[str]:
+        """
+            Restituisce gli hash di tutte le stringhe date, nello stesso ordine.
+            Le implementazioni possono sfruttare workers thread per lotti di grandi dimensioni.
+        """
+        return [self.hash(item) for item in data]
+
+    @abstractmethod
+    def digest(self, data: bytes) -> bytes:
+        """
+            Restituisce il digest binario dei byte dati, senza conversioni in esadecimale.
+        """
+        pass
+
+    @abstractmethod
+    def get_digest_size(self) -> int:
+        """
+            Restituisce la lunghezza in byte dei digest prodotti dall'algoritmo.
+        """
+        pass
+
     @abstractmethod
     def save_on_json(self) -> dict:
         """
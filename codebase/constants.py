@@ -1,8 +1,10 @@
+import json
 import secrets
 from typing import TypeAlias, TypedDict
 import os
 
 from communication.Generic_Hash_Algorithm import Generic_Hash_Algorithm
+from communication.Hash_Algorithm import Hash_Algorithm
 
 DATA_DIRECTORY = os.path.join(os.path.dirname(__file__), "data")
 STUDENTS_FOLDER = "students"
@@ -10,6 +12,7 @@ UNIVERSITIES_FOLDER = "universities"
 BLOCKCHAIN_FOLDER = "blockchain"
 EXPERIMENTS_FOLDER = "experiments"
 CAs_FOLDER = "CAs"
+UNIVERSITY_STORAGE_BACKEND = "sharded" # Archivio dei dati degli studenti delle università: "sharded" (un file per studente), "json" (un file per università, per l'uso didattico) o "sqlite"
 
 SYMMETRIC_KEY_LENGTH = 32  # Lunghezza della chiave in byte
 IV_SIZE = 16 # 128 bit
@@ -18,11 +21,27 @@ MAC_SIZE = 32 #256 bit per HMAC-SHA256
 ASYMMETRIC_KEY_LENGTH = 256  # Lunghezza della chiave in byte
 
 BLOCKCHAIN_HASH_ALGORITHM = lambda : Generic_Hash_Algorithm("SHA256")
+BLOCKCHAIN_VERIFY_SEGMENT_SIZE = 1000 # Numero di blocchi verificati da ciascun processo alla volta
+BLOCKCHAIN_VERIFY_ON_LOAD = False # Se True la blockchain viene verificata ad ogni caricamento, a partire dall'ultimo checkpoint
+BLOCKCHAIN_CHECKPOINT_INTERVAL = 1000 # Numero di nuovi blocchi dopo i quali il salvataggio crea un nuovo checkpoint di verifica
+BLOCKCHAIN_CHECKPOINT_WORKERS = 1 # Processi usati per verificare i blocchi prima di un checkpoint, 1 per non avviare processi ad ogni salvataggio
+BLOCKCHAIN_BINARY_HASHING = False # Se True i nuovi blocchi e Merkle Tree combinano i digest binari invece delle stringhe esadecimali
+BLOCKCHAIN_SEGMENT_SIZE = 10000 # Numero di blocchi salvati in ciascun file segmento del registro
+BLOCKCHAIN_ID_INDEX_CAPACITY = 1024 # Capacità iniziale della tabella persistente degli ID del registro, raddoppiata quando è piena per metà
+BLOCKCHAIN_MERKLE_CACHE_SIZE = 256 # Numero massimo di Merkle Tree caricati su richiesta mantenuti in memoria
+BLOCKCHAIN_DECODED_BLOCKS_SIZE = 4096 # Numero massimo di intestazioni di blocchi letti dal registro mantenute in memoria
+BLOCKCHAIN_MERKLE_FORMAT_VERSION = 2 # Formato di salvataggio dei Merkle Tree: 1 annidato con tutti i nodi, 2 compatto con le sole foglie e la radice
+BLOCKCHAIN_MERKLE_INCREMENTAL = True # Se True i nuovi Merkle Tree delle credenziali hanno la forma incrementale, in cui aggiungere una foglia ricalcola solo il bordo destro; anche Flat_MerkleTree la supporta, ma vi riscrive comunque l'intero buffer ad ogni foglia aggiunta
 EXTRACT_RANDOM_NUMBER = lambda: secrets.randbelow(10**4)  # Numero casuale tra 0 e 9999
 MAXIMUM_TIMESTAMP_DIFFERENCE = 120  # Due minuti in secondi
 EXCHANGE_DEFAULT_PERIOD_DAYS = 120 # 120 giorni di scambio predefiniti
 CREDENTIAL_PERIOD_DAYS = 365 # 365 giorni di validità della credenziale
 BLACKLIST_THRESHOLD = .25  # Soglia per considerare un'università nella blacklist (25% delle università)
+BATCH_CREDENTIAL_ID_SEPARATOR = ":" # Separatore tra ID del blocco e posizione della credenziale negli ID composti
+REVOCATION_FILTER_CAPACITY = 1024 # Numero di revoche per cui è dimensionato inizialmente il filtro di Bloom delle revoche
+REVOCATION_FILTER_FALSE_POSITIVE_RATE = 0.01 # Tasso di falsi positivi del filtro di Bloom delle revoche
+CREDENTIAL_CONFIRMATION_MAX_AGE = 86400 # Secondi per cui un'università verifica una credenziale già confermata dallo smart contract con le sole prove di revoca
+PERSISTENCE_FSYNC = True # Se True le scritture atomiche sincronizzano su disco il file e la cartella prima di considerarsi concluse
 
 PRINT_MAX_LENGTH = -1
 DECORATION_CHARACTERS = 51  # Numero di caratteri per la decorazione nei messaggi
@@ -87,13 +106,19 @@ class Credential(TypedDict):
     exams_results: list[ExamResult]
     activities_results: list[ActivityResult]
 
-def stringify_credential_dicts(credential: Credential) -> list[str]:
+class CredentialLeaves(TypedDict):
     """
-        Converte i dati della credenziale in una lista di stringhe per costruire successivamente un Merkle Tree o validarla.
-        Parametri:
-        - credential: La credenziale da cui costruire il Merkle Tree.
-        Restituisce:
-        - Una lista di stringhe contenente i dati della credenziale.
+        Rappresenta gli hash delle foglie del Merkle Tree di una credenziale, calcolati all'emissione.
+        Gli hash di esami e attività sono indicizzati per nome, per ricavare le foglie di una credenziale divulgata selettivamente.
+    """
+    credential: str # Hash dei dati anagrafici e del periodo di scambio
+    exams_results: dict[str, str]
+    activities_results: dict[str, str]
+
+
+def _credential_leaf_dicts(credential: Credential) -> tuple[dict, list[dict], list[dict]]:
+    """
+        Estrae dalla credenziale i dizionari delle foglie: dati generali, esami e attività.
     """
     data = {
         "internal_serial_id": credential["internal_serial_id"],
@@ -129,16 +154,91 @@ def stringify_credential_dicts(credential: Credential) -> list[str]:
             "prof": activity["prof"],
         } for activity in credential["activities_results"]
     ]
+    return data, exam_datas, activities_data
+
 
+def stringify_credential_dicts(credential: Credential) -> list[str]:
+    """
+        Converte i dati della credenziale in una lista di stringhe con la rappresentazione str dei dizionari.
+        È la codifica delle credenziali emesse prima di quella canonica: dipende dall'ordine delle chiavi e dalla repr di Python,
+        e va usata solo per validare le credenziali già certificate con essa.
+        Parametri:
+        - credential: La credenziale da cui costruire il Merkle Tree.
+        Restituisce:
+        - Una lista di stringhe contenente i dati della credenziale.
+    """
+    data, exam_datas, activities_data = _credential_leaf_dicts(credential)
     return [str(data)] + [str(exam) for exam in exam_datas] + [str(activity) for activity in activities_data]
 
 
+def encode_credential_leaf(data: dict) -> str:
+    """
+        Restituisce la codifica canonica di una foglia: JSON compatto con le chiavi ordinate, indipendente dall'ordine di inserimento.
+    """
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def canonicalize_credential_dicts(credential: Credential) -> list[str]:
+    """
+        Converte i dati della credenziale nella lista delle codifiche canoniche delle foglie, nell'ordine del Merkle Tree:
+        dati generali, esami e attività.
+        Parametri:
+        - credential: La credenziale da cui costruire il Merkle Tree.
+    """
+    data, exam_datas, activities_data = _credential_leaf_dicts(credential)
+    return [encode_credential_leaf(data)] + [encode_credential_leaf(exam) for exam in exam_datas] + [encode_credential_leaf(activity) for activity in activities_data]
+
+
+def hash_credential_leaves(credential: Credential, hash_algorithm: Hash_Algorithm, previous_credential: Credential|None = None, previous_leaves: list[str]|None = None) -> CredentialLeaves:
+    """
+        Calcola una sola volta gli hash delle foglie canoniche della credenziale, da conservare insieme ad essa.
+        In una riemissione le foglie con la stessa codifica di una foglia della credenziale precedente riutilizzano il suo hash,
+        per cui vengono calcolati solo gli hash delle foglie nuove o cambiate.
+        Parametri:
+        - credential: La credenziale da cui costruire il Merkle Tree.
+        - hash_algorithm: L'algoritmo di hash della blockchain.
+        - previous_credential: La credenziale emessa in precedenza, se presente.
+        - previous_leaves: Gli hash delle foglie della credenziale precedente nell'ordine del Merkle Tree, calcolati con lo stesso algoritmo.
+    """
+    encodings = canonicalize_credential_dicts(credential)
+    known: dict[str, str] = {}
+    if previous_credential is not None and previous_leaves is not None:
+        previous_encodings = canonicalize_credential_dicts(previous_credential)
+        if len(previous_encodings) != len(previous_leaves):
+            raise ValueError("Gli hash delle foglie non corrispondono alla credenziale precedente.")
+        known = dict(zip(previous_encodings, previous_leaves))
+    missing = [encoding for encoding in dict.fromkeys(encodings) if encoding not in known]
+    known.update(zip(missing, hash_algorithm.hash_many(missing)))
+    digests = [known[encoding] for encoding in encodings]
+    exams = credential["exams_results"]
+    activities = credential["activities_results"]
+    return {
+        "credential": digests[0],
+        "exams_results": {exam["name"]: digest for exam, digest in zip(exams, digests[1:1 + len(exams)])},
+        "activities_results": {activity["name"]: digest for activity, digest in zip(activities, digests[1 + len(exams):])},
+    }
+
+
+def credential_leaves_list(credential: Credential, leaves: CredentialLeaves) -> list[str]:
+    """
+        Restituisce gli hash delle foglie della credenziale, anche divulgata selettivamente, nell'ordine del Merkle Tree,
+        senza ricodificare né ricalcolare alcun hash.
+        Parametri:
+        - credential: La credenziale, eventualmente privata di alcuni esami o attività.
+        - leaves: Gli hash delle foglie calcolati all'emissione della credenziale completa.
+    """
+    try:
+        return [leaves["credential"]] + [leaves["exams_results"][exam["name"]] for exam in credential["exams_results"]] \
+            + [leaves["activities_results"][activity["name"]] for activity in credential["activities_results"]]
+    except KeyError as e:
+        raise ValueError(f"La foglia {e} non appartiene alla credenziale emessa.")
+
+
 def _registra_esame(cod_uni:str, cod_stud:str, exam_res:ExamResult):
     from algorithms import lettura_dati, read_code
     from actors import Student, University
 
-    students = lettura_dati()[0]
-    universities = lettura_dati()[1]
+    students, universities = lettura_dati()[0:2]
 
     cod_stud = read_code("Inserisci il codice dello studente: ", cod_stud)
     cod_uni = read_code("Inserisci il codice dell'università: ", cod_uni)
@@ -158,8 +258,7 @@ def _registra_esame(cod_uni:str, cod_stud:str, exam_res:ExamResult):
 def _registra_attivita(cod_uni:str, cod_stud:str, act_res:ActivityResult):
     from algorithms import lettura_dati, read_code
     from actors import Student, University
-    students = lettura_dati()[0]
-    universities = lettura_dati()[1]
+    students, universities = lettura_dati()[0:2]
 
     cod_stud = read_code("Inserisci il codice dello studente: ", cod_stud)
     cod_uni = read_code("Inserisci il codice dell'università: ", cod_uni)
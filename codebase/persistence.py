@@ -0,0 +1,100 @@
+import json
+import os
+from constants import PERSISTENCE_FSYNC
+
+
+def _fsync_directory(directory: str) -> None:
+    """
+        Sincronizza su disco la cartella, per rendere persistente una rinomina appena fatta.
+        Sui sistemi che non permettono di aprire le cartelle, come Windows, non fa nulla.
+    """
+    if not PERSISTENCE_FSYNC or not hasattr(os, "O_DIRECTORY"):
+        return
+    descriptor = os.open(directory or ".", os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def atomic_write_bytes(path: str, data: bytes|bytearray) -> None:
+    """
+        Scrive il file in modo atomico: il contenuto viene scritto e sincronizzato su un file temporaneo, che poi sostituisce il file.
+        Un lettore, anche di un altro processo, vede sempre il file precedente o quello nuovo per intero,
+        ed un'interruzione lascia al più il file temporaneo.
+        Parametri:
+        - path: percorso del file da scrivere.
+        - data: contenuto del file.
+    """
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(data)
+        if PERSISTENCE_FSYNC:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(temporary_path, path)
+    _fsync_directory(os.path.dirname(path))
+
+
+def atomic_write_json(path: str, data, indent: int|None = 4) -> None:
+    """
+        Scrive in modo atomico il file JSON con il contenuto specificato.
+        Parametri:
+        - path: percorso del file da scrivere.
+        - data: oggetto da serializzare.
+        - indent: indentazione del JSON, None per il formato compatto.
+    """
+    atomic_write_bytes(path, json.dumps(data, indent=indent).encode("utf-8"))
+
+
+class Write_Journal():
+    """
+        Journal write-ahead per scrivere insieme più file della stessa cartella dei dati.
+        Il contenuto di tutti i file viene prima scritto in modo atomico nel journal, poi copiato nei file, ed infine il journal viene rimosso.
+        Se il processo si interrompe dopo la scrittura del journal, recover completa la copia al riavvio,
+        per cui al termine i file sono tutti aggiornati o tutti invariati.
+    """
+    JOURNAL_FILE = "journal.json"
+
+    def __init__(self, directory: str):
+        """
+            Parametri:
+            - directory: cartella dei dati, che contiene il journal ed i file da scrivere.
+        """
+        self._directory = directory
+        self._path = os.path.join(directory, Write_Journal.JOURNAL_FILE)
+
+    def commit(self, files: dict[str, object]) -> None:
+        """
+            Scrive insieme i file JSON specificati, passando per il journal se sono più di uno.
+            Parametri:
+            - files: dizionario percorso -> oggetto da serializzare.
+        """
+        contents = {path: json.dumps(data, indent=4) for path, data in files.items()}
+        if len(contents) > 1:
+            # I percorsi sono salvati relativi alla cartella dei dati, che può essere spostata
+            entries = {os.path.relpath(path, self._directory): content for path, content in contents.items()}
+            atomic_write_json(self._path, {"files": entries}, indent=None)
+        self._apply(contents)
+
+    def _apply(self, contents: dict[str, str]) -> None:
+        for path, content in contents.items():
+            atomic_write_bytes(path, content.encode("utf-8"))
+        if os.path.exists(self._path):
+            os.remove(self._path)
+            _fsync_directory(self._directory)
+
+    def recover(self) -> bool:
+        """
+            Completa le scritture di un journal rimasto da un'esecuzione interrotta.
+            Un journal incompleto, rimasto come file temporaneo, viene scartato perché nessun file è stato ancora modificato.
+            Restituisce True se il journal è stato applicato.
+        """
+        if os.path.exists(self._path + ".tmp"):
+            os.remove(self._path + ".tmp")
+        if not os.path.exists(self._path):
+            return False
+        with open(self._path, "r") as f:
+            entries: dict[str, str] = json.load(f)["files"]
+        self._apply({os.path.join(self._directory, path): content for path, content in entries.items()})
+        return True
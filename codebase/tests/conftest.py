@@ -0,0 +1,7 @@
+import os
+import sys
+
+# I test importano i moduli del progetto a partire dalla cartella codebase
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import blockchain  # noqa: E402,F401  Va importato prima di constants per evitare l'import circolare
@@ -0,0 +1,41 @@
+from blockchain import Block, Blockchain, MerkleTree, Smart_Contract
+from communication import Parametric_Asymmetric_Scheme
+
+
+def _chain(length: int) -> Blockchain:
+    chain = Blockchain()
+    prev_ID = "0"
+    for i in range(length):
+        block = Block(prev_ID, f"author{i % 2}", MerkleTree([f"leaf{i}"]))
+        chain.add_block(block)
+        prev_ID = block.get_ID()
+    return chain
+
+
+def test_iterate_from_includes_genesis_by_default():
+    chain = _chain(4)
+    blocks = list(chain.iterate_from())
+    assert [block.get_ID() for block in blocks] == [block.get_ID() for block in chain.get_blocks()]
+
+
+def test_iterate_from_exclusive_and_filters():
+    chain = _chain(4)
+    genesis_ID = chain.get_blocks()[0].get_ID()
+    assert len(list(chain.iterate_from(genesis_ID, inclusive=False))) == 3
+    assert all(block.get_author() == "author1" for block in chain.iterate_from(author="author1"))
+    assert len(list(chain.iterate_from(author="author1"))) == 2
+
+
+def test_checkpoint_verifies_in_current_process(monkeypatch):
+    chain = _chain(4)
+    smart_contract = Smart_Contract(chain, Parametric_Asymmetric_Scheme(), None)
+    # Il salvataggio non deve avviare altri processi, qualunque sia il numero di blocchi da verificare
+    used_workers: list[int|None] = []
+    advance_checkpoint = Blockchain.advance_checkpoint
+    def recorded(self, signer, interval=1, workers=None):
+        used_workers.append(workers)
+        return advance_checkpoint(self, signer, 1, workers)
+    monkeypatch.setattr(Blockchain, "advance_checkpoint", recorded)
+    smart_contract.checkpoint_blockchain()
+    assert used_workers == [1]
+    assert chain.get_checkpoints()[-1]["height"] == 3
@@ -0,0 +1,65 @@
+import pytest
+from blockchain import Blockchain, MerkleTree, Smart_Contract
+from communication import Parametric_Asymmetric_Scheme
+from constants import BLOCKCHAIN_HASH_ALGORITHM
+
+HASHING = BLOCKCHAIN_HASH_ALGORITHM()
+
+
+class _University():
+    def __init__(self, code: str):
+        self._code = code
+
+    def get_code(self) -> str:
+        return self._code
+
+
+@pytest.fixture
+def contract():
+    smart_contract = Smart_Contract(Blockchain(), Parametric_Asymmetric_Scheme(), None)
+    university = _University("U")
+    smart_contract.whitelist_university(university, Parametric_Asymmetric_Scheme())
+    tree = MerkleTree([HASHING.hash(f"leaf{i}") for i in range(6)], HASHING, incremental=True)
+    single_ID = smart_contract.certificate_credential_MerkleTree(tree, university)
+    batch_trees = [MerkleTree([HASHING.hash(f"b{j}-{i}") for i in range(5)], HASHING) for j in range(3)]
+    batch_IDs = smart_contract.certificate_credentials_MerkleTrees(batch_trees, university)
+    return smart_contract, tree, single_ID, batch_trees, batch_IDs
+
+
+def test_valid_proofs_are_accepted(contract):
+    smart_contract, tree, single_ID, batch_trees, batch_IDs = contract
+    leaves = tree.get_leaves()
+    indices = [1, 4]
+    proofs = [tree.get_proof(index) for index in indices]
+    assert smart_contract.validate_credential_MerkleProofs([leaves[i] for i in indices], indices, proofs, single_ID)
+    assert smart_contract.validate_credential_MerkleMultiProof([leaves[i] for i in indices], tree.get_multiproof(indices), single_ID)
+
+    batch_tree = batch_trees[2]
+    batch_leaves = batch_tree.get_leaves()
+    proofs = [batch_tree.get_proof(index) for index in indices]
+    assert smart_contract.validate_credential_MerkleProofs([batch_leaves[i] for i in indices], indices, proofs, batch_IDs[2], batch_tree.get_leaves_count())
+    assert smart_contract.validate_credential_MerkleMultiProof([batch_leaves[i] for i in indices], batch_tree.get_multiproof(indices), batch_IDs[2])
+
+
+def test_root_and_internal_nodes_are_rejected_as_leaves(contract):
+    smart_contract, tree, single_ID, batch_trees, batch_IDs = contract
+    root = tree.get_root()
+    assert not smart_contract.validate_credential_MerkleProofs([root.get_hash()], [0], [[]], single_ID)
+    internal = root.get_left().get_hash()
+    proof = tree.get_proof(0)
+    for index in range(tree.get_leaves_count()):
+        assert not smart_contract.validate_credential_MerkleProofs([internal], [index], [proof[2:]], single_ID)
+    # Prova multipla di un albero più piccolo, in cui il nodo interno sarebbe una foglia
+    forged = {"leaves_count": 2, "indices": [0], "hashes": [root.get_right().get_hash()], "incremental": True}
+    assert MerkleTree.verify_multiproof([internal], forged, root.get_hash())
+    assert not smart_contract.validate_credential_MerkleMultiProof([internal], forged, single_ID)
+
+
+def test_batch_credential_root_is_rejected_as_leaf(contract):
+    smart_contract, tree, single_ID, batch_trees, batch_IDs = contract
+    credential_root = batch_trees[0].get_root().get_hash()
+    assert not smart_contract.validate_credential_MerkleProofs([credential_root], [0], [[]], batch_IDs[0], 1)
+    forged = {"leaves_count": 1, "indices": [0], "hashes": []}
+    assert not smart_contract.validate_credential_MerkleMultiProof([credential_root], forged, batch_IDs[0])
+    with pytest.raises(ValueError):
+        smart_contract.validate_credential_MerkleProofs([credential_root], [0], [[]], batch_IDs[0])
@@ -0,0 +1,84 @@
+import math
+import pytest
+from blockchain import Blockchain, MerkleTree, Smart_Contract
+from communication import Parametric_Asymmetric_Scheme
+from constants import BLOCKCHAIN_HASH_ALGORITHM, Credential, credential_leaves_list, hash_credential_leaves
+
+HASHING = BLOCKCHAIN_HASH_ALGORITHM()
+
+
+class _University():
+    def __init__(self, code: str):
+        self._code = code
+
+    def get_code(self) -> str:
+        return self._code
+
+
+def _credential(exams: int, grade: int = 28) -> Credential:
+    return {
+        "internal_serial_id": "001#001", "external_serial_id": "001#002", "name": "Mario", "surname": "Rossi",
+        "external_university": "UniExt", "external_university_code": "002", "internal_referrer": "A", "external_referrer": "B",
+        "emission_date": "2026-01-01", "expiration_date": "2027-01-01", "exchange_period_start": "2026-01-01", "exchange_period_end": "2026-07-01",
+        "exams_results": [{"name": f"Esame {i}", "grade": grade if i == 0 else 30, "lodging": False, "date": "2026-02-01",
+                           "prof": "C", "study_plan_name": "Esame", "cfus": 6} for i in range(exams)],
+        "activities_results": [{"name": "Tirocinio", "start_date": "2026-03-01", "end_date": "2026-04-01", "cfus": 3, "prof": "D"}],
+    }
+
+
+def _count_hashes(monkeypatch) -> list[int]:
+    # Conta gli hash calcolati sulle foglie e le combinazioni dei nodi interni
+    calls = [0]
+    hash_many = type(HASHING).hash_many
+    def counting_hash_many(self, data, *args):
+        data = list(data)
+        calls[0] += len(data)
+        return hash_many(self, data, *args)
+    combine = MerkleTree._combine
+    def counting_combine(*args):
+        calls[0] += 1
+        return combine(*args)
+    monkeypatch.setattr(type(HASHING), "hash_many", counting_hash_many)
+    monkeypatch.setattr(MerkleTree, "_combine", staticmethod(counting_combine))
+    return calls
+
+
+def test_reissue_hashes_only_changed_leaves(monkeypatch):
+    previous = _credential(200)
+    previous_leaves = credential_leaves_list(previous, hash_credential_leaves(previous, HASHING))
+    credential = _credential(201, grade=30) # Un esame cambiato ed uno aggiunto
+    calls = _count_hashes(monkeypatch)
+    leaves = hash_credential_leaves(credential, HASHING, previous, previous_leaves)
+    assert calls[0] == 2
+    assert leaves == hash_credential_leaves(credential, HASHING)
+    with pytest.raises(ValueError):
+        hash_credential_leaves(credential, HASHING, previous, previous_leaves[:-1])
+
+
+def test_reissue_reuses_previous_tree_without_validating(monkeypatch):
+    blockchain = Blockchain()
+    smart_contract = Smart_Contract(blockchain, Parametric_Asymmetric_Scheme(), None)
+    university = _University("U")
+    smart_contract.whitelist_university(university, Parametric_Asymmetric_Scheme())
+    leaves = [HASHING.hash(str(i)) for i in range(1000)]
+    previous_ID = smart_contract.certificate_credential_MerkleTree(smart_contract.build_credential_MerkleTree(leaves), university)
+
+    leaves[500] = HASHING.hash("changed")
+    calls = _count_hashes(monkeypatch)
+    monkeypatch.setattr(MerkleTree, "validate", lambda self: pytest.fail("L'albero aggiornato non va visitato"))
+    tree = smart_contract.build_credential_MerkleTree(leaves, previous_ID)
+    smart_contract.certificate_credential_MerkleTree(tree, university)
+    assert calls[0] <= math.ceil(math.log2(len(leaves))) + 1
+    monkeypatch.undo()
+    assert tree.get_root().get_hash() == MerkleTree(leaves, incremental=tree.is_incremental()).get_root().get_hash()
+
+
+def test_trees_loaded_with_unchecked_nodes_are_validated():
+    tree = MerkleTree([HASHING.hash(str(i)) for i in range(5)])
+    assert tree.is_consistent() and tree.copy().is_consistent()
+    nested = MerkleTree.load_from_json(tree.save_on_json(1))
+    assert not nested.is_consistent()
+    assert nested.validate() and nested.is_consistent()
+    tampered = dict(tree.save_on_json(2), root=HASHING.hash("x"))
+    loaded = MerkleTree.load_from_json(tampered)
+    assert not loaded.is_consistent() and not loaded.copy().is_consistent()
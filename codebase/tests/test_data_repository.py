@@ -0,0 +1,97 @@
+import importlib
+import json
+import pytest
+from actors import Student
+from algorithms.lettura_dati import Data_Repository, lettura_dati, salva_blockchain, unita_di_lavoro
+from blockchain import Block, MerkleTree
+from constants import BLOCKCHAIN_HASH_ALGORITHM, STUDENTS_FOLDER
+
+HASHING = BLOCKCHAIN_HASH_ALGORITHM()
+lettura_dati_module = importlib.import_module("algorithms.lettura_dati")
+
+
+@pytest.fixture
+def repository(tmp_path, monkeypatch) -> Data_Repository:
+    # Repository e registro della blockchain in una cartella temporanea, al posto di quelli condivisi del processo
+    repository = Data_Repository(str(tmp_path))
+    monkeypatch.setattr(lettura_dati_module, "_repository", repository)
+    monkeypatch.setattr(lettura_dati_module, "DATA_DIRECTORY", str(tmp_path))
+    return repository
+
+
+def _snapshot(directory) -> dict[str, bytes]:
+    return {str(path.relative_to(directory)): path.read_bytes() for path in sorted(directory.rglob("*")) if path.is_file()}
+
+
+def test_failed_unit_of_work_writes_nothing(repository, tmp_path):
+    repository.add(Data_Repository.STUDENTS, "001", Student("Mario", "Rossi", "001"))
+    repository.save()
+    repository.get_blockchain()
+    before = _snapshot(tmp_path)
+
+    @unita_di_lavoro
+    def nested_algorithm():
+        repository.get_students()["001"]._name = "Luigi"
+        repository.mark_dirty(Data_Repository.STUDENTS, "001")
+
+    @unita_di_lavoro
+    def algorithm():
+        repository.add(Data_Repository.STUDENTS, "002", Student("Anna", "Bianchi", "002"))
+        repository.save()
+        nested_algorithm()
+        blockchain, smart_contract = repository.get_blockchain()
+        blockchain.add_block(Block("", HASHING.hash("autore"), MerkleTree([HASHING.hash("foglia")])))
+        salva_blockchain(blockchain, smart_contract)
+        raise ValueError("Errore di validazione")
+
+    with pytest.raises(ValueError):
+        algorithm()
+    # Né i file JSON né il registro sono stati modificati, e gli oggetti in memoria sono stati scartati
+    assert _snapshot(tmp_path) == before
+    students = repository.get_students()
+    assert list(students) == ["001"] and students["001"].save_on_json()["name"] == "Mario"
+    assert len(repository.get_blockchain()[0].get_blocks()) == 0
+
+
+def test_second_read_uses_identity_map(repository):
+    students, universities, CAs, config, blockchain, smart_contract = lettura_dati()
+    loads = repository.get_loads()
+    assert loads == {section: 1 for section in ("config", "students", "universities", "CAs", "blockchain")}
+    again = lettura_dati()
+    assert repository.get_loads() == loads
+    assert all(first is second for first, second in zip((students, universities, CAs, config, blockchain, smart_contract), again))
+
+
+def test_external_write_reloads_only_its_section(repository, tmp_path):
+    repository.add(Data_Repository.STUDENTS, "001", Student("Mario", "Rossi", "001"))
+    repository.save()
+    students, _, _, _, _, _ = lettura_dati()
+    loads = repository.get_loads()
+
+    (tmp_path / "config.json").write_text(json.dumps({"chiave": "valore"}))
+    _, _, _, config, _, _ = lettura_dati()
+    assert config == {"chiave": "valore"}
+    assert repository.get_loads() == dict(loads, config=loads["config"] + 1)
+    assert repository.get_students() is students
+
+
+def test_save_writes_only_dirty_entries(repository, tmp_path):
+    for code, name in (("001", "Mario"), ("002", "Anna")):
+        repository.add(Data_Repository.STUDENTS, code, Student(name, "Rossi", code))
+    repository.save()
+    students = repository.get_students()
+
+    # Un altro processo modifica il file: le sue voci restano, tranne quelle segnate come modificate in questo repository
+    path = tmp_path / STUDENTS_FOLDER / "students.json"
+    data = json.loads(path.read_text())
+    data["002"]["name"] = "Anna Maria"
+    data["003"] = dict(data["001"], name="Paolo")
+    path.write_text(json.dumps(data))
+    students["001"]._name = "Luigi"
+    students["002"]._name = "Non salvato"
+    repository.mark_dirty(Data_Repository.STUDENTS, "001")
+    repository.save()
+
+    saved = json.loads(path.read_text())
+    assert [saved[code]["name"] for code in ("001", "002", "003")] == ["Luigi", "Anna Maria", "Paolo"]
+    assert not repository.is_dirty(Data_Repository.STUDENTS)
@@ -0,0 +1,225 @@
+import os
+import pytest
+import struct
+from blockchain import Block, Blockchain, Ledger_Storage, Merkle_Cache, MerkleTree
+from blockchain.Stored_Blocks import Stored_Blocks
+from constants import BLOCKCHAIN_HASH_ALGORITHM
+
+HASHING = BLOCKCHAIN_HASH_ALGORITHM()
+AUTHOR = HASHING.hash("author")
+
+
+def _chain(length: int) -> Blockchain:
+    chain = Blockchain()
+    prev_ID = ""
+    for i in range(length):
+        block = Block(prev_ID, AUTHOR, MerkleTree([HASHING.hash(str(i)), HASHING.hash("x")]), binary=i % 2 == 0)
+        chain.add_block(block)
+        prev_ID = block.get_ID()
+    chain.add_block(Block(prev_ID, AUTHOR, chain.get_blocks()[3].get_ID(), delete_flag=True))
+    return chain
+
+
+def _count_record_reads(storage: Ledger_Storage) -> list[int]:
+    reads: list[int] = []
+    read_record = storage._read_record
+    def counted(height: int):
+        reads.append(height)
+        return read_record(height)
+    storage._read_record = counted # type: ignore
+    return reads
+
+
+def test_sync_and_reload(tmp_path):
+    chain = _chain(20)
+    storage = Ledger_Storage(str(tmp_path), segment_size=7)
+    storage.sync(Blockchain.load_from_json(chain.save_on_json()[:8]))
+    storage.sync(chain)
+    assert storage.get_height() == 21
+    loaded = Ledger_Storage(str(tmp_path), segment_size=7).load_blockchain()
+    assert loaded.save_on_json() == chain.save_on_json()
+    assert loaded.verify(workers=1) is None
+
+
+def test_load_is_lazy_and_lookup_uses_ID_table(tmp_path):
+    chain = _chain(30)
+    Ledger_Storage(str(tmp_path)).sync(chain)
+
+    storage = Ledger_Storage(str(tmp_path))
+    reads = _count_record_reads(storage)
+    loaded = storage.load_blockchain()
+    assert reads == []
+    target = chain.get_blocks()[17]
+    assert loaded.get_height(target.get_ID()) == 17
+    assert loaded.find_block(target.get_ID()).get_ID() == target.get_ID()
+    assert reads == [17]
+    assert loaded.find_block(HASHING.hash("missing")) is None
+    assert loaded.find_block(target.get_ID()) is loaded.get_blocks()[17]
+
+    # I blocchi aggiunti dopo il caricamento sono cercati in memoria
+    block = Block(loaded.get_last_block().get_ID(), AUTHOR, MerkleTree([HASHING.hash("new")]))
+    loaded.add_block(block)
+    assert loaded.get_height(block.get_ID()) == 31
+    assert [b.get_ID() for b in loaded.iterate_from(block.get_ID())] == [block.get_ID()]
+    storage.sync(loaded)
+    assert Ledger_Storage(str(tmp_path)).find_block(block.get_ID()).get_ID() == block.get_ID()
+
+
+def test_missing_ID_table_is_rebuilt(tmp_path):
+    chain = _chain(12)
+    storage = Ledger_Storage(str(tmp_path))
+    storage.sync(chain)
+    os.remove(tmp_path / Ledger_Storage.ID_INDEX_FILE)
+    assert storage.get_block_height(chain.get_blocks()[9].get_ID()) == 9
+    assert os.path.exists(tmp_path / Ledger_Storage.ID_INDEX_FILE)
+
+
+def test_index_version_1_is_upgraded(tmp_path):
+    chain = _chain(10)
+    storage = Ledger_Storage(str(tmp_path))
+    storage.sync(chain)
+    storage.close()
+
+    # Riscrive l'indice nel formato della versione 1, privo della radice delle revoche
+    digest = HASHING.get_digest_size()
+    record = struct.Struct(f">{digest}s{digest}s{digest}s{digest}s{digest}sBIQI")
+    old_record = struct.Struct(f">{digest}s{digest}s{digest}s{digest}sBIQI")
+    with open(tmp_path / Ledger_Storage.INDEX_FILE, "rb") as f:
+        data = f.read()
+    old_data = b"".join(old_record.pack(ID, prev_ID, author, root, *position)
+                        for ID, prev_ID, author, root, _, *position in record.iter_unpack(data))
+    with open(tmp_path / Ledger_Storage.INDEX_FILE, "wb") as f:
+        f.write(old_data)
+    os.remove(tmp_path / Ledger_Storage.METADATA_FILE)
+
+    upgraded = Ledger_Storage(str(tmp_path))
+    assert upgraded.get_height() == 11
+    assert upgraded.load_blockchain().save_on_json() == chain.save_on_json()
+
+
+def test_header_blocks_reread_evicted_trees(tmp_path):
+    chain = _chain(5)
+    Ledger_Storage(str(tmp_path)).sync(chain)
+    storage = Ledger_Storage(str(tmp_path))
+    reads: list[dict] = []
+    read_block_data = storage._read_block_data
+    storage._read_block_data = lambda record: reads.append(record) or read_block_data(record) # type: ignore
+    loaded = storage.load_blockchain()
+    loaded._merkle_cache = Merkle_Cache(1)
+    loaded._blocks._cache = loaded._merkle_cache # type: ignore
+
+    first, second = loaded.get_blocks()[0], loaded.get_blocks()[1]
+    assert not first.is_loaded()
+    assert first.get_merkle_or_ID().get_leaves() == chain.get_blocks()[0].get_merkle_or_ID().get_leaves()
+    second.get_merkle_or_ID()
+    # L'albero scartato dalla cache non resta nel blocco e viene riletto dal segmento
+    assert not first.is_loaded()
+    first.get_merkle_or_ID()
+    assert len(reads) == 3
+
+
+def test_decoded_headers_are_bounded(tmp_path):
+    chain = _chain(30)
+    Ledger_Storage(str(tmp_path)).sync(chain)
+    storage = Ledger_Storage(str(tmp_path))
+    loaded = storage.load_blockchain()
+    loaded._blocks = Stored_Blocks(storage, loaded._merkle_cache, capacity=4)
+    reads = _count_record_reads(storage)
+
+    assert [block.get_ID() for block in loaded.iterate_from()] == [block.get_ID() for block in chain.get_blocks()]
+    assert len(loaded._blocks._decoded) == 4
+    # I blocchi usati di recente restano gli stessi oggetti, gli altri vengono decodificati di nuovo
+    last = loaded.get_blocks()[29]
+    assert loaded.get_blocks()[29] is last and len(reads) == 31
+    loaded.get_blocks()[0]
+    assert len(reads) == 32 and len(loaded._blocks._decoded) == 4
+    assert loaded.get_blocks()[3].get_merkle_or_ID().get_leaves() == chain.get_blocks()[3].get_merkle_or_ID().get_leaves()
+
+
+def test_interrupted_append_is_recovered(tmp_path):
+    chain = _chain(12)
+    Ledger_Storage(str(tmp_path), segment_size=5).sync(chain)
+    IDs = [block.get_ID() for block in chain.get_blocks()]
+
+    # Interruzione: l'ultimo blocco è scritto solo in parte nel segmento e l'indice ha un record incompleto
+    segment_path = tmp_path / "segment_000002.jsonl"
+    segment_path.write_bytes(segment_path.read_bytes()[:-10])
+    with open(tmp_path / Ledger_Storage.INDEX_FILE, "ab") as f:
+        f.write(b"\x01" * 7)
+
+    storage = Ledger_Storage(str(tmp_path), segment_size=5)
+    assert storage.get_height() == 12
+    assert storage.get_block_height(IDs[12]) is None
+    assert storage.get_block_height(IDs[11]) == 11
+    assert not storage.recover()
+
+    # Il blocco perso viene riscritto alla sincronizzazione successiva
+    storage.sync(chain)
+    reloaded = Ledger_Storage(str(tmp_path), segment_size=5)
+    assert reloaded.get_block_height(IDs[12]) == 12
+    assert reloaded.load_blockchain().save_on_json() == chain.save_on_json()
+
+
+def test_index_records_of_missing_segments_are_discarded(tmp_path):
+    chain = _chain(12)
+    Ledger_Storage(str(tmp_path), segment_size=5).sync(chain)
+    os.remove(tmp_path / "segment_000002.jsonl")
+    storage = Ledger_Storage(str(tmp_path), segment_size=5)
+    assert storage.get_height() == 10
+    assert storage.load_blockchain().save_on_json() == chain.save_on_json()[:10]
+
+
+def test_parallel_verify_reads_segments_in_workers(tmp_path, monkeypatch):
+    chain = _chain(30)
+    Ledger_Storage(str(tmp_path), segment_size=7).sync(chain)
+    loaded = Ledger_Storage(str(tmp_path)).load_blockchain()
+    last = loaded.get_blocks()[-1]
+    loaded.add_block(Block(last.get_ID(), AUTHOR, MerkleTree([HASHING.hash("nuovo")])))
+
+    # Il processo principale non serializza i blocchi già salvati: lo fanno i processi che li verificano
+    save_on_json = Block.save_on_json
+    serialized: list[str] = []
+    def counted(self, *args):
+        serialized.append(self.get_ID())
+        return save_on_json(self, *args)
+    monkeypatch.setattr(Block, "save_on_json", counted)
+    assert loaded.verify(workers=2, segment_size=8) is None
+    assert serialized == [loaded.get_blocks()[-1].get_ID()]
+    assert loaded.verify(workers=1, segment_size=8, start=29) is None
+    monkeypatch.undo()
+
+    # Un blocco alterato nel segmento viene individuato dal processo che lo legge
+    segment_path = tmp_path / "segment_000000.jsonl"
+    lines = segment_path.read_bytes().split(b"\n")
+    leaf = HASHING.hash("4").encode()
+    assert leaf in lines[4]
+    lines[4] = lines[4].replace(leaf, HASHING.hash("y").encode())
+    segment_path.write_bytes(b"\n".join(lines))
+    assert Ledger_Storage(str(tmp_path)).load_blockchain().verify(workers=2, segment_size=8) == 4
+
+
+def test_tampered_index_root_is_rejected(tmp_path):
+    chain = _chain(10)
+    storage = Ledger_Storage(str(tmp_path))
+    storage.sync(chain)
+    storage.close()
+    digest_size = HASHING.get_digest_size()
+    record_size = storage._record.size
+    forged = HASHING.hash("forged")
+
+    # Radice del record all'altezza 6, dopo ID, ID precedente e autore
+    index_path = tmp_path / Ledger_Storage.INDEX_FILE
+    data = bytearray(index_path.read_bytes())
+    position = 6 * record_size + 3 * digest_size
+    data[position:position + digest_size] = bytes.fromhex(forged)
+    index_path.write_bytes(bytes(data))
+
+    loaded = Ledger_Storage(str(tmp_path)).load_blockchain()
+    block = loaded.get_blocks()[6]
+    assert block.get_root_hash() == forged
+    with pytest.raises(ValueError):
+        block.get_merkle_or_ID()
+    assert not block.verify()
+    assert loaded.verify(workers=1) == 6
+    assert loaded.verify(workers=2, segment_size=4) == 6
+    assert not Ledger_Storage(str(tmp_path)).verify_block(6)
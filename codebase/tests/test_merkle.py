@@ -0,0 +1,187 @@
+import hashlib
+import math
+import pytest
+from blockchain import Flat_MerkleTree, MerkleTree
+
+
+def _leaves(count: int) -> list[str]:
+    return [hashlib.sha256(f"leaf{i}".encode()).hexdigest() for i in range(count)]
+
+
+@pytest.mark.parametrize("binary", [False, True])
+@pytest.mark.parametrize("count, indices", [(1, [0]), (2, [1]), (5, [0, 4]), (7, [1, 2, 6]), (13, [0, 3, 4, 5, 12]), (16, list(range(16)))])
+def test_multiproof_roundtrip(count, indices, binary):
+    leaves = _leaves(count)
+    tree = MerkleTree(leaves, binary=binary)
+    root_hash = tree.get_root().get_hash()
+    proof = tree.get_multiproof(indices)
+    leafs = [leaves[i] for i in indices]
+    assert MerkleTree.verify_multiproof(leafs, proof, root_hash, binary=binary)
+    assert MerkleTree.multiproof_root(leafs, proof, binary=binary) == root_hash
+
+
+def test_multiproof_rejects_malformed_proofs():
+    leaves = _leaves(9)
+    tree = MerkleTree(leaves)
+    root_hash = tree.get_root().get_hash()
+    proof = tree.get_multiproof([2, 7])
+    leafs = [leaves[2], leaves[7]]
+    assert not MerkleTree.verify_multiproof([leaves[2], leaves[6]], proof, root_hash)
+    assert MerkleTree.multiproof_root(leafs, {**proof, "hashes": proof["hashes"][:-1]}) is None
+    assert MerkleTree.multiproof_root(leafs, {**proof, "hashes": proof["hashes"] + [leaves[0]]}) is None
+    assert MerkleTree.multiproof_root(leafs, {**proof, "indices": [7, 2]}) is None
+
+
+def test_multiproof_large_tree():
+    count = 5000
+    leaves = _leaves(count)
+    tree = MerkleTree(leaves)
+    indices = [0, count // 3, count - 1]
+    proof = tree.get_multiproof(indices)
+    assert MerkleTree.verify_multiproof([leaves[i] for i in indices], proof, tree.get_root().get_hash())
+
+
+@pytest.mark.parametrize("version", [1, 2])
+@pytest.mark.parametrize("binary", [False, True])
+@pytest.mark.parametrize("count", [0, 1, 6])
+def test_json_roundtrip(version, binary, count):
+    tree = MerkleTree(_leaves(count), binary=binary)
+    data = tree.save_on_json(version)
+    assert MerkleTree.get_format_version(data) == version
+    loaded = MerkleTree.load_from_json(data)
+    assert loaded.get_leaves() == tree.get_leaves()
+    assert loaded.is_binary() == binary
+    if count:
+        assert MerkleTree.root_hash_from_json(data) == tree.get_root().get_hash()
+        assert loaded.get_root().get_hash() == tree.get_root().get_hash()
+        assert loaded.validate()
+
+
+def test_v1_and_v2_are_interchangeable():
+    tree = MerkleTree(_leaves(7))
+    from_v1 = MerkleTree.load_from_json(tree.save_on_json(1))
+    assert MerkleTree.load_from_json(from_v1.save_on_json(2)).save_on_json(1) == tree.save_on_json(1)
+
+
+def test_tampered_v2_tree_is_invalid():
+    data = MerkleTree(_leaves(4)).save_on_json(2)
+    data["leaves"][2] = _leaves(5)[4]
+    loaded = MerkleTree.load_from_json(data)
+    assert loaded.get_root().get_hash() == data["root"]
+    assert not loaded.validate()
+
+
+def test_unsupported_version():
+    with pytest.raises(ValueError):
+        MerkleTree(_leaves(2)).save_on_json(3)
+    with pytest.raises(ValueError):
+        MerkleTree.load_from_json({"version": 3, "root": "", "leaves": []})
+
+
+def _count_hashes(monkeypatch) -> list[int]:
+    # Conta le combinazioni di hash dei nodi interni
+    calls = [0]
+    combine = MerkleTree._combine
+    def counting(*args):
+        calls[0] += 1
+        return combine(*args)
+    monkeypatch.setattr(MerkleTree, "_combine", staticmethod(counting))
+    return calls
+
+
+@pytest.mark.parametrize("count", [1, 2, 7, 64, 1000, 1023])
+def test_incremental_append_hashes_only_right_edge(monkeypatch, count):
+    leaves = _leaves(count + 1)
+    tree = MerkleTree(leaves[:count], incremental=True)
+    calls = _count_hashes(monkeypatch)
+    root_hash = tree.append_leaf(leaves[count])
+    assert calls[0] <= math.ceil(math.log2(count + 1)) + 1
+    assert root_hash == MerkleTree(leaves, incremental=True).get_root().get_hash()
+    assert tree.validate()
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+@pytest.mark.parametrize("count, index", [(2, 0), (13, 6), (1000, 999), (1000, 421)])
+def test_single_leaf_update_leaves_hashes_one_path(monkeypatch, incremental, count, index):
+    leaves = _leaves(count)
+    tree = MerkleTree(leaves, incremental=incremental)
+    leaves[index] = hashlib.sha256(b"changed").hexdigest()
+    calls = _count_hashes(monkeypatch)
+    root_hash = tree.update_leaves(leaves)
+    assert calls[0] <= math.ceil(math.log2(count)) + 1
+    assert root_hash == MerkleTree(leaves, incremental=incremental).get_root().get_hash()
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_update_leaves_matches_full_rebuild(incremental):
+    leaves = _leaves(40)
+    tree = MerkleTree(leaves[:25], incremental=incremental)
+    previous = tree.copy()
+    changed = leaves[:10] + [hashlib.sha256(b"changed").hexdigest()] + leaves[11:]
+    assert tree.update_leaves(changed) == MerkleTree(changed, incremental=incremental).get_root().get_hash()
+    assert tree.get_leaves() == changed
+    assert previous.get_leaves() == leaves[:25] # L'albero copiato non viene modificato
+    assert tree.update_leaves(leaves[:3]) == MerkleTree(leaves[:3], incremental=incremental).get_root().get_hash()
+    assert tree.update_leaves([]) == ""
+
+
+@pytest.mark.parametrize("version", [1, 2])
+def test_incremental_shape_is_persisted(version):
+    leaves = _leaves(11)
+    tree = MerkleTree(leaves, incremental=True)
+    assert tree.get_root().get_hash() != MerkleTree(leaves).get_root().get_hash()
+    loaded = MerkleTree.load_from_json(tree.save_on_json(version))
+    assert loaded.is_incremental()
+    assert loaded.get_root().get_hash() == tree.get_root().get_hash()
+    assert loaded.append_leaf(leaves[0]) == MerkleTree(leaves + [leaves[0]], incremental=True).get_root().get_hash()
+    proof = tree.get_multiproof([0, 5, 10])
+    assert MerkleTree.verify_multiproof([leaves[0], leaves[5], leaves[10]], proof, tree.get_root().get_hash())
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+@pytest.mark.parametrize("count", [1, 2, 5, 11, 16])
+def test_flat_tree_matches_node_tree(incremental, count):
+    leaves = _leaves(count)
+    tree = MerkleTree(leaves, incremental=incremental)
+    root_hash = tree.get_root().get_hash()
+    flat = Flat_MerkleTree(leaves, incremental=incremental)
+    # Stessa radice, stesse prove e conversioni senza perdere la forma dell'albero
+    assert flat.get_root().get_hash() == root_hash and flat.validate()
+    assert flat.get_leaves() == leaves
+    assert all(flat.get_proof(index) == tree.get_proof(index) for index in range(count))
+    assert flat.get_multiproof([0, count - 1]) == tree.get_multiproof([0, count - 1])
+    converted = Flat_MerkleTree.from_merkle_tree(tree)
+    assert converted.is_incremental() == incremental and converted.get_root().get_hash() == root_hash
+    assert flat.to_merkle_tree().get_root().get_hash() == root_hash
+    assert Flat_MerkleTree.load_from_json(tree.save_on_json(2)).get_root().get_hash() == root_hash
+    assert flat.append_leaf(leaves[0]) == MerkleTree(leaves + [leaves[0]], incremental=incremental).get_root().get_hash()
+    assert flat.update_leaf(0, leaves[-1]) == MerkleTree([leaves[-1]] + leaves[1:] + [leaves[0]], incremental=incremental).get_root().get_hash()
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+@pytest.mark.parametrize("count", [1, 2, 7, 13])
+def test_proof_roundtrip(incremental, count):
+    leaves = _leaves(count)
+    tree = MerkleTree(leaves, incremental=incremental)
+    root_hash = tree.get_root().get_hash()
+    for index, leaf in enumerate(leaves):
+        proof = tree.get_proof(index)
+        assert len(proof) == len(MerkleTree.leaf_path(index, count, incremental))
+        assert MerkleTree.verify_proof(leaf, proof, root_hash, index, count, incremental=incremental)
+    assert not MerkleTree.verify_proof(leaves[0], tree.get_proof(0), root_hash, count, count, incremental=incremental)
+
+
+def test_internal_nodes_are_not_accepted_as_leaves():
+    leaves = _leaves(8)
+    tree = MerkleTree(leaves)
+    root = tree.get_root()
+    proof = tree.get_proof(0)
+    # La radice con una prova vuota ed un nodo interno con la prova accorciata ricalcolano la radice
+    assert MerkleTree.proof_root(root.get_hash(), [], 0, 1) == root.get_hash()
+    assert not MerkleTree.verify_proof(root.get_hash(), [], root.get_hash(), 0, 8)
+    internal = root.get_left().get_left().get_hash()
+    for index in range(8):
+        assert not MerkleTree.verify_proof(internal, proof[1:], root.get_hash(), index, 8)
+    # Anche nella prova multipla la foglia è legata alla sua posizione in un albero con il numero di foglie dichiarato
+    multiproof = tree.get_multiproof([0])
+    assert not MerkleTree.verify_multiproof([internal], multiproof, root.get_hash())
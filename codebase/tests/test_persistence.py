@@ -0,0 +1,27 @@
+import json
+from persistence import Write_Journal, atomic_write_json
+
+
+def test_journal_recover_completes_interrupted_commit(tmp_path):
+    journal = Write_Journal(str(tmp_path))
+    atomic_write_json(str(tmp_path / "a.json"), {"value": 0})
+    journal.commit({str(tmp_path / "a.json"): {"value": 1}, str(tmp_path / "b.json"): {"value": 1}})
+    assert not (tmp_path / Write_Journal.JOURNAL_FILE).exists()
+
+    # Interruzione dopo la scrittura del journal: nessun file è stato ancora aggiornato
+    entries = {"a.json": json.dumps({"value": 2}), "b.json": json.dumps({"value": 2})}
+    atomic_write_json(str(tmp_path / Write_Journal.JOURNAL_FILE), {"files": entries}, indent=None)
+    assert Write_Journal(str(tmp_path)).recover()
+    assert json.loads((tmp_path / "a.json").read_text()) == {"value": 2}
+    assert json.loads((tmp_path / "b.json").read_text()) == {"value": 2}
+    assert not (tmp_path / Write_Journal.JOURNAL_FILE).exists()
+    assert not Write_Journal(str(tmp_path)).recover()
+
+
+def test_journal_recover_discards_incomplete_journal(tmp_path):
+    atomic_write_json(str(tmp_path / "a.json"), {"value": 0})
+    # Interruzione durante la scrittura del journal, rimasto come file temporaneo
+    (tmp_path / (Write_Journal.JOURNAL_FILE + ".tmp")).write_text('{"files": {"a.json": "{\\"val')
+    assert not Write_Journal(str(tmp_path)).recover()
+    assert not (tmp_path / (Write_Journal.JOURNAL_FILE + ".tmp")).exists()
+    assert json.loads((tmp_path / "a.json").read_text()) == {"value": 0}
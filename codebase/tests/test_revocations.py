@@ -0,0 +1,119 @@
+import pytest
+from blockchain import Blockchain, MerkleTree, Smart_Contract, Sparse_MerkleTree
+from communication import Parametric_Asymmetric_Scheme
+from constants import BLOCKCHAIN_HASH_ALGORITHM
+
+HASHING = BLOCKCHAIN_HASH_ALGORITHM()
+
+
+class _University():
+    def __init__(self, code: str):
+        self._code = code
+
+    def get_code(self) -> str:
+        return self._code
+
+
+@pytest.fixture
+def contract():
+    blockchain = Blockchain()
+    smart_contract = Smart_Contract(blockchain, Parametric_Asymmetric_Scheme(), None)
+    university = _University("U")
+    smart_contract.whitelist_university(university, Parametric_Asymmetric_Scheme())
+    IDs = [smart_contract.certificate_credential_MerkleTree(MerkleTree([HASHING.hash(str(i)), HASHING.hash("x")]), university) for i in range(8)]
+    IDs += smart_contract.certificate_credentials_MerkleTrees([MerkleTree([HASHING.hash(f"b{i}")]) for i in range(3)], university)
+    return smart_contract, university, IDs
+
+
+def _reload(blockchain: Blockchain, saved: dict|None, tree: bytes|None = None) -> tuple[Smart_Contract, list[int]]:
+    starts: list[int] = []
+    iterate_from = blockchain.iterate_from
+    def recorded(start=0, *args, **kwargs):
+        starts.append(start)
+        return iterate_from(start, *args, **kwargs)
+    blockchain.iterate_from = recorded # type: ignore
+    smart_contract = Smart_Contract(None, Parametric_Asymmetric_Scheme(), None)
+    smart_contract._link_blockchain(blockchain, saved, tree)
+    del blockchain.iterate_from
+    return smart_contract, starts
+
+
+def test_saved_revocations_skip_the_scan(contract):
+    smart_contract, university, IDs = contract
+    smart_contract.revoke_credential(IDs[1], university)
+    smart_contract.revoke_credential(IDs[9], university)
+    blockchain = smart_contract.get_blockchain()
+    saved = smart_contract.save_revocation_filter()
+
+    reloaded, starts = _reload(blockchain, saved)
+    assert starts == [len(blockchain.get_blocks())]
+    assert reloaded.save_revocation_filter() == saved
+    assert [reloaded.is_revoked(ID) for ID in IDs] == [smart_contract.is_revoked(ID) for ID in IDs]
+    assert reloaded.get_state_root() == smart_contract.get_state_root()
+
+
+def test_only_new_blocks_are_scanned(contract):
+    smart_contract, university, IDs = contract
+    smart_contract.revoke_credential(IDs[2], university)
+    saved = smart_contract.save_revocation_filter()
+    saved_height = saved["height"]
+    smart_contract.revoke_credential(IDs[5], university)
+    smart_contract.revoke_credential(IDs[8], university)
+    blockchain = smart_contract.get_blockchain()
+
+    reloaded, starts = _reload(blockchain, saved)
+    assert starts == [saved_height]
+    assert reloaded.save_revocation_filter() == smart_contract.save_revocation_filter()
+    assert [reloaded.is_revoked(ID) for ID in IDs] == [smart_contract.is_revoked(ID) for ID in IDs]
+    assert reloaded.get_state_root() == smart_contract.get_state_root()
+
+
+def test_missing_or_stale_state_is_rebuilt(contract):
+    smart_contract, university, IDs = contract
+    smart_contract.revoke_credential(IDs[3], university)
+    blockchain = smart_contract.get_blockchain()
+    stale = dict(smart_contract.save_revocation_filter(), height=len(blockchain.get_blocks()) + 1)
+    for saved in (None, stale):
+        reloaded, starts = _reload(blockchain, saved)
+        assert starts == [0]
+        assert reloaded.is_revoked(IDs[3]) and not reloaded.is_revoked(IDs[4])
+
+
+def test_saved_revocation_tree_is_reused(contract, monkeypatch):
+    smart_contract, university, IDs = contract
+    smart_contract.revoke_credential(IDs[0], university)
+    smart_contract.revoke_credential(IDs[10], university)
+    blockchain = smart_contract.get_blockchain()
+    tree = smart_contract.save_revocation_tree()
+    assert tree is not None and smart_contract.save_revocation_tree() is None
+    saved = smart_contract.save_revocation_filter()
+
+    updates: list[str] = []
+    set_value = Sparse_MerkleTree.set
+    monkeypatch.setattr(Sparse_MerkleTree, "set", lambda self, key, value: updates.append(key) or set_value(self, key, value))
+    reloaded, _ = _reload(blockchain, saved, tree)
+    assert updates == []
+    assert reloaded.save_revocation_tree() is None
+
+    state_root = blockchain.get_last_block().get_state_root()
+    assert reloaded.get_state_root() == state_root
+    for ID, revoked in [(IDs[0], True), (IDs[1], False), (IDs[10], True), (IDs[9], False)]:
+        assert Smart_Contract.check_revocation_proof(ID, reloaded.get_revocation_proof(ID), state_root, HASHING) == revoked
+
+    # Le nuove revoche sono aggiunte all'albero caricato
+    reloaded.revoke_credential(IDs[4], university)
+    assert updates == [IDs[4]]
+    assert reloaded.get_state_root() == blockchain.get_last_block().get_state_root()
+
+
+def test_mismatched_revocation_tree_is_rebuilt(contract):
+    smart_contract, university, IDs = contract
+    smart_contract.revoke_credential(IDs[6], university)
+    tree = smart_contract.save_revocation_tree()
+    smart_contract.revoke_credential(IDs[7], university)
+    blockchain = smart_contract.get_blockchain()
+
+    # I nodi precedenti all'ultima revoca non corrispondono alla radice salvata con l'indice
+    reloaded, _ = _reload(blockchain, smart_contract.save_revocation_filter(), tree)
+    assert reloaded.get_state_root() == smart_contract.get_state_root()
+    assert reloaded.save_revocation_tree() is not None
@@ -0,0 +1,33 @@
+import pytest
+from actors.Student import Student
+from constants import BLOCKCHAIN_HASH_ALGORITHM, Credential, credential_leaves_list, hash_credential_leaves
+
+HASHING = BLOCKCHAIN_HASH_ALGORITHM()
+
+
+def _credential(exam: str) -> Credential:
+    return {
+        "internal_serial_id": "001#001", "external_serial_id": "001#002", "name": "Mario", "surname": "Rossi",
+        "external_university": "UniExt", "external_university_code": "002", "internal_referrer": "A", "external_referrer": "B",
+        "emission_date": "2026-01-01", "expiration_date": "2027-01-01", "exchange_period_start": "2026-01-01", "exchange_period_end": "2026-07-01",
+        "exams_results": [{"name": exam, "grade": 30, "lodging": False, "date": "2026-02-01", "prof": "C", "study_plan_name": "Esame", "cfus": 6}],
+        "activities_results": [],
+    }
+
+
+def test_credential_leaves_are_replaced_with_the_credential():
+    student = Student("Mario", "Rossi", "010")
+    first = _credential("Analisi")
+    student.save_credential(first, "ID1", hash_credential_leaves(first, HASHING))
+    assert student.get_credential_leaves(first) == credential_leaves_list(first, hash_credential_leaves(first, HASHING))
+
+    # Gli hash della credenziale precedente non restano associati ad una credenziale diversa
+    second = _credential("Fisica")
+    student.save_credential(second, "ID2", None)
+    assert student.get_credential_leaves(second) is None
+    restored = Student.load_from_json(student.save_on_json())
+    assert restored.get_credential_data() == (second, "ID2")
+    assert restored.get_credential_leaves(second) is None
+
+    with pytest.raises(TypeError):
+        student.save_credential(second, "ID2") # type: ignore
@@ -0,0 +1,46 @@
+import json
+import os
+import pytest
+from actors import SQLite_Student_Storage, Sharded_Student_Storage, StudentData
+
+
+def _student(name: str) -> StudentData:
+    return {
+        "name": name, "surname": "Rossi", "study_plan": "Informatica",
+        "passed_exams": {"Analisi": {"name": "Analisi", "grade": 30, "lodging": True, "date": "2026-02-01", "prof": "C", "study_plan_name": "Informatica", "cfus": 6}},
+        "passed_activities": {}, "password": "hash", "salt": "salt",
+        "exchange_plan": None, "exchange_plan_data": None, "credential": None, "credential_ID": None,
+    }
+
+
+@pytest.mark.parametrize("backend", [Sharded_Student_Storage, SQLite_Student_Storage])
+def test_legacy_file_is_migrated_once(tmp_path, backend):
+    legacy_file = tmp_path / "uni_Uni.json"
+    students = {"001#001": _student("Mario"), "002#001": _student("Luigi")}
+    legacy_file.write_text(json.dumps(students))
+
+    storage = backend("Uni", str(tmp_path))
+    assert storage.load_all() == students
+    assert not legacy_file.exists() and (tmp_path / "uni_Uni.json.old").exists()
+    storage.save_student("003#001", _student("Anna"))
+    storage.close()
+
+    # Un nuovo file del vecchio formato non viene importato in un archivio già esistente
+    legacy_file.write_text(json.dumps({"004#001": _student("Paolo")}))
+    reopened = backend("Uni", str(tmp_path))
+    assert list(reopened.load_all()) == ["001#001", "002#001", "003#001"]
+    assert legacy_file.exists()
+    reopened.close()
+
+
+def test_sqlite_storage_reopens_after_close(tmp_path):
+    storage = SQLite_Student_Storage("Uni", str(tmp_path))
+    storage.save_student("001#001", _student("Mario"))
+    storage.close()
+    storage.close()
+    assert storage._connection is None
+    # Dopo la chiusura l'archivio riapre la connessione al primo accesso
+    assert storage.get_version() is not None
+    assert list(storage.load_all()) == ["001#001"]
+    storage.close()
+    os.remove(tmp_path / "uni_Uni.db")